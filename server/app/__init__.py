@@ -19,6 +19,31 @@ def create_app():
     CORS(app, origins=["http://localhost:3000"])  # Allow React dev server
     jwt = JWTManager(app)
     
+    # Hand each request's pooled connection back when the request ends
+    from app.models.database import release_request_connection
+    app.teardown_appcontext(release_request_connection)
+    
+    # Periodic maintenance jobs, started lazily in each worker process
+    from app.utils.scheduler import register_job, ensure_scheduler
+    from app.models.message_counters import UNREAD_RECONCILE_INTERVAL, reconcile_unread_counts
+    register_job('reconcile_unread_counts', UNREAD_RECONCILE_INTERVAL, reconcile_unread_counts)
+    from app.models.story_stats import (
+        STORY_VIEW_FLUSH_INTERVAL, STORY_LIKES_RECONCILE_INTERVAL, flush_story_views, reconcile_story_likes
+    )
+    register_job('reconcile_story_likes', STORY_LIKES_RECONCILE_INTERVAL, reconcile_story_likes)
+    # Each worker flushes its own view buffer, so no cross-process lock
+    register_job('flush_story_views', STORY_VIEW_FLUSH_INTERVAL, flush_story_views, exclusive=False)
+    from app.utils.deadlines import DEADLINE_SWEEP_INTERVAL, expire_past_deadlines
+    register_job('expire_deadlines', DEADLINE_SWEEP_INTERVAL, expire_past_deadlines)
+    
+    @app.before_request
+    def start_background_jobs():
+        ensure_scheduler(app)
+    
+    # CLI maintenance commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.users import users_bp
@@ -47,4 +72,30 @@ def create_app():
     def health_check():
         return {'status': 'healthy', 'message': 'Alumni Connect API is running'}
     
+    # Runtime metrics for this worker process (admins only)
+    from app.utils.auth import jwt_required_custom, role_required
+    
+    @app.route('/api/metrics')
+    @jwt_required_custom
+    @role_required('admin')
+    def metrics():
+        from app.models.database import get_pool_stats
+        from app.utils.auth import user_cache_stats
+        from app.utils.hashing import get_hashing_stats
+        from app.utils.broker import get_broker
+        from app.utils.scheduler import get_scheduler_stats
+        from app.utils.mentor_matching import get_matching_stats
+        from app.models.story_stats import get_view_buffer_stats
+        from app.utils.trending import get_trending_stats
+        return {
+            'database_pool': get_pool_stats(),
+            'user_cache': user_cache_stats(),
+            'password_hashing': get_hashing_stats(),
+            'message_streams': get_broker().stats(),
+            'scheduler': get_scheduler_stats(),
+            'mentor_matching': get_matching_stats(),
+            'story_views': get_view_buffer_stats(),
+            'trending': get_trending_stats()
+        }
+    
     return app
\ No newline at end of file
@@ -0,0 +1,44 @@
+import click
+from app.models.message_counters import reconcile_unread_counts
+from app.models.application_stats import rebuild_application_stats, reconcile_application_counts
+from app.models.mentor_directory import rebuild_directory
+from app.models.story_stats import reconcile_story_likes
+from app.utils.deadlines import expire_past_deadlines
+
+def register_commands(app):
+    """Attach maintenance commands to the Flask CLI (flask --app run <command>)"""
+
+    @app.cli.command('reconcile-unread')
+    @click.option('--batch-size', type=int, default=None, help='Users per batch')
+    def reconcile_unread(batch_size):
+        """Recompute unread message counters from the messages table"""
+        corrected = reconcile_unread_counts(batch_size)
+        click.echo(f'Unread counters reconciled ({corrected} rows changed)')
+    
+    @app.cli.command('rebuild-mentor-directory')
+    def rebuild_mentor_directory():
+        """Recompute the mentor directory read model from users, programs and sessions"""
+        refreshed = rebuild_directory()
+        click.echo(f'Mentor directory rebuilt ({refreshed} mentors refreshed)')
+    
+    @app.cli.command('reconcile-likes')
+    @click.option('--batch-size', type=int, default=None, help='Stories per batch')
+    def reconcile_likes(batch_size):
+        """Recompute success story likes_count from story_likes"""
+        corrected = reconcile_story_likes(batch_size)
+        click.echo(f'Story like counts reconciled ({corrected} stories corrected)')
+    
+    @app.cli.command('expire-deadlines')
+    @click.option('--batch-size', type=int, default=None, help='Rows deactivated per statement')
+    def expire_deadlines(batch_size):
+        """Flag opportunities and scholarships whose application deadline has passed as expired"""
+        expired = expire_past_deadlines(batch_size)
+        click.echo(f"Expired {expired['opportunities']} opportunities and {expired['scholarships']} scholarships")
+    
+    @app.cli.command('rebuild-application-stats')
+    @click.option('--batch-size', type=int, default=None, help='Users or postings per batch')
+    def rebuild_stats(batch_size):
+        """Recompute the application_stats rollup and posting application counts from applications"""
+        corrected = rebuild_application_stats(batch_size)
+        recounted = reconcile_application_counts(batch_size)
+        click.echo(f'Application stats rebuilt ({corrected} rows changed, {recounted} posting counts corrected)')
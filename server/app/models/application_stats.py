@@ -0,0 +1,158 @@
+import os
+from collections import namedtuple
+from app.models.database import execute_query, execute_many
+
+# Rebuild settings
+APPLICATION_STATS_REBUILD_BATCH = int(os.environ.get('APPLICATION_STATS_REBUILD_BATCH', 1000))  # scope ids per batch
+
+# One counter per applications.status value, plus totals by type
+STATUS_COLUMNS = ['submitted', 'under_review', 'shortlisted', 'accepted', 'rejected']
+STAT_COLUMNS = ['total_applications'] + STATUS_COLUMNS + ['opportunity_applications', 'scholarship_applications']
+
+# Each scope's rows are rebuilt from these branches; every branch selects
+# (scope_id, status, application_type) and takes a scope_id range
+StatsScope = namedtuple('StatsScope', ['id_table', 'id_column', 'branches'])
+
+STATS_SCOPES = {
+    'applicant': StatsScope('users', 'user_id', [
+        """SELECT a.user_id as scope_id, a.status, a.application_type FROM applications a
+           WHERE a.user_id BETWEEN %s AND %s"""
+    ]),
+    'poster': StatsScope('users', 'user_id', [
+        """SELECT o.posted_by as scope_id, a.status, a.application_type FROM applications a
+           JOIN opportunities o ON a.opportunity_id = o.opportunity_id
+           WHERE o.posted_by BETWEEN %s AND %s""",
+        """SELECT s.posted_by as scope_id, a.status, a.application_type FROM applications a
+           JOIN scholarships s ON a.scholarship_id = s.scholarship_id
+           WHERE s.posted_by BETWEEN %s AND %s"""
+    ]),
+    'opportunity': StatsScope('opportunities', 'opportunity_id', [
+        """SELECT a.opportunity_id as scope_id, a.status, a.application_type FROM applications a
+           WHERE a.opportunity_id BETWEEN %s AND %s"""
+    ]),
+    'scholarship': StatsScope('scholarships', 'scholarship_id', [
+        """SELECT a.scholarship_id as scope_id, a.status, a.application_type FROM applications a
+           WHERE a.scholarship_id BETWEEN %s AND %s"""
+    ])
+}
+
+def _scopes_of(application):
+    posting = application['application_type']
+    return [
+        ('applicant', application['user_id']),
+        ('poster', application['posted_by']),
+        (posting, application[f'{posting}_id'])
+    ]
+
+def record_status_changes(changes):
+    """Fold [(application, old_status, new_status)] into the stats rollup.
+
+    application needs user_id, posted_by, application_type and its
+    opportunity_id or scholarship_id; old_status is None for a new
+    submission. Deltas are summed per row and written as one upsert each.
+    Call inside the same transaction as the applications write.
+    """
+    deltas = {}
+    for application, old_status, new_status in changes:
+        delta = dict.fromkeys(STAT_COLUMNS, 0)
+        if old_status is None:
+            delta['total_applications'] = 1
+            delta[f"{application['application_type']}_applications"] = 1
+        else:
+            delta[old_status] -= 1
+        delta[new_status] += 1
+        for key in _scopes_of(application):
+            if key[1] is None:
+                continue
+            row = deltas.setdefault(key, dict.fromkeys(STAT_COLUMNS, 0))
+            for column, value in delta.items():
+                row[column] += value
+
+    # Sorted so concurrent writers lock rollup rows in the same order
+    rows = [
+        [scope, scope_id] + [row[column] for column in STAT_COLUMNS]
+        for (scope, scope_id), row in sorted(deltas.items())
+        if any(row.values())
+    ]
+    if not rows:
+        return 0
+    updates = ', '.join(f"{column} = GREATEST({column} + VALUES({column}), 0)" for column in STAT_COLUMNS)
+    return execute_many(f"""
+        INSERT INTO application_stats (scope, scope_id, {', '.join(STAT_COLUMNS)})
+        VALUES (%s, %s, {', '.join(['%s'] * len(STAT_COLUMNS))})
+        ON DUPLICATE KEY UPDATE {updates}
+    """, rows)
+
+def stats_for(scope, scope_id):
+    """Counts by status and type for one scope row (a primary-key lookup)"""
+    row = execute_query(f"""
+        SELECT {', '.join(STAT_COLUMNS)} FROM application_stats
+        WHERE scope = %s AND scope_id = %s
+    """, (scope, scope_id), fetch_one=True)
+    return row or dict.fromkeys(STAT_COLUMNS, 0)
+
+def rebuild_application_stats(batch_size=None):
+    """Recompute the rollup from applications, one scope_id range at a time.
+
+    Returns the number of rows MySQL reports as changed.
+    """
+    batch_size = batch_size or APPLICATION_STATS_REBUILD_BATCH
+    aggregates = ', '.join(
+        ['COUNT(*)']
+        + [f"SUM(x.status = '{status}')" for status in STATUS_COLUMNS]
+        + ["SUM(x.application_type = 'opportunity')", "SUM(x.application_type = 'scholarship')"]
+    )
+    assignments = ', '.join(f"{column} = VALUES({column})" for column in STAT_COLUMNS)
+
+    corrected = 0
+    for scope, source in STATS_SCOPES.items():
+        max_id = execute_query(
+            f"SELECT MAX({source.id_column}) as max_id FROM {source.id_table}", fetch_one=True
+        )['max_id'] or 0
+        branches = ' UNION ALL '.join(source.branches)
+
+        for start in range(0, max_id + 1, batch_size):
+            end = start + batch_size - 1
+            params = [start, end] * len(source.branches)
+
+            corrected += execute_query(f"""
+                INSERT INTO application_stats (scope, scope_id, {', '.join(STAT_COLUMNS)})
+                SELECT %s, x.scope_id, {aggregates}
+                FROM ({branches}) x
+                GROUP BY x.scope_id
+                ON DUPLICATE KEY UPDATE {assignments}
+            """, [scope] + params, returns='rowcount')
+
+            # Rows left with no applications behind them
+            corrected += execute_query(f"""
+                DELETE FROM application_stats
+                WHERE scope = %s AND scope_id BETWEEN %s AND %s
+                  AND scope_id NOT IN (SELECT x.scope_id FROM ({branches}) x)
+            """, [scope, start, end] + params)
+
+    return corrected
+
+def reconcile_application_counts(batch_size=None):
+    """Recompute opportunities/scholarships.application_count in id ranges.
+
+    Each range counts from the (posting_id, status) application indexes.
+    Returns the number of postings corrected.
+    """
+    batch_size = batch_size or APPLICATION_STATS_REBUILD_BATCH
+    corrected = 0
+    for scope in ('opportunity', 'scholarship'):
+        source = STATS_SCOPES[scope]
+        max_id = execute_query(
+            f"SELECT MAX({source.id_column}) as max_id FROM {source.id_table}", fetch_one=True
+        )['max_id'] or 0
+
+        for start in range(0, max_id + 1, batch_size):
+            corrected += execute_query(f"""
+                UPDATE {source.id_table} p
+                SET p.application_count = (
+                    SELECT COUNT(*) FROM applications a WHERE a.{source.id_column} = p.{source.id_column}
+                )
+                WHERE p.{source.id_column} BETWEEN %s AND %s
+            """, (start, start + batch_size - 1))
+
+    return corrected
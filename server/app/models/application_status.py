@@ -0,0 +1,72 @@
+from app.models.database import execute_query, transaction
+from app.models.application_stats import record_status_changes
+
+APPLICATION_STATUSES = ['submitted', 'under_review', 'shortlisted', 'accepted', 'rejected']
+
+# Most ids per grouped UPDATE ... WHERE application_id IN (...)
+STATUS_UPDATE_CHUNK = 100
+
+def bulk_update_statuses(poster_id, updates):
+    """Apply [(application_id, status)] for applications on poster_id's postings.
+
+    Ownership and current status come from one locking read over all ids,
+    then the changes go out as grouped UPDATE ... WHERE application_id IN (...)
+    statements, one per status and chunk. Returns {application_id: result}
+    where result is 'updated', 'unchanged', 'not_found', 'forbidden' or
+    'invalid_status'. Only the first pair for a repeated id is applied.
+    """
+    results = {}
+    wanted = {}
+    for application_id, status in updates:
+        if application_id in results or application_id in wanted:
+            continue
+        if status not in APPLICATION_STATUSES:
+            results[application_id] = 'invalid_status'
+            continue
+        wanted[application_id] = status
+    if not wanted:
+        return results
+
+    application_ids = sorted(wanted)
+    placeholders = ', '.join(['%s'] * len(application_ids))
+    with transaction():
+        rows = execute_query(f"""
+            SELECT a.application_id, a.status, a.user_id, a.application_type,
+                   a.opportunity_id, a.scholarship_id,
+                   CASE
+                       WHEN a.application_type = 'opportunity' THEN o.posted_by
+                       ELSE s.posted_by
+                   END as posted_by
+            FROM applications a
+            LEFT JOIN opportunities o ON a.opportunity_id = o.opportunity_id
+            LEFT JOIN scholarships s ON a.scholarship_id = s.scholarship_id
+            WHERE a.application_id IN ({placeholders})
+            FOR UPDATE OF a
+        """, application_ids)
+        current = {row['application_id']: row for row in rows}
+
+        groups = {}
+        changes = []
+        for application_id in application_ids:
+            row = current.get(application_id)
+            if row is None:
+                results[application_id] = 'not_found'
+            elif row['posted_by'] != poster_id:
+                results[application_id] = 'forbidden'
+            elif row['status'] == wanted[application_id]:
+                results[application_id] = 'unchanged'
+            else:
+                groups.setdefault(wanted[application_id], []).append(application_id)
+                changes.append((row, row['status'], wanted[application_id]))
+                results[application_id] = 'updated'
+
+        for status, ids in groups.items():
+            for start in range(0, len(ids), STATUS_UPDATE_CHUNK):
+                chunk = ids[start:start + STATUS_UPDATE_CHUNK]
+                execute_query(f"""
+                    UPDATE applications SET status = %s
+                    WHERE application_id IN ({', '.join(['%s'] * len(chunk))})
+                """, [status] + chunk)
+        if changes:
+            record_status_changes(changes)
+    return results
@@ -0,0 +1,124 @@
+from app.models.database import execute_query, execute_many, transaction
+from app.models.message_counters import adjust_unread
+
+# Characters of the latest message kept on the inbox row
+PREVIEW_LENGTH = 200
+
+def record_message(message):
+    """Fold a newly sent message into both participants' conversation rows.
+
+    Each user has their own row per conversation partner, so the inbox is a
+    single range read on (user_id, last_message_at). Call inside the same
+    transaction as the message insert.
+    """
+    preview = (message['content'] or '')[:PREVIEW_LENGTH]
+    execute_many("""
+        INSERT INTO conversations (
+            user_id, other_user_id, last_message_id, last_message_preview,
+            last_message_at, unread_count
+        ) VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            last_message_preview = IF(VALUES(last_message_id) > last_message_id, VALUES(last_message_preview), last_message_preview),
+            last_message_at = IF(VALUES(last_message_id) > last_message_id, VALUES(last_message_at), last_message_at),
+            unread_count = unread_count + VALUES(unread_count),
+            last_message_id = GREATEST(last_message_id, VALUES(last_message_id))
+    """, [
+        (message['sender_id'], message['recipient_id'], message['message_id'], preview, message['sent_at'], 0),
+        (message['recipient_id'], message['sender_id'], message['message_id'], preview, message['sent_at'], 1)
+    ])
+    adjust_unread(message['recipient_id'], 1)
+
+def mark_read(user_id, other_user_id, count):
+    """Take count newly read messages off user_id's unread counter for other_user_id"""
+    if count <= 0:
+        return
+    execute_query("""
+        UPDATE conversations
+        SET unread_count = GREATEST(unread_count - %s, 0)
+        WHERE user_id = %s AND other_user_id = %s
+    """, (count, user_id, other_user_id))
+    adjust_unread(user_id, -count)
+
+def get_conversation(user_id, other_user_id):
+    """user_id's summary row for their conversation with other_user_id"""
+    return execute_query("""
+        SELECT last_message_id, unread_count, read_up_to_message_id
+        FROM conversations
+        WHERE user_id = %s AND other_user_id = %s
+    """, (user_id, other_user_id), fetch_one=True)
+
+def mark_read_up_to(user_id, other_user_id, up_to_message_id=None):
+    """Advance user_id's read watermark for messages from other_user_id.
+
+    Everything other_user_id sent up to and including up_to_message_id
+    (default: the latest message) is marked read. Calls that would not move
+    the watermark, or that find nothing unread, cost one primary-key read and
+    no writes. Returns (messages marked read, new watermark).
+    """
+    conversation = get_conversation(user_id, other_user_id)
+    if not conversation:
+        return 0, 0
+    watermark = conversation['read_up_to_message_id']
+    if up_to_message_id is None:
+        up_to_message_id = conversation['last_message_id']
+    up_to_message_id = min(up_to_message_id, conversation['last_message_id'])
+    if conversation['unread_count'] <= 0 or up_to_message_id <= watermark:
+        return 0, watermark
+
+    with transaction():
+        updated = execute_query("""
+            UPDATE messages
+            SET is_read = TRUE
+            WHERE sender_id = %s AND recipient_id = %s
+              AND message_id <= %s AND is_read = FALSE
+        """, (other_user_id, user_id, up_to_message_id))
+        execute_query("""
+            UPDATE conversations
+            SET read_up_to_message_id = GREATEST(read_up_to_message_id, %s),
+                unread_count = GREATEST(unread_count - %s, 0)
+            WHERE user_id = %s AND other_user_id = %s
+        """, (up_to_message_id, updated, user_id, other_user_id))
+        adjust_unread(user_id, -updated)
+    return updated, up_to_message_id
+
+def mark_messages_read(user_id, message_ids):
+    """Mark specific messages received by user_id as read.
+
+    Returns {sender_id: [message ids marked read]} for senders whose
+    counters changed.
+    """
+    if not message_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(message_ids))
+    with transaction():
+        rows = execute_query(f"""
+            SELECT message_id, sender_id
+            FROM messages
+            WHERE recipient_id = %s AND message_id IN ({placeholders}) AND is_read = FALSE
+            FOR UPDATE
+        """, [user_id] + list(message_ids))
+        if not rows:
+            return {}
+        execute_query(f"""
+            UPDATE messages
+            SET is_read = TRUE
+            WHERE recipient_id = %s AND message_id IN ({placeholders}) AND is_read = FALSE
+        """, [user_id] + list(message_ids))
+        marked = {}
+        for row in rows:
+            marked.setdefault(row['sender_id'], []).append(row['message_id'])
+        for sender_id, ids in marked.items():
+            mark_read(user_id, sender_id, len(ids))
+    return marked
+
+def get_user_conversations(user_id):
+    """Conversation partners for user_id, most recent first"""
+    return execute_query("""
+        SELECT c.other_user_id, u.first_name, u.last_name, u.profile_image, u.current_position,
+               c.last_message_id, c.last_message_preview as last_message,
+               c.last_message_at as last_message_time, c.unread_count
+        FROM conversations c
+        JOIN users u ON c.other_user_id = u.user_id
+        WHERE c.user_id = %s
+        ORDER BY c.last_message_at DESC
+    """, (user_id,))
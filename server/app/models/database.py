@@ -1,7 +1,11 @@
 import pymysql
 import os
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 from dotenv import load_dotenv
+from flask import g, has_app_context
 
 load_dotenv()
 
@@ -16,40 +20,321 @@ DB_CONFIG = {
     'autocommit': True
 }
 
+# Connection pool configuration (per worker process)
+POOL_CONFIG = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    'ping_interval': float(os.environ.get('DB_POOL_PING_INTERVAL', 30))
+}
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout"""
+
+class ConnectionPool:
+    """Bounded pool of PyMySQL connections owned by a single process.
+
+    Idle connections are handed out most-recently-used first, pinged before
+    reuse once they have been idle longer than ``ping_interval`` and closed
+    once they have been idle longer than ``max_idle`` (down to ``min_size``).
+    """
+
+    def __init__(self, config, min_size=1, max_size=10, timeout=10, max_idle=300, ping_interval=30):
+        self.config = config
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used) pairs, newest on the right
+        self._size = 0
+        self._in_use = 0
+        self._waiters = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._closed = 0
+        self._health_check_failures = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if there is room"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        connection = None
+        last_used = None
+
+        with self._cond:
+            expired = self._take_expired()
+            while True:
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+            self._in_use += 1
+
+        self._close_all(expired)
+
+        try:
+            if connection is None:
+                connection = self._connect()
+            elif time.monotonic() - last_used >= self.ping_interval:
+                connection = self._check(connection)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it if it is no longer usable"""
+        if os.getpid() != self.pid:
+            # Inherited across a fork; the parent still owns the socket
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            expired = self._take_expired()
+            self._cond.notify()
+
+        if discard:
+            self._close(connection)
+        self._close_all(expired)
+
+    def stats(self):
+        """Snapshot of pool usage counters"""
+        with self._cond:
+            return {
+                'pid': self.pid,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiters': self._waiters,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_closed': self._closed,
+                'health_check_failures': self._health_check_failures,
+                'avg_checkout_ms': round(self._checkout_time_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'max_checkout_ms': round(self._checkout_time_max * 1000, 3)
+            }
+
+    def _connect(self):
+        connection = pymysql.connect(**self.config)
+        with self._cond:
+            self._created += 1
+        return connection
+
+    def _check(self, connection):
+        """Ping an idle connection and replace it if the server dropped it"""
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Exception:
+            with self._cond:
+                self._health_check_failures += 1
+            self._close(connection)
+            return self._connect()
+
+    def _take_expired(self):
+        """Pop idle connections past max_idle (caller holds the lock)"""
+        expired = []
+        cutoff = time.monotonic() - self.max_idle
+        # Oldest connections sit on the left of the deque
+        while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+            connection, _ = self._idle.popleft()
+            self._size -= 1
+            expired.append(connection)
+        return expired
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._closed += 1
+
+    def _close_all(self, connections):
+        for connection in connections:
+            self._close(connection)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return this process's connection pool, creating it after a fork"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+            pool = _pool
+    return pool
+
+def _reset_pool_after_fork():
+    # Connections inherited from the parent must not be reused or closed here
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def get_pool_stats():
+    """Usage metrics for the current process's connection pool"""
+    return get_pool().stats()
+
+def _is_connection_error(e):
+    return isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+
+def _in_transaction():
+    return has_app_context() and g.get('_db_transaction', False)
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    connection = None
+    """Context manager for pooled database connections.
+
+    Inside a Flask app context the first call borrows a connection from the
+    pool and every later call in the same request reuses it; it goes back to
+    the pool in release_request_connection(). Outside an app context each
+    call checks out (and returns) its own connection.
+    """
+    if has_app_context():
+        connection = g.get('_db_connection')
+        if connection is None:
+            connection = get_pool().acquire()
+            g._db_connection = connection
+            g._db_discard = False
+        try:
+            yield connection
+        except Exception as e:
+            if _is_connection_error(e):
+                g._db_discard = True
+            raise e
+        return
+
+    pool = get_pool()
+    connection = pool.acquire()
+    discard = False
     try:
-        connection = pymysql.connect(**DB_CONFIG)
         yield connection
     except Exception as e:
-        if connection:
-            connection.rollback()
+        if _is_connection_error(e):
+            discard = True
+        else:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
         raise e
     finally:
-        if connection:
-            connection.close()
+        pool.release(connection, discard=discard)
+
+def release_request_connection(exception=None):
+    """Return the request's connection to the pool (app context teardown)"""
+    connection = g.pop('_db_connection', None)
+    if connection is None:
+        return
 
-def execute_query(query, params=None, fetch_one=False, fetch_all=True):
-    """Execute a database query and return results"""
+    discard = g.pop('_db_discard', False)
+    if g.pop('_db_transaction', False) and not discard:
+        # A transaction block was abandoned without finishing
+        try:
+            connection.rollback()
+        except Exception:
+            discard = True
+    get_pool().release(connection, discard=discard)
+
+@contextmanager
+def transaction():
+    """Run the enclosed queries atomically on the request's connection.
+
+    Commits when the block exits normally and rolls back if it raises.
+    Nested blocks join the outermost transaction.
+    """
+    if _in_transaction():
+        yield g._db_connection
+        return
+
+    with get_db_connection() as connection:
+        connection.begin()
+        g._db_transaction = True
+        try:
+            yield connection
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                g._db_discard = True
+            raise
+        else:
+            connection.commit()
+        finally:
+            g._db_transaction = False
+
+def execute_query(query, params=None, fetch_one=False, fetch_all=True, returns=None):
+    """Execute a database query and return results.
+
+    Writes return the new row id for INSERTs and the affected row count
+    otherwise. returns='rowcount' or 'lastrowid' overrides that: the row
+    count tells whether an INSERT IGNORE inserted anything, and lastrowid
+    is how an UPDATE hands back a value set with LAST_INSERT_ID(expr).
+    """
     with get_db_connection() as connection:
         with connection.cursor() as cursor:
             cursor.execute(query, params or ())
             
-            if query.strip().upper().startswith('SELECT'):
+            if query.strip().upper().startswith(('SELECT', 'EXPLAIN')):
                 if fetch_one:
                     return cursor.fetchone()
                 elif fetch_all:
                     return cursor.fetchall()
             else:
-                connection.commit()
-                return cursor.lastrowid if query.strip().upper().startswith('INSERT') else cursor.rowcount
+                if not _in_transaction() and not connection.get_autocommit():
+                    connection.commit()
+                if returns is None:
+                    returns = 'lastrowid' if query.strip().upper().startswith('INSERT') else 'rowcount'
+                return cursor.lastrowid if returns == 'lastrowid' else cursor.rowcount
 
 def execute_many(query, params_list):
     """Execute a query with multiple parameter sets"""
     with get_db_connection() as connection:
         with connection.cursor() as cursor:
             cursor.executemany(query, params_list)
-            connection.commit()
-            return cursor.rowcount
\ No newline at end of file
+            if not _in_transaction() and not connection.get_autocommit():
+                connection.commit()
+            return cursor.rowcount
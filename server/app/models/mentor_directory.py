@@ -0,0 +1,132 @@
+import json
+import re
+from app.models.database import execute_query, execute_many, transaction
+from app.utils.cache import TTLCache
+from app.utils.counts import COUNT_CACHE_TTL, invalidate_counts
+from app.utils.mentor_matching import mentors_changed
+
+# Expertise facet counts keyed by (where_clause, params)
+_facets = TTLCache(maxsize=256, ttl=COUNT_CACHE_TTL)
+
+def parse_list(value):
+    if not value:
+        return []
+    try:
+        items = json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return [str(item).strip() for item in items if str(item).strip()]
+
+def normalize_expertise(value):
+    return value.strip().lower()[:100]
+
+def expertise_terms(value):
+    """Words of an expertise value, e.g. "Python, Django" -> ['python', 'django']"""
+    return [term.rstrip('.')[:50] for term in re.findall(r'[a-z0-9][a-z0-9+#.]*', normalize_expertise(value))]
+
+def refresh_mentor(mentor_id):
+    """Recompute one mentor's directory row and expertise set from the source tables.
+
+    Called by the endpoints that change a mentor's profile, programs,
+    sessions or feedback; users who are not active alumni/mentors are
+    removed from the directory.
+    """
+    with transaction():
+        mentor = execute_query("""
+            SELECT user_id, first_name, last_name, current_position, current_company,
+                   location, bio, skills, linkedin_url, profile_image, graduation_year
+            FROM users
+            WHERE user_id = %s AND is_active = TRUE AND role IN ('alumni', 'mentor')
+        """, (mentor_id,), fetch_one=True)
+
+        if not mentor:
+            execute_query("DELETE FROM mentor_expertise_terms WHERE mentor_id = %s", (mentor_id,))
+            execute_query("DELETE FROM mentor_expertise WHERE mentor_id = %s", (mentor_id,))
+            execute_query("DELETE FROM mentor_directory WHERE mentor_id = %s", (mentor_id,))
+        else:
+            stats = execute_query("""
+                SELECT
+                    (SELECT COUNT(*) FROM mentorship_programs
+                     WHERE mentor_id = %s AND is_active = TRUE) as program_count,
+                    (SELECT COUNT(*) FROM mentorship_sessions WHERE mentor_id = %s) as session_count,
+                    (SELECT COUNT(feedback_rating) FROM mentorship_sessions WHERE mentor_id = %s) as rating_count,
+                    (SELECT AVG(feedback_rating) FROM mentorship_sessions WHERE mentor_id = %s) as average_rating
+            """, (mentor_id, mentor_id, mentor_id, mentor_id), fetch_one=True)
+
+            programs = execute_query(
+                "SELECT expertise_areas FROM mentorship_programs WHERE mentor_id = %s AND is_active = TRUE",
+                (mentor_id,)
+            )
+            expertise = {normalize_expertise(skill) for skill in parse_list(mentor['skills'])}
+            for program in programs:
+                expertise.update(normalize_expertise(area) for area in parse_list(program['expertise_areas']))
+            expertise.discard('')
+
+            execute_query("""
+                INSERT INTO mentor_directory (
+                    mentor_id, first_name, last_name, current_position, current_company,
+                    location, bio, skills, linkedin_url, profile_image, graduation_year,
+                    program_count, session_count, rating_count, average_rating
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    first_name = VALUES(first_name), last_name = VALUES(last_name),
+                    current_position = VALUES(current_position), current_company = VALUES(current_company),
+                    location = VALUES(location), bio = VALUES(bio), skills = VALUES(skills),
+                    linkedin_url = VALUES(linkedin_url), profile_image = VALUES(profile_image),
+                    graduation_year = VALUES(graduation_year), program_count = VALUES(program_count),
+                    session_count = VALUES(session_count), rating_count = VALUES(rating_count),
+                    average_rating = VALUES(average_rating)
+            """, (
+                mentor_id, mentor['first_name'], mentor['last_name'], mentor['current_position'],
+                mentor['current_company'], mentor['location'], mentor['bio'], mentor['skills'],
+                mentor['linkedin_url'], mentor['profile_image'], mentor['graduation_year'],
+                stats['program_count'], stats['session_count'], stats['rating_count'],
+                stats['average_rating']
+            ))
+
+            execute_query("DELETE FROM mentor_expertise WHERE mentor_id = %s", (mentor_id,))
+            execute_query("DELETE FROM mentor_expertise_terms WHERE mentor_id = %s", (mentor_id,))
+            if expertise:
+                execute_many(
+                    "INSERT INTO mentor_expertise (expertise, mentor_id) VALUES (%s, %s)",
+                    [(area, mentor_id) for area in sorted(expertise)]
+                )
+                terms = {term for area in expertise for term in expertise_terms(area)}
+                execute_many(
+                    "INSERT INTO mentor_expertise_terms (term, mentor_id) VALUES (%s, %s)",
+                    [(term, mentor_id) for term in sorted(terms)]
+                )
+
+    invalidate_counts('mentor_directory')
+    _facets.clear()
+    mentors_changed()
+
+def rebuild_directory():
+    """Refresh every alumni/mentor and drop rows for users who no longer qualify"""
+    mentors = execute_query("""
+        SELECT user_id as mentor_id FROM users WHERE is_active = TRUE AND role IN ('alumni', 'mentor')
+        UNION
+        SELECT mentor_id FROM mentor_directory
+    """)
+    for row in mentors:
+        refresh_mentor(row['mentor_id'])
+    return len(mentors)
+
+def expertise_facets(where_clause, params, limit=20):
+    """Most common expertise values among mentors matching where_clause"""
+    key = (where_clause, tuple(params), limit)
+    facets = _facets.get(key)
+    if facets is None:
+        facets = execute_query(f"""
+            SELECT e.expertise as value, COUNT(*) as count
+            FROM mentor_expertise e
+            JOIN mentor_directory d ON e.mentor_id = d.mentor_id
+            WHERE {where_clause}
+            GROUP BY e.expertise
+            ORDER BY count DESC, e.expertise ASC
+            LIMIT %s
+        """, list(params) + [limit])
+        _facets.set(key, facets)
+    return facets
@@ -0,0 +1,67 @@
+import os
+from app.models.database import execute_query
+
+# Reconciliation job settings
+UNREAD_RECONCILE_INTERVAL = float(os.environ.get('UNREAD_RECONCILE_INTERVAL', 3600))  # seconds, 0 disables
+UNREAD_RECONCILE_BATCH = int(os.environ.get('UNREAD_RECONCILE_BATCH', 1000))  # users per batch
+
+def adjust_unread(user_id, delta):
+    """Write-through change to a user's unread badge counter"""
+    if not delta:
+        return
+    execute_query("""
+        INSERT INTO user_message_counters (user_id, unread_count)
+        VALUES (%s, GREATEST(%s, 0))
+        ON DUPLICATE KEY UPDATE unread_count = GREATEST(unread_count + %s, 0)
+    """, (user_id, delta, delta))
+
+def get_unread_count(user_id):
+    """Unread messages for user_id (a primary-key lookup)"""
+    row = execute_query(
+        "SELECT unread_count FROM user_message_counters WHERE user_id = %s",
+        (user_id,), fetch_one=True
+    )
+    return row['unread_count'] if row else 0
+
+def reconcile_unread_counts(batch_size=None):
+    """Recompute unread counters from messages, one user_id range at a time.
+
+    Fixes drift in both user_message_counters and conversations.unread_count.
+    Returns the number of rows MySQL reports as changed.
+    """
+    batch_size = batch_size or UNREAD_RECONCILE_BATCH
+    max_user = execute_query("SELECT MAX(user_id) as max_id FROM users", fetch_one=True)['max_id'] or 0
+
+    corrected = 0
+    for start in range(0, max_user + 1, batch_size):
+        end = start + batch_size - 1
+
+        corrected += execute_query("""
+            UPDATE conversations c
+            SET c.unread_count = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.sender_id = c.other_user_id AND m.recipient_id = c.user_id AND m.is_read = FALSE
+            )
+            WHERE c.user_id BETWEEN %s AND %s
+        """, (start, end))
+
+        # Users with unread messages: set the exact count
+        corrected += execute_query("""
+            INSERT INTO user_message_counters (user_id, unread_count)
+            SELECT recipient_id, COUNT(*) FROM messages
+            WHERE recipient_id BETWEEN %s AND %s AND is_read = FALSE
+            GROUP BY recipient_id
+            ON DUPLICATE KEY UPDATE unread_count = VALUES(unread_count)
+        """, (start, end))
+
+        # Users with none left: zero out stale counters
+        corrected += execute_query("""
+            UPDATE user_message_counters c
+            SET c.unread_count = 0
+            WHERE c.user_id BETWEEN %s AND %s AND c.unread_count <> 0
+              AND NOT EXISTS (
+                  SELECT 1 FROM messages m WHERE m.recipient_id = c.user_id AND m.is_read = FALSE
+              )
+        """, (start, end))
+
+    return corrected
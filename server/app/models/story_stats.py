@@ -0,0 +1,199 @@
+import atexit
+import logging
+import os
+import threading
+from app.models.database import execute_query, execute_many, transaction
+from app.utils.bloom import RotatingBloomFilter
+
+# Write-behind view counting (per worker process)
+STORY_VIEW_FLUSH_INTERVAL = float(os.environ.get('STORY_VIEW_FLUSH_INTERVAL', 10))  # seconds
+STORY_VIEW_DEDUP_WINDOW = float(os.environ.get('STORY_VIEW_DEDUP_WINDOW', 0))  # seconds, 0 counts every view
+STORY_VIEW_DEDUP_CAPACITY = int(os.environ.get('STORY_VIEW_DEDUP_CAPACITY', 100000))  # distinct views per window
+FLUSH_BATCH_SIZE = 500
+
+# Like counter reconciliation
+STORY_LIKES_RECONCILE_INTERVAL = float(os.environ.get('STORY_LIKES_RECONCILE_INTERVAL', 3600))  # seconds, 0 disables
+STORY_LIKES_RECONCILE_BATCH = int(os.environ.get('STORY_LIKES_RECONCILE_BATCH', 5000))  # stories per batch
+
+logger = logging.getLogger(__name__)
+
+class ViewBuffer:
+    """Pending view increments per story, drained by flush()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # story_id -> views not yet written
+        self.flushed = 0
+        self.flushes = 0
+        self.duplicates = 0
+
+    def add(self, story_id, count=1):
+        with self._lock:
+            self._pending[story_id] = self._pending.get(story_id, 0) + count
+
+    def pending(self, story_id):
+        return self._pending.get(story_id, 0)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending):
+        # A failed flush puts its counts back so they go out with the next one
+        with self._lock:
+            for story_id, count in pending.items():
+                self._pending[story_id] = self._pending.get(story_id, 0) + count
+
+    def stats(self):
+        return {
+            'pending_stories': len(self._pending),
+            'pending_views': sum(self._pending.values()),
+            'flushed_views': self.flushed,
+            'flushes': self.flushes,
+            'duplicate_views': self.duplicates
+        }
+
+_buffer = ViewBuffer()
+_seen = (
+    RotatingBloomFilter(STORY_VIEW_DEDUP_WINDOW, STORY_VIEW_DEDUP_CAPACITY)
+    if STORY_VIEW_DEDUP_WINDOW > 0 else None
+)
+
+def record_view(story_id, viewer=None):
+    """Count a view in memory; repeat views by the same viewer inside
+    STORY_VIEW_DEDUP_WINDOW are (probabilistically) ignored. Returns
+    whether the view was counted."""
+    if _seen is not None and viewer is not None and not _seen.add(f"{story_id}:{viewer}"):
+        _buffer.duplicates += 1
+        return False
+    _buffer.add(story_id)
+    return True
+
+def pending_views(story_id):
+    """Views of story_id counted in this process but not yet written"""
+    return _buffer.pending(story_id)
+
+def flush_story_views():
+    """Write buffered views with one multi-row UPDATE per batch of stories"""
+    pending = _buffer.drain()
+    if not pending:
+        return 0
+
+    # Sorted so concurrent flushes from several workers lock rows in the same order
+    items = sorted(pending.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+        placeholders = ', '.join(['%s'] * len(batch))
+        params = [value for item in batch for value in item] + [story_id for story_id, _ in batch]
+        try:
+            execute_query(f"""
+                UPDATE success_stories
+                SET views_count = views_count + CASE story_id {cases} ELSE 0 END
+                WHERE story_id IN ({placeholders})
+            """, params)
+        except Exception:
+            _buffer.restore(dict(items[start:]))
+            raise
+        _buffer.flushed += sum(count for _, count in batch)
+    _buffer.flushes += 1
+    return len(items)
+
+def add_like(story_id, user_id):
+    """Like a published story; returns the new likes_count, or None if
+    the user already liked it or the story does not exist.
+
+    The happy path is two statements: an INSERT IGNORE ... SELECT that only
+    inserts for a published story, and an UPDATE that returns the new count
+    through LAST_INSERT_ID(expr) instead of a follow-up SELECT.
+    """
+    with transaction():
+        inserted = execute_query("""
+            INSERT IGNORE INTO story_likes (story_id, user_id)
+            SELECT story_id, %s FROM success_stories WHERE story_id = %s AND is_published = TRUE
+        """, (user_id, story_id), returns='rowcount')
+        if not inserted:
+            return None
+        return execute_query(
+            "UPDATE success_stories SET likes_count = LAST_INSERT_ID(likes_count + 1) WHERE story_id = %s",
+            (story_id,), returns='lastrowid'
+        )
+
+def remove_like(story_id, user_id):
+    """Withdraw a like; returns (new likes_count, unix time the like was
+    made), or None if there was none"""
+    with transaction():
+        like = execute_query(
+            "SELECT like_id, UNIX_TIMESTAMP(created_at) as liked_ts FROM story_likes WHERE story_id = %s AND user_id = %s FOR UPDATE",
+            (story_id, user_id), fetch_one=True
+        )
+        if not like:
+            return None
+        execute_query("DELETE FROM story_likes WHERE like_id = %s", (like['like_id'],))
+        likes_count = execute_query(
+            "UPDATE success_stories SET likes_count = LAST_INSERT_ID(GREATEST(likes_count - 1, 0)) WHERE story_id = %s",
+            (story_id,), returns='lastrowid'
+        )
+        return likes_count, float(like['liked_ts'])
+
+def get_like_state(story_id, user_id):
+    """Current count and whether user_id has liked it, or None if unpublished"""
+    return execute_query("""
+        SELECT s.likes_count,
+               EXISTS(SELECT 1 FROM story_likes sl WHERE sl.story_id = s.story_id AND sl.user_id = %s) as liked
+        FROM success_stories s
+        WHERE s.story_id = %s AND s.is_published = TRUE
+    """, (user_id, story_id), fetch_one=True)
+
+def reconcile_story_likes(batch_size=None):
+    """Repair likes_count drift from story_likes, one story_id range at a time.
+
+    Drift is measured in one consistent read and applied as a delta, so a
+    like or unlike committed meanwhile (which moves both sides together)
+    is kept without locking the stories. Returns the number of stories
+    whose count was corrected.
+    """
+    batch_size = batch_size or STORY_LIKES_RECONCILE_BATCH
+    max_story = execute_query("SELECT MAX(story_id) as max_id FROM success_stories", fetch_one=True)['max_id'] or 0
+
+    corrected = 0
+    for start in range(0, max_story + 1, batch_size):
+        end = start + batch_size - 1
+        drifted = execute_query("""
+            SELECT s.story_id, COALESCE(l.likes, 0) - s.likes_count as drift
+            FROM success_stories s
+            LEFT JOIN (
+                SELECT story_id, COUNT(*) as likes FROM story_likes
+                WHERE story_id BETWEEN %s AND %s
+                GROUP BY story_id
+            ) l ON l.story_id = s.story_id
+            WHERE s.story_id BETWEEN %s AND %s AND s.likes_count <> COALESCE(l.likes, 0)
+        """, (start, end, start, end))
+        if drifted:
+            execute_many(
+                "UPDATE success_stories SET likes_count = GREATEST(likes_count + %s, 0) WHERE story_id = %s",
+                [(row['drift'], row['story_id']) for row in drifted]
+            )
+            corrected += len(drifted)
+
+    return corrected
+
+def get_view_buffer_stats():
+    return _buffer.stats()
+
+def _flush_at_exit():
+    try:
+        flush_story_views()
+    except Exception:
+        logger.exception('Could not flush %d buffered story views at exit', get_view_buffer_stats()['pending_views'])
+
+atexit.register(_flush_at_exit)
+
+def _reset_views_after_fork():
+    # The parent still owns (and flushes) anything buffered before the fork
+    global _buffer
+    _buffer = ViewBuffer()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_views_after_fork)
@@ -0,0 +1,165 @@
+from pymysql.err import IntegrityError
+from app.models.database import execute_query, transaction
+
+class AlreadyRegistered(Exception):
+    pass
+
+class WebinarNotFound(Exception):
+    pass
+
+def _lock_webinar(webinar_id):
+    # Queueing, releases and capacity changes take the webinar row lock, so
+    # "full, join the waitlist" and "seat freed, promote the next waiter"
+    # never interleave
+    webinar = execute_query(
+        "SELECT max_participants, seats_taken FROM webinars WHERE webinar_id = %s FOR UPDATE",
+        (webinar_id,), fetch_one=True
+    )
+    if not webinar:
+        raise WebinarNotFound()
+    return webinar
+
+def _promote_waiters(webinar_id, count):
+    """Move up to count earliest waiters into registrations; returns their user ids.
+
+    Caller holds the webinar row lock and adjusts seats_taken.
+    """
+    promoted = []
+    while len(promoted) < count:
+        waiters = execute_query("""
+            SELECT waitlist_id, user_id FROM webinar_waitlist
+            WHERE webinar_id = %s
+            ORDER BY waitlist_id ASC
+            LIMIT %s
+        """, (webinar_id, count - len(promoted)))
+        if not waiters:
+            break
+        for waiter in waiters:
+            execute_query("DELETE FROM webinar_waitlist WHERE waitlist_id = %s", (waiter['waitlist_id'],))
+            inserted = execute_query(
+                "INSERT IGNORE INTO webinar_registrations (webinar_id, user_id) VALUES (%s, %s)",
+                (webinar_id, waiter['user_id']), returns='rowcount'
+            )
+            if inserted:
+                promoted.append(waiter['user_id'])
+    return promoted
+
+def register_seat(webinar_id, user_id):
+    """Register user_id for a webinar, or queue them when every seat is taken.
+
+    The seat is claimed by one conditional UPDATE, issued last so the hot
+    webinars row is only locked until commit; duplicates are caught by the
+    registrations unique key. Only a full webinar takes the row lock
+    (_lock_webinar) before queueing, so a seat released concurrently is
+    either seen here or goes to this user once they are queued. Returns
+    None when a seat was claimed, otherwise the user's 1-based waitlist
+    position. Raises AlreadyRegistered or WebinarNotFound (nothing written).
+    """
+    with transaction():
+        try:
+            execute_query(
+                "INSERT INTO webinar_registrations (webinar_id, user_id) VALUES (%s, %s)",
+                (webinar_id, user_id)
+            )
+        except IntegrityError as e:
+            if e.args[0] == 1062:  # ER_DUP_ENTRY
+                raise AlreadyRegistered()
+            if e.args[0] == 1452:  # ER_NO_REFERENCED_ROW_2
+                raise WebinarNotFound()
+            raise
+
+        claimed = execute_query("""
+            UPDATE webinars
+            SET seats_taken = seats_taken + 1
+            WHERE webinar_id = %s AND seats_taken < max_participants
+        """, (webinar_id,))
+
+        if not claimed:
+            webinar = _lock_webinar(webinar_id)
+            if webinar['seats_taken'] >= webinar['max_participants']:
+                execute_query(
+                    "DELETE FROM webinar_registrations WHERE webinar_id = %s AND user_id = %s",
+                    (webinar_id, user_id)
+                )
+                execute_query(
+                    "INSERT IGNORE INTO webinar_waitlist (webinar_id, user_id) VALUES (%s, %s)",
+                    (webinar_id, user_id)
+                )
+                return waitlist_position(webinar_id, user_id)
+            # A seat was released between the UPDATE and the lock
+            execute_query(
+                "UPDATE webinars SET seats_taken = seats_taken + 1 WHERE webinar_id = %s",
+                (webinar_id,)
+            )
+
+        execute_query(
+            "DELETE FROM webinar_waitlist WHERE webinar_id = %s AND user_id = %s",
+            (webinar_id, user_id)
+        )
+        return None
+
+def waitlist_position(webinar_id, user_id):
+    """1-based place in the webinar's waitlist, or None if not waiting"""
+    row = execute_query("""
+        SELECT COUNT(*) as position
+        FROM webinar_waitlist w
+        JOIN webinar_waitlist mine ON mine.webinar_id = w.webinar_id AND mine.user_id = %s
+        WHERE w.webinar_id = %s AND w.waitlist_id <= mine.waitlist_id
+    """, (user_id, webinar_id), fetch_one=True)
+    return row['position'] or None
+
+def release_seat(webinar_id, user_id):
+    """Cancel user_id's registration or waitlist entry.
+
+    A freed seat goes straight to the earliest waitlisted user, so
+    seats_taken only drops when nobody is waiting. Returns
+    ('unregistered', promoted_user_id or None), ('left_waitlist', None),
+    or (None, None) if the user held neither.
+    """
+    with transaction():
+        try:
+            _lock_webinar(webinar_id)
+        except WebinarNotFound:
+            return None, None
+
+        removed = execute_query(
+            "DELETE FROM webinar_registrations WHERE webinar_id = %s AND user_id = %s",
+            (webinar_id, user_id)
+        )
+        if not removed:
+            left = execute_query(
+                "DELETE FROM webinar_waitlist WHERE webinar_id = %s AND user_id = %s",
+                (webinar_id, user_id)
+            )
+            return ('left_waitlist', None) if left else (None, None)
+
+        promoted = _promote_waiters(webinar_id, 1)
+        if promoted:
+            # The seat changes hands, so seats_taken is unchanged
+            return 'unregistered', promoted[0]
+
+        execute_query("""
+            UPDATE webinars SET seats_taken = GREATEST(seats_taken - 1, 0)
+            WHERE webinar_id = %s
+        """, (webinar_id,))
+        return 'unregistered', None
+
+def set_capacity(webinar_id, max_participants):
+    """Change max_participants and fill any newly opened seats from the waitlist.
+
+    Lowering capacity below seats_taken keeps existing registrations; new
+    ones wait until enough seats are released. Returns the promoted user ids.
+    """
+    with transaction():
+        webinar = _lock_webinar(webinar_id)
+        execute_query(
+            "UPDATE webinars SET max_participants = %s WHERE webinar_id = %s",
+            (max_participants, webinar_id)
+        )
+        promoted = _promote_waiters(webinar_id, max_participants - webinar['seats_taken'])
+        if promoted:
+            execute_query(
+                "UPDATE webinars SET seats_taken = seats_taken + %s WHERE webinar_id = %s",
+                (len(promoted), webinar_id)
+            )
+        return promoted
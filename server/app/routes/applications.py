@@ -1,9 +1,14 @@
 from flask import Blueprint, request, jsonify
-from app.models.database import execute_query
+from app.models.database import execute_query, transaction
+from app.models.application_status import APPLICATION_STATUSES, bulk_update_statuses
+from app.models.application_stats import record_status_changes, stats_for
 from app.utils.auth import jwt_required_custom, role_required
 
 applications_bp = Blueprint('applications', __name__)
 
+# Most (application_id, status) pairs accepted by one bulk status update
+MAX_BULK_STATUS = 500
+
 @applications_bp.route('', methods=['POST'])
 @jwt_required_custom
 @role_required('student')
@@ -30,7 +35,7 @@ def submit_application():
             
             # Check if opportunity exists and is active
             opportunity = execute_query(
-                "SELECT opportunity_id, application_deadline FROM opportunities WHERE opportunity_id = %s AND is_active = TRUE",
+                "SELECT opportunity_id, application_deadline, posted_by FROM opportunities WHERE opportunity_id = %s AND is_active = TRUE",
                 (data['opportunity_id'],), fetch_one=True
             )
             
@@ -48,6 +53,7 @@ def submit_application():
             
             opportunity_id = data['opportunity_id']
             scholarship_id = None
+            posted_by = opportunity['posted_by']
             
         else:  # scholarship
             if not data.get('scholarship_id'):
@@ -55,7 +61,7 @@ def submit_application():
             
             # Check if scholarship exists and is active
             scholarship = execute_query(
-                "SELECT scholarship_id, application_deadline FROM scholarships WHERE scholarship_id = %s AND is_active = TRUE",
+                "SELECT scholarship_id, application_deadline, posted_by FROM scholarships WHERE scholarship_id = %s AND is_active = TRUE",
                 (data['scholarship_id'],), fetch_one=True
             )
             
@@ -73,18 +79,37 @@ def submit_application():
             
             opportunity_id = None
             scholarship_id = data['scholarship_id']
-        
-        # Create application
-        application_id = execute_query("""
-            INSERT INTO applications (
-                user_id, opportunity_id, scholarship_id, application_type,
-                cover_letter, resume_url, additional_documents
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            user['user_id'], opportunity_id, scholarship_id, application_type,
-            data.get('cover_letter', ''), data.get('resume_url', ''),
-            data.get('additional_documents', '')
-        ))
+            posted_by = scholarship['posted_by']
+        
+        # Create application and count it on the posting and in the stats rollup together
+        with transaction():
+            # Bumping the count first takes the posting's row lock before the
+            # insert's foreign key check, so concurrent submissions queue instead of deadlocking
+            if application_type == 'opportunity':
+                execute_query(
+                    "UPDATE opportunities SET application_count = application_count + 1 WHERE opportunity_id = %s",
+                    (opportunity_id,)
+                )
+            else:
+                execute_query(
+                    "UPDATE scholarships SET application_count = application_count + 1 WHERE scholarship_id = %s",
+                    (scholarship_id,)
+                )
+            
+            application_id = execute_query("""
+                INSERT INTO applications (
+                    user_id, opportunity_id, scholarship_id, application_type,
+                    cover_letter, resume_url, additional_documents
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (
+                user['user_id'], opportunity_id, scholarship_id, application_type,
+                data.get('cover_letter', ''), data.get('resume_url', ''),
+                data.get('additional_documents', '')
+            ))
+            record_status_changes([({
+                'user_id': user['user_id'], 'posted_by': posted_by, 'application_type': application_type,
+                'opportunity_id': opportunity_id, 'scholarship_id': scholarship_id
+            }, None, 'submitted')])
         
         # Get the created application with related information
         if application_type == 'opportunity':
@@ -216,40 +241,63 @@ def update_application_status(application_id):
         if not data.get('status'):
             return jsonify({'error': 'Status is required'}), 400
         
-        valid_statuses = ['submitted', 'under_review', 'shortlisted', 'accepted', 'rejected']
-        if data['status'] not in valid_statuses:
-            return jsonify({'error': f'Status must be one of: {", ".join(valid_statuses)}'}), 400
+        if data['status'] not in APPLICATION_STATUSES:
+            return jsonify({'error': f'Status must be one of: {", ".join(APPLICATION_STATUSES)}'}), 400
         
-        # Get application and check if user owns the related opportunity/scholarship
-        application = execute_query("""
-            SELECT a.application_id, a.application_type,
-                   CASE 
-                       WHEN a.application_type = 'opportunity' THEN o.posted_by
-                       ELSE s.posted_by
-                   END as posted_by
-            FROM applications a
-            LEFT JOIN opportunities o ON a.opportunity_id = o.opportunity_id
-            LEFT JOIN scholarships s ON a.scholarship_id = s.scholarship_id
-            WHERE a.application_id = %s
-        """, (application_id,), fetch_one=True)
+        # Checks ownership and keeps the stats rollup in step with the status
+        result = bulk_update_statuses(user['user_id'], [(application_id, data['status'])])[application_id]
         
-        if not application:
+        if result == 'not_found':
             return jsonify({'error': 'Application not found'}), 404
         
-        if application['posted_by'] != user['user_id']:
+        if result == 'forbidden':
             return jsonify({'error': 'You can only update applications for your own postings'}), 403
         
-        # Update application status
-        execute_query(
-            "UPDATE applications SET status = %s WHERE application_id = %s",
-            (data['status'], application_id)
-        )
-        
         return jsonify({'message': 'Application status updated successfully'}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to update application status', 'details': str(e)}), 500
 
+@applications_bp.route('/bulk', methods=['PATCH'])
+@jwt_required_custom
+@role_required('alumni', 'mentor')
+def bulk_update_application_status():
+    try:
+        user = request.current_user
+        data = request.get_json() or {}
+        
+        updates = data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return jsonify({'error': 'updates must be a non-empty list of {application_id, status}'}), 400
+        if len(updates) > MAX_BULK_STATUS:
+            return jsonify({'error': f'At most {MAX_BULK_STATUS} updates per request'}), 400
+        if not all(isinstance(item, dict) and isinstance(item.get('application_id'), int) for item in updates):
+            return jsonify({'error': 'Each update needs an integer application_id'}), 400
+        
+        pairs = [(item['application_id'], item.get('status')) for item in updates]
+        outcome = bulk_update_statuses(user['user_id'], pairs)
+        
+        # One result per submitted pair, in request order
+        results = []
+        seen = set()
+        for application_id, status in pairs:
+            result = 'duplicate' if application_id in seen else outcome[application_id]
+            seen.add(application_id)
+            results.append({'application_id': application_id, 'status': status, 'result': result})
+        
+        summary = {}
+        for item in results:
+            summary[item['result']] = summary.get(item['result'], 0) + 1
+        
+        return jsonify({
+            'message': 'Application statuses processed',
+            'results': results,
+            'summary': summary
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to update application statuses', 'details': str(e)}), 500
+
 @applications_bp.route('/received', methods=['GET'])
 @jwt_required_custom
 @role_required('alumni', 'mentor')
@@ -315,40 +363,35 @@ def get_received_applications():
 def get_application_stats():
     try:
         user = request.current_user
-        
-        if user['role'] == 'student':
+        opportunity_id = request.args.get('opportunity_id', type=int)
+        scholarship_id = request.args.get('scholarship_id', type=int)
+        
+        # Read from the application_stats rollup maintained by the write paths
+        if opportunity_id or scholarship_id:
+            scope, table, item_id = (
+                ('opportunity', 'opportunities', opportunity_id) if opportunity_id
+                else ('scholarship', 'scholarships', scholarship_id)
+            )
+            posting = execute_query(
+                f"SELECT posted_by FROM {table} WHERE {scope}_id = %s",
+                (item_id,), fetch_one=True
+            )
+            
+            if not posting:
+                return jsonify({'error': 'Posting not found'}), 404
+            
+            if posting['posted_by'] != user['user_id']:
+                return jsonify({'error': 'You can only view statistics for your own postings'}), 403
+            
+            stats = stats_for(scope, item_id)
+            
+        elif user['role'] == 'student':
             # Get student application statistics
-            stats = execute_query("""
-                SELECT 
-                    COUNT(*) as total_applications,
-                    SUM(CASE WHEN status = 'submitted' THEN 1 ELSE 0 END) as submitted,
-                    SUM(CASE WHEN status = 'under_review' THEN 1 ELSE 0 END) as under_review,
-                    SUM(CASE WHEN status = 'shortlisted' THEN 1 ELSE 0 END) as shortlisted,
-                    SUM(CASE WHEN status = 'accepted' THEN 1 ELSE 0 END) as accepted,
-                    SUM(CASE WHEN status = 'rejected' THEN 1 ELSE 0 END) as rejected,
-                    SUM(CASE WHEN application_type = 'opportunity' THEN 1 ELSE 0 END) as opportunity_applications,
-                    SUM(CASE WHEN application_type = 'scholarship' THEN 1 ELSE 0 END) as scholarship_applications
-                FROM applications 
-                WHERE user_id = %s
-            """, (user['user_id'],), fetch_one=True)
+            stats = stats_for('applicant', user['user_id'])
             
         else:
             # Get alumni/mentor application statistics for their postings
-            stats = execute_query("""
-                SELECT 
-                    COUNT(*) as total_applications,
-                    SUM(CASE WHEN a.status = 'submitted' THEN 1 ELSE 0 END) as submitted,
-                    SUM(CASE WHEN a.status = 'under_review' THEN 1 ELSE 0 END) as under_review,
-                    SUM(CASE WHEN a.status = 'shortlisted' THEN 1 ELSE 0 END) as shortlisted,
-                    SUM(CASE WHEN a.status = 'accepted' THEN 1 ELSE 0 END) as accepted,
-                    SUM(CASE WHEN a.status = 'rejected' THEN 1 ELSE 0 END) as rejected,
-                    SUM(CASE WHEN a.application_type = 'opportunity' THEN 1 ELSE 0 END) as opportunity_applications,
-                    SUM(CASE WHEN a.application_type = 'scholarship' THEN 1 ELSE 0 END) as scholarship_applications
-                FROM applications a
-                LEFT JOIN opportunities o ON a.opportunity_id = o.opportunity_id
-                LEFT JOIN scholarships s ON a.scholarship_id = s.scholarship_id
-                WHERE o.posted_by = %s OR s.posted_by = %s
-            """, (user['user_id'], user['user_id']), fetch_one=True)
+            stats = stats_for('poster', user['user_id'])
         
         return jsonify({'stats': stats}), 200
         
@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.database import execute_query
-from app.utils.auth import hash_password, check_password, validate_email, validate_password
+from app.utils.auth import hash_password, check_password, password_needs_rehash, validate_email, validate_password, create_user_token, jwt_required_custom, invalidate_user
+from app.utils.hashing import HashingBusy
+from app.utils.counts import invalidate_counts
+from app.utils.search import sync_document
+from app.utils.connection_graph import user_changed
+from app.models.mentor_directory import refresh_mentor
 import json
 
 auth_bp = Blueprint('auth', __name__)
@@ -71,9 +76,14 @@ def register():
             graduation_year, degree, major, current_company, current_position,
             location, bio, skills, linkedin_url
         ))
+        invalidate_counts('users')
+        sync_document('alumni', user_id)
+        user_changed(user_id)
+        if role in ('alumni', 'mentor'):
+            refresh_mentor(user_id)
         
-        # Create access token
-        access_token = create_access_token(identity=user_id)
+        # Create access token (new accounts start at token version 0)
+        access_token = create_user_token({'user_id': user_id, 'role': role})
         
         # Get user data for response
         user = execute_query("""
@@ -93,6 +103,8 @@ def register():
             'user': user
         }), 201
         
+    except HashingBusy:
+        return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': 'Registration failed', 'details': str(e)}), 500
 
@@ -111,7 +123,7 @@ def login():
         user = execute_query("""
             SELECT user_id, email, password_hash, first_name, last_name, role,
                    graduation_year, degree, major, current_company, current_position,
-                   location, bio, skills, linkedin_url, is_verified, is_active
+                   location, bio, skills, linkedin_url, is_verified, is_active, token_version
             FROM users WHERE email = %s
         """, (email,), fetch_one=True)
         
@@ -125,11 +137,22 @@ def login():
         if not check_password(password, user['password_hash']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
+        # Upgrade hashes made with an old cost factor while we have the plaintext
+        if password_needs_rehash(user['password_hash']):
+            try:
+                execute_query(
+                    "UPDATE users SET password_hash = %s WHERE user_id = %s",
+                    (hash_password(password), user['user_id'])
+                )
+            except HashingBusy:
+                pass
+        
         # Create access token
-        access_token = create_access_token(identity=user['user_id'])
+        access_token = create_user_token(user)
         
-        # Remove password hash from response
+        # Remove password hash and token version from response
         del user['password_hash']
+        del user['token_version']
         
         # Parse skills JSON
         if user['skills']:
@@ -141,6 +164,8 @@ def login():
             'user': user
         }), 200
         
+    except HashingBusy:
+        return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': 'Login failed', 'details': str(e)}), 500
 
@@ -171,8 +196,20 @@ def get_current_user():
         return jsonify({'error': 'Failed to get user info', 'details': str(e)}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
-@jwt_required()
+@jwt_required_custom
 def logout():
-    # In a production app, you might want to blacklist the token
-    # For now, we'll just return a success message
-    return jsonify({'message': 'Logout successful'}), 200
\ No newline at end of file
+    try:
+        user = request.current_user
+        
+        # Access tokens don't expire, so logout revokes every token issued so far:
+        # they carry the old version and fail the check in jwt_required_custom
+        execute_query(
+            "UPDATE users SET token_version = token_version + 1 WHERE user_id = %s",
+            (user['user_id'],)
+        )
+        invalidate_user(user['user_id'])
+        
+        return jsonify({'message': 'Logout successful'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Logout failed', 'details': str(e)}), 500
\ No newline at end of file
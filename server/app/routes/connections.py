@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
-from app.models.database import execute_query
+from pymysql.err import IntegrityError
+from app.models.database import execute_query, transaction
 from app.utils.auth import jwt_required_custom
+from app.utils.connection_graph import get_graph, connection_changed, user_changed
 
 connections_bp = Blueprint('connections', __name__)
 
@@ -38,44 +40,25 @@ def get_connections():
             """, (user['user_id'], status))
             
         else:
-            # All connections (both sent and received)
+            # All connections: one index range per direction, then a single users join
             connections = execute_query("""
                 SELECT c.connection_id, c.status, c.message, c.created_at, c.updated_at,
-                       CASE 
-                           WHEN c.requester_id = %s THEN 'sent'
-                           ELSE 'received'
-                       END as connection_type,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.user_id
-                           ELSE requester.user_id
-                       END as other_user_id,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.first_name
-                           ELSE requester.first_name
-                       END as first_name,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.last_name
-                           ELSE requester.last_name
-                       END as last_name,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.current_position
-                           ELSE requester.current_position
-                       END as current_position,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.current_company
-                           ELSE requester.current_company
-                       END as current_company,
-                       CASE 
-                           WHEN c.requester_id = %s THEN recipient.profile_image
-                           ELSE requester.profile_image
-                       END as profile_image
-                FROM connections c
-                JOIN users requester ON c.requester_id = requester.user_id
-                JOIN users recipient ON c.recipient_id = recipient.user_id
-                WHERE (c.requester_id = %s OR c.recipient_id = %s) AND c.status = %s
+                       c.connection_type, u.user_id as other_user_id, u.first_name, u.last_name,
+                       u.current_position, u.current_company, u.profile_image
+                FROM (
+                    SELECT connection_id, status, message, created_at, updated_at,
+                           'sent' as connection_type, recipient_id as other_user_id
+                    FROM connections
+                    WHERE requester_id = %s AND status = %s
+                    UNION ALL
+                    SELECT connection_id, status, message, created_at, updated_at,
+                           'received' as connection_type, requester_id as other_user_id
+                    FROM connections
+                    WHERE recipient_id = %s AND status = %s
+                ) c
+                JOIN users u ON c.other_user_id = u.user_id
                 ORDER BY c.created_at DESC
-            """, (user['user_id'], user['user_id'], user['user_id'], user['user_id'], 
-                  user['user_id'], user['user_id'], user['user_id'], user['user_id'], user['user_id'], status))
+            """, (user['user_id'], status, user['user_id'], status))
         
         return jsonify({'connections': connections}), 200
         
@@ -106,42 +89,58 @@ def send_connection_request():
         if recipient_id == user['user_id']:
             return jsonify({'error': 'Cannot send connection request to yourself'}), 400
         
-        # Check if connection already exists
-        existing_connection = execute_query("""
-            SELECT connection_id, status FROM connections 
-            WHERE (requester_id = %s AND recipient_id = %s) 
-               OR (requester_id = %s AND recipient_id = %s)
-        """, (user['user_id'], recipient_id, recipient_id, user['user_id']), fetch_one=True)
-        
-        if existing_connection:
-            if existing_connection['status'] == 'accepted':
-                return jsonify({'error': 'You are already connected with this user'}), 409
-            elif existing_connection['status'] == 'pending':
-                return jsonify({'error': 'Connection request already pending'}), 409
-            else:
-                # If previously declined, allow new request
-                execute_query(
-                    "UPDATE connections SET status = 'pending', message = %s WHERE connection_id = %s",
-                    (data.get('message', ''), existing_connection['connection_id'])
-                )
-                return jsonify({'message': 'Connection request sent successfully'}), 200
-        
-        # Create new connection request
-        connection_id = execute_query("""
-            INSERT INTO connections (requester_id, recipient_id, message)
-            VALUES (%s, %s, %s)
-        """, (user['user_id'], recipient_id, data.get('message', '')))
-        
-        # Get the created connection
-        connection = execute_query("""
-            SELECT c.*, 
-                   requester.first_name as requester_first_name, requester.last_name as requester_last_name,
-                   recipient.first_name as recipient_first_name, recipient.last_name as recipient_last_name
-            FROM connections c
-            JOIN users requester ON c.requester_id = requester.user_id
-            JOIN users recipient ON c.recipient_id = recipient.user_id
-            WHERE c.connection_id = %s
-        """, (connection_id,), fetch_one=True)
+        # unique_connection_pair covers both directions, so of two users requesting
+        # each other at the same moment only one insert succeeds
+        try:
+            with transaction():
+                # Check if connection already exists
+                existing_connection = execute_query("""
+                    SELECT connection_id, status FROM connections 
+                    WHERE (requester_id = %s AND recipient_id = %s) 
+                       OR (requester_id = %s AND recipient_id = %s)
+                """, (user['user_id'], recipient_id, recipient_id, user['user_id']), fetch_one=True)
+                
+                if existing_connection:
+                    if existing_connection['status'] == 'accepted':
+                        return jsonify({'error': 'You are already connected with this user'}), 409
+                    elif existing_connection['status'] == 'pending':
+                        return jsonify({'error': 'Connection request already pending'}), 409
+                    
+                    # If previously declined, allow new request (unless a concurrent one got there first)
+                    resent = execute_query(
+                        "UPDATE connections SET status = 'pending', message = %s WHERE connection_id = %s AND status = 'declined'",
+                        (data.get('message', ''), existing_connection['connection_id'])
+                    )
+                    if not resent:
+                        return jsonify({'error': 'Connection request already pending'}), 409
+                    connection = None
+                else:
+                    # Create new connection request
+                    connection_id = execute_query("""
+                        INSERT INTO connections (requester_id, recipient_id, message)
+                        VALUES (%s, %s, %s)
+                    """, (user['user_id'], recipient_id, data.get('message', '')))
+                    
+                    # Get the created connection
+                    connection = execute_query("""
+                        SELECT c.*, 
+                               requester.first_name as requester_first_name, requester.last_name as requester_last_name,
+                               recipient.first_name as recipient_first_name, recipient.last_name as recipient_last_name
+                        FROM connections c
+                        JOIN users requester ON c.requester_id = requester.user_id
+                        JOIN users recipient ON c.recipient_id = recipient.user_id
+                        WHERE c.connection_id = %s
+                    """, (connection_id,), fetch_one=True)
+        except IntegrityError as e:
+            if e.args[0] != 1062:  # ER_DUP_ENTRY
+                raise
+            return jsonify({'error': 'Connection request already pending'}), 409
+        
+        # Only after commit, so the graph never sees a change that was rolled back
+        connection_changed(user['user_id'], recipient['user_id'], 'pending')
+        
+        if connection is None:
+            return jsonify({'message': 'Connection request sent successfully'}), 200
         
         return jsonify({
             'message': 'Connection request sent successfully',
@@ -166,7 +165,7 @@ def respond_to_connection_request(connection_id):
         
         # Get connection and check if user is the recipient
         connection = execute_query(
-            "SELECT connection_id, recipient_id, status FROM connections WHERE connection_id = %s",
+            "SELECT connection_id, requester_id, recipient_id, status FROM connections WHERE connection_id = %s",
             (connection_id,), fetch_one=True
         )
         
@@ -184,6 +183,10 @@ def respond_to_connection_request(connection_id):
             "UPDATE connections SET status = %s WHERE connection_id = %s",
             (data['status'], connection_id)
         )
+        connection_changed(
+            connection['requester_id'], connection['recipient_id'],
+            'accepted' if data['status'] == 'accepted' else None
+        )
         
         action = 'accepted' if data['status'] == 'accepted' else 'declined'
         return jsonify({'message': f'Connection request {action} successfully'}), 200
@@ -211,6 +214,7 @@ def remove_connection(connection_id):
         
         # Delete connection
         execute_query("DELETE FROM connections WHERE connection_id = %s", (connection_id,))
+        connection_changed(connection['requester_id'], connection['recipient_id'], None)
         
         return jsonify({'message': 'Connection removed successfully'}), 200
         
@@ -224,37 +228,99 @@ def get_connection_suggestions():
         user = request.current_user
         limit = int(request.args.get('limit', 10))
         
-        # Get users who are not already connected and have similar interests
-        suggestions = execute_query("""
-            SELECT DISTINCT u.user_id, u.first_name, u.last_name, u.current_position, 
+        # Ranked from the in-memory connection graph (mutual connections, major,
+        # graduation year, shared skills) and cached per user until their graph changes
+        graph = get_graph()
+        if not graph.has_user(user['user_id']):
+            # Joined after this worker loaded the graph
+            user_changed(user['user_id'])
+        ranked = graph.suggest(user['user_id'], limit)
+        if not ranked:
+            return jsonify({'suggestions': []}), 200
+        
+        user_ids = [candidate_id for candidate_id, _, _ in ranked]
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        suggestions = execute_query(f"""
+            SELECT u.user_id, u.first_name, u.last_name, u.current_position, 
                    u.current_company, u.profile_image, u.graduation_year, u.major, u.skills,
                    u.linkedin_url
             FROM users u
-            WHERE u.user_id != %s 
-              AND u.is_active = TRUE
-              AND u.role IN ('alumni', 'mentor', 'student')
-              AND u.user_id NOT IN (
-                  SELECT CASE 
-                      WHEN requester_id = %s THEN recipient_id 
-                      ELSE requester_id 
-                  END
-                  FROM connections 
-                  WHERE (requester_id = %s OR recipient_id = %s) 
-                    AND status IN ('accepted', 'pending')
-              )
-            ORDER BY 
-              CASE WHEN u.major = (SELECT major FROM users WHERE user_id = %s) THEN 1 ELSE 2 END,
-              CASE WHEN u.role != %s THEN 1 ELSE 2 END,
-              RAND()
-            LIMIT %s
-        """, (user['user_id'], user['user_id'], user['user_id'], user['user_id'], 
-              user['user_id'], user['role'], limit))
+            WHERE u.user_id IN ({placeholders}) AND u.is_active = TRUE
+            ORDER BY FIELD(u.user_id, {placeholders})
+        """, user_ids + user_ids)
+        
+        mutual_counts = {candidate_id: mutual for candidate_id, _, mutual in ranked}
+        for suggestion in suggestions:
+            suggestion['mutual_connections'] = mutual_counts.get(suggestion['user_id'], 0)
         
         return jsonify({'suggestions': suggestions}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get connection suggestions', 'details': str(e)}), 500
 
+@connections_bp.route('/mutual/<int:other_user_id>', methods=['GET'])
+@jwt_required_custom
+def get_mutual_connections(other_user_id):
+    try:
+        user = request.current_user
+        limit = int(request.args.get('limit', 50))
+        
+        # Set intersection on the in-memory connection graph
+        mutual_ids = get_graph().mutual(user['user_id'], other_user_id)
+        
+        mutual = []
+        if mutual_ids[:limit]:
+            placeholders = ', '.join(['%s'] * len(mutual_ids[:limit]))
+            mutual = execute_query(f"""
+                SELECT user_id, first_name, last_name, current_position, current_company,
+                       profile_image, graduation_year, major
+                FROM users
+                WHERE user_id IN ({placeholders}) AND is_active = TRUE
+                ORDER BY first_name ASC, last_name ASC
+            """, mutual_ids[:limit])
+        
+        return jsonify({
+            'mutual_connections': mutual,
+            'count': len(mutual_ids)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get mutual connections', 'details': str(e)}), 500
+
+@connections_bp.route('/path/<int:other_user_id>', methods=['GET'])
+@jwt_required_custom
+def get_connection_path(other_user_id):
+    try:
+        user = request.current_user
+        
+        target = execute_query(
+            "SELECT user_id FROM users WHERE user_id = %s AND is_active = TRUE",
+            (other_user_id,), fetch_one=True
+        )
+        if not target:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # Bidirectional BFS over accepted connections
+        path_ids = get_graph().shortest_path(user['user_id'], other_user_id)
+        if path_ids is None:
+            return jsonify({'degree': None, 'path': []}), 200
+        
+        placeholders = ', '.join(['%s'] * len(path_ids))
+        users = execute_query(f"""
+            SELECT user_id, first_name, last_name, current_position, current_company, profile_image
+            FROM users
+            WHERE user_id IN ({placeholders})
+        """, path_ids)
+        users_by_id = {row['user_id']: row for row in users}
+        
+        return jsonify({
+            'degree': len(path_ids) - 1,
+            'path': [users_by_id.get(user_id, {'user_id': user_id}) for user_id in path_ids]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get connection path', 'details': str(e)}), 500
+
 @connections_bp.route('/stats', methods=['GET'])
 @jwt_required_custom
 def get_connection_stats():
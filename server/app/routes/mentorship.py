@@ -1,11 +1,24 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import execute_query
 from app.utils.auth import jwt_required_custom, role_required
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document
+from app.models.mentor_directory import refresh_mentor, normalize_expertise, expertise_terms, expertise_facets, parse_list
+from app.utils.mentor_matching import get_engine
 from datetime import datetime
 import json
 
 mentorship_bp = Blueprint('mentorship', __name__)
 
+MAX_MATCHES = 50
+
+# Keyset order for cursor pagination: newest first, id breaks ties
+PROGRAM_SORT = [
+    SortKey('mp.created_at', 'created_at', descending=True),
+    SortKey('mp.program_id', 'program_id', descending=True)
+]
+
 @mentorship_bp.route('/programs', methods=['GET'])
 def get_mentorship_programs():
     try:
@@ -20,10 +33,18 @@ def get_mentorship_programs():
         conditions = ["mp.is_active = TRUE"]
         params = []
         
+        order_by = "mp.created_at DESC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(mp.title LIKE %s OR mp.description LIKE %s OR u.first_name LIKE %s OR u.last_name LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param, search_param])
+            match = search_filter('mentorship_programs', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         if expertise:
             conditions.append("mp.expertise_areas LIKE %s")
@@ -31,8 +52,7 @@ def get_mentorship_programs():
         
         where_clause = " AND ".join(conditions)
         
-        # Get mentorship programs with mentor information
-        programs = execute_query(f"""
+        select_sql = """
             SELECT mp.program_id, mp.title, mp.description, mp.expertise_areas,
                    mp.max_mentees, mp.duration_weeks, mp.created_at,
                    u.user_id as mentor_id, u.first_name, u.last_name, u.current_position,
@@ -40,10 +60,29 @@ def get_mentorship_programs():
                    (SELECT COUNT(*) FROM mentorship_sessions ms WHERE ms.program_id = mp.program_id) as current_mentees
             FROM mentorship_programs mp
             JOIN users u ON mp.mentor_id = u.user_id
-            WHERE {where_clause}
-            ORDER BY mp.created_at DESC
-            LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """
+        
+        if 'cursor' in request.args and not ranked:
+            # Cursor mode seeks past the last row seen instead of using OFFSET
+            programs, pagination = keyset_paginate(
+                select_sql, where_clause, params, PROGRAM_SORT, request.args['cursor'], limit
+            )
+        else:
+            # Get mentorship programs with mentor information
+            programs = execute_query(f"""
+                {select_sql}
+                WHERE {where_clause}
+                ORDER BY {order_by}
+                LIMIT %s OFFSET %s
+            """, params + order_params + [limit, offset])
+            
+            # Get total count; the users join is only needed when searching mentor names
+            count_from = "mentorship_programs mp JOIN users u ON mp.mentor_id = u.user_id" if search else "mentorship_programs mp"
+            pagination = offset_pagination(page, limit, 'mentorship_programs', f"""
+                SELECT COUNT(*) as count 
+                FROM {count_from}
+                WHERE {where_clause}
+            """, params, filtered=len(conditions) > 1)
         
         # Parse expertise areas JSON
         for program in programs:
@@ -53,24 +92,13 @@ def get_mentorship_programs():
                 except:
                     program['expertise_areas'] = []
         
-        # Get total count
-        total = execute_query(f"""
-            SELECT COUNT(*) as count 
-            FROM mentorship_programs mp
-            JOIN users u ON mp.mentor_id = u.user_id
-            WHERE {where_clause}
-        """, params, fetch_one=True)['count']
-        
         return jsonify({
             'programs': programs,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get mentorship programs', 'details': str(e)}), 500
 
@@ -114,6 +142,9 @@ def create_mentorship_program():
             user['user_id'], data['title'], data['description'],
             json.dumps(expertise_areas), max_mentees, duration_weeks
         ))
+        invalidate_counts('mentorship_programs')
+        sync_document('mentorship_programs', program_id)
+        refresh_mentor(user['user_id'])
         
         # Get the created program
         program = execute_query("""
@@ -226,6 +257,7 @@ def request_mentorship():
             data['title'], data['description'], data['session_type'],
             scheduled_date, data.get('duration_minutes', 60)
         ))
+        refresh_mentor(mentor['user_id'])
         
         # Get the created session
         session = execute_query("""
@@ -340,6 +372,7 @@ def submit_feedback(session_id):
             SET feedback_rating = %s, feedback_comment = %s 
             WHERE session_id = %s
         """, (rating, data.get('feedback_comment', ''), session_id))
+        refresh_mentor(session['mentor_id'])
         
         return jsonify({'message': 'Feedback submitted successfully'}), 200
         
@@ -349,38 +382,41 @@ def submit_feedback(session_id):
 @mentorship_bp.route('/mentors', methods=['GET'])
 def get_available_mentors():
     try:
+        page = int(request.args.get('page', 1))
+        limit = int(request.args.get('limit', 20))
         expertise = request.args.get('expertise', '')
         search = request.args.get('search', '')
         
-        # Build query conditions
-        conditions = ["u.role IN ('alumni', 'mentor')", "u.is_active = TRUE"]
+        offset = (page - 1) * limit
+        
+        # Build query conditions against the precomputed mentor directory
+        conditions = ["1 = 1"]
         params = []
         
         if search:
-            conditions.append("(u.first_name LIKE %s OR u.last_name LIKE %s OR u.current_company LIKE %s)")
+            conditions.append("(d.first_name LIKE %s OR d.last_name LIKE %s OR d.current_company LIKE %s)")
             search_param = f"%{search}%"
             params.extend([search_param, search_param, search_param])
         
-        if expertise:
-            conditions.append("(u.skills LIKE %s OR mp.expertise_areas LIKE %s)")
-            expertise_param = f"%{expertise}%"
-            params.extend([expertise_param, expertise_param])
+        # Every word of the comma-separated expertise values must be a word of the
+        # mentor's expertise, so "python" finds "Python, Django" (but "java" is not
+        # "javascript") and a facet value drills down to itself
+        for term in dict.fromkeys(term for value in expertise.split(',') for term in expertise_terms(value)):
+            conditions.append("d.mentor_id IN (SELECT mentor_id FROM mentor_expertise_terms WHERE term = %s)")
+            params.append(term)
         
         where_clause = " AND ".join(conditions)
         
         mentors = execute_query(f"""
-            SELECT DISTINCT u.user_id, u.first_name, u.last_name, u.current_position,
-                   u.current_company, u.location, u.bio, u.skills, u.linkedin_url,
-                   u.profile_image, u.graduation_year,
-                   COUNT(DISTINCT mp.program_id) as program_count,
-                   COUNT(DISTINCT ms.session_id) as session_count
-            FROM users u
-            LEFT JOIN mentorship_programs mp ON u.user_id = mp.mentor_id AND mp.is_active = TRUE
-            LEFT JOIN mentorship_sessions ms ON u.user_id = ms.mentor_id
+            SELECT d.mentor_id as user_id, d.first_name, d.last_name, d.current_position,
+                   d.current_company, d.location, d.bio, d.skills, d.linkedin_url,
+                   d.profile_image, d.graduation_year, d.program_count, d.session_count,
+                   d.rating_count, d.average_rating
+            FROM mentor_directory d
             WHERE {where_clause}
-            GROUP BY u.user_id
-            ORDER BY program_count DESC, session_count DESC, u.first_name ASC
-        """, params)
+            ORDER BY d.program_count DESC, d.session_count DESC, d.first_name ASC, d.mentor_id ASC
+            LIMIT %s OFFSET %s
+        """, params + [limit, offset])
         
         # Parse skills JSON
         for mentor in mentors:
@@ -390,7 +426,63 @@ def get_available_mentors():
                 except:
                     mentor['skills'] = []
         
-        return jsonify({'mentors': mentors}), 200
+        # Get total count (skipped with include_total=false, otherwise cached briefly)
+        pagination = offset_pagination(page, limit, 'mentor_directory', f"""
+            SELECT COUNT(*) as count FROM mentor_directory d WHERE {where_clause}
+        """, params, filtered=len(conditions) > 1)
+        
+        return jsonify({
+            'mentors': mentors,
+            'pagination': pagination,
+            'facets': {'expertise': expertise_facets(where_clause, params)}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get mentors', 'details': str(e)}), 500
+
+@mentorship_bp.route('/matches', methods=['GET'])
+@jwt_required_custom
+def get_mentor_matches():
+    try:
+        user = request.current_user
+        limit = min(int(request.args.get('limit', 10)), MAX_MATCHES)
+        extra_skills = request.args.get('skills', '')
+        
+        mentee = execute_query("""
+            SELECT skills, major, location FROM users WHERE user_id = %s
+        """, (user['user_id'],), fetch_one=True)
+        
+        # Mentee's profile skills plus any extra comma-separated interests
+        expertise = {normalize_expertise(skill) for skill in parse_list(mentee['skills'])}
+        expertise.update(normalize_expertise(skill) for skill in extra_skills.split(','))
+        expertise.discard('')
+        
+        # Scored against every mentor at once (expertise cosine, major, location, open slots)
+        matches = get_engine().match(
+            expertise, mentee['major'], mentee['location'], limit, exclude=user['user_id']
+        )
+        if not matches:
+            return jsonify({'matches': []}), 200
+        
+        mentor_ids = [mentor_id for mentor_id, _, _, _ in matches]
+        placeholders = ', '.join(['%s'] * len(mentor_ids))
+        mentors = execute_query(f"""
+            SELECT d.mentor_id as user_id, d.first_name, d.last_name, d.current_position,
+                   d.current_company, d.location, d.profile_image, d.graduation_year,
+                   d.program_count, d.session_count, d.average_rating
+            FROM mentor_directory d
+            WHERE d.mentor_id IN ({placeholders})
+            ORDER BY FIELD(d.mentor_id, {placeholders})
+        """, mentor_ids + mentor_ids)
+        
+        scored = {mentor_id: (score, breakdown, shared) for mentor_id, score, breakdown, shared in matches}
+        for mentor in mentors:
+            score, breakdown, shared = scored[mentor['user_id']]
+            mentor['match_score'] = score
+            mentor['score_breakdown'] = breakdown
+            mentor['shared_expertise'] = shared
+        
+        return jsonify({'matches': mentors}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to get mentors', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get mentor matches', 'details': str(e)}), 500
\ No newline at end of file
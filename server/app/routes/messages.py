@@ -1,9 +1,24 @@
-from flask import Blueprint, request, jsonify
-from app.models.database import execute_query
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+import time
+from app.models.database import execute_query, transaction, release_request_connection
+from app.models import message_counters
+from app.models.conversations import record_message, mark_read, mark_read_up_to, mark_messages_read, get_user_conversations
 from app.utils.auth import jwt_required_custom
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.broker import MESSAGE_STREAM_HEARTBEAT, MESSAGE_STREAM_MAX_DURATION, get_broker, publish, format_event
 
 messages_bp = Blueprint('messages', __name__)
 
+# Most message ids accepted by one bulk mark-read call
+MAX_BULK_READ = 500
+
+# Keyset order for cursor pagination: newest first, id breaks ties
+MESSAGE_SORT = [
+    SortKey('m.sent_at', 'sent_at', descending=True),
+    SortKey('m.message_id', 'message_id', descending=True)
+]
+
 @messages_bp.route('', methods=['GET'])
 @jwt_required_custom
 def get_messages():
@@ -16,48 +31,51 @@ def get_messages():
         offset = (page - 1) * limit
         
         if message_type == 'sent':
-            messages = execute_query("""
+            select_sql = """
                 SELECT m.message_id, m.subject, m.content, m.is_read, m.sent_at,
                        u.first_name, u.last_name, u.profile_image, u.current_position
                 FROM messages m
                 JOIN users u ON m.recipient_id = u.user_id
-                WHERE m.sender_id = %s
-                ORDER BY m.sent_at DESC
-                LIMIT %s OFFSET %s
-            """, (user['user_id'], limit, offset))
+            """
+            where_clause = "m.sender_id = %s"
         else:
-            messages = execute_query("""
+            select_sql = """
                 SELECT m.message_id, m.subject, m.content, m.is_read, m.sent_at,
                        u.first_name, u.last_name, u.profile_image, u.current_position
                 FROM messages m
                 JOIN users u ON m.sender_id = u.user_id
-                WHERE m.recipient_id = %s
-                ORDER BY m.sent_at DESC
-                LIMIT %s OFFSET %s
-            """, (user['user_id'], limit, offset))
+            """
+            where_clause = "m.recipient_id = %s"
         
-        # Get total count
-        if message_type == 'sent':
-            total = execute_query(
-                "SELECT COUNT(*) as count FROM messages WHERE sender_id = %s",
-                (user['user_id'],), fetch_one=True
-            )['count']
-        else:
-            total = execute_query(
-                "SELECT COUNT(*) as count FROM messages WHERE recipient_id = %s",
-                (user['user_id'],), fetch_one=True
-            )['count']
+        # Cursor mode seeks past the last row seen instead of using OFFSET
+        if 'cursor' in request.args:
+            messages, pagination = keyset_paginate(
+                select_sql, where_clause, [user['user_id']], MESSAGE_SORT, request.args['cursor'], limit
+            )
+            return jsonify({'messages': messages, 'pagination': pagination}), 200
+        
+        messages = execute_query(f"""
+            {select_sql}
+            WHERE {where_clause}
+            ORDER BY m.sent_at DESC
+            LIMIT %s OFFSET %s
+        """, (user['user_id'], limit, offset))
+        
+        # Get total count, cached per user until they send or receive a message
+        count_column = 'sender_id' if message_type == 'sent' else 'recipient_id'
+        pagination = offset_pagination(
+            page, limit, f"messages:{user['user_id']}",
+            f"SELECT COUNT(*) as count FROM messages WHERE {count_column} = %s",
+            [user['user_id']]
+        )
         
         return jsonify({
             'messages': messages,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get messages', 'details': str(e)}), 500
 
@@ -86,25 +104,33 @@ def send_message():
         if recipient['user_id'] == user['user_id']:
             return jsonify({'error': 'Cannot send message to yourself'}), 400
         
-        # Send message
-        message_id = execute_query("""
-            INSERT INTO messages (sender_id, recipient_id, subject, content)
-            VALUES (%s, %s, %s, %s)
-        """, (
-            user['user_id'], data['recipient_id'],
-            data.get('subject', ''), data['content']
-        ))
-        
-        # Get the sent message
-        message = execute_query("""
-            SELECT m.*, 
-                   sender.first_name as sender_first_name, sender.last_name as sender_last_name,
-                   recipient.first_name as recipient_first_name, recipient.last_name as recipient_last_name
-            FROM messages m
-            JOIN users sender ON m.sender_id = sender.user_id
-            JOIN users recipient ON m.recipient_id = recipient.user_id
-            WHERE m.message_id = %s
-        """, (message_id,), fetch_one=True)
+        with transaction():
+            # Send message
+            message_id = execute_query("""
+                INSERT INTO messages (sender_id, recipient_id, subject, content)
+                VALUES (%s, %s, %s, %s)
+            """, (
+                user['user_id'], recipient['user_id'],
+                data.get('subject', ''), data['content']
+            ))
+            
+            # Get the sent message
+            message = execute_query("""
+                SELECT m.*, 
+                       sender.first_name as sender_first_name, sender.last_name as sender_last_name,
+                       recipient.first_name as recipient_first_name, recipient.last_name as recipient_last_name
+                FROM messages m
+                JOIN users sender ON m.sender_id = sender.user_id
+                JOIN users recipient ON m.recipient_id = recipient.user_id
+                WHERE m.message_id = %s
+            """, (message_id,), fetch_one=True)
+            
+            # Keep both inbox summaries current
+            record_message(message)
+        invalidate_counts(f"messages:{user['user_id']}", f"messages:{recipient['user_id']}")
+        
+        # Push to both participants' open streams
+        publish([user['user_id'], recipient['user_id']], 'message', current_app.json.dumps(message))
         
         return jsonify({
             'message': 'Message sent successfully',
@@ -114,6 +140,48 @@ def send_message():
     except Exception as e:
         return jsonify({'error': 'Failed to send message', 'details': str(e)}), 500
 
+@messages_bp.route('/stream', methods=['GET'])
+@jwt_required_custom(locations=['headers', 'query_string'])
+def stream_messages():
+    """Server-Sent Events feed of new messages for the current user"""
+    try:
+        user = request.current_user
+        
+        # EventSource sends Last-Event-ID on reconnect; the query param covers manual resumes
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        broker = get_broker()
+        subscription = broker.subscribe(user['user_id'], last_event_id)
+        
+        # The stream outlives this handler, so hand the pooled connection back now
+        release_request_connection()
+        
+        def generate():
+            # Bounded lifetime: the worker thread is freed and EventSource resumes from Last-Event-ID
+            closes_at = time.monotonic() + MESSAGE_STREAM_MAX_DURATION
+            try:
+                yield 'retry: 3000\n\n'
+                while True:
+                    remaining = closes_at - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    events = subscription.get(timeout=min(MESSAGE_STREAM_HEARTBEAT, remaining))
+                    if not events:
+                        yield ': heartbeat\n\n'
+                        continue
+                    for event in events:
+                        yield format_event(event)
+            finally:
+                broker.unsubscribe(subscription)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to open message stream', 'details': str(e)}), 500
+
 @messages_bp.route('/<int:message_id>', methods=['GET'])
 @jwt_required_custom
 def get_message(message_id):
@@ -142,10 +210,12 @@ def get_message(message_id):
         
         # Mark as read if user is the recipient
         if user['user_id'] == message['recipient_id'] and not message['is_read']:
-            execute_query(
-                "UPDATE messages SET is_read = TRUE WHERE message_id = %s",
-                (message_id,)
-            )
+            with transaction():
+                updated = execute_query(
+                    "UPDATE messages SET is_read = TRUE WHERE message_id = %s AND is_read = FALSE",
+                    (message_id,)
+                )
+                mark_read(user['user_id'], message['sender_id'], updated)
             message['is_read'] = True
         
         return jsonify({'message': message}), 200
@@ -161,7 +231,7 @@ def mark_as_read(message_id):
         
         # Check if message exists and user is the recipient
         message = execute_query(
-            "SELECT recipient_id FROM messages WHERE message_id = %s",
+            "SELECT sender_id, recipient_id FROM messages WHERE message_id = %s",
             (message_id,), fetch_one=True
         )
         
@@ -171,47 +241,87 @@ def mark_as_read(message_id):
         if message['recipient_id'] != user['user_id']:
             return jsonify({'error': 'You can only mark your own received messages as read'}), 403
         
-        # Mark as read
-        execute_query(
-            "UPDATE messages SET is_read = TRUE WHERE message_id = %s",
-            (message_id,)
-        )
+        # Mark as read (only an unread message changes the inbox counter)
+        with transaction():
+            updated = execute_query(
+                "UPDATE messages SET is_read = TRUE WHERE message_id = %s AND is_read = FALSE",
+                (message_id,)
+            )
+            mark_read(user['user_id'], message['sender_id'], updated)
+        if updated:
+            publish_read_receipt(user['user_id'], message['sender_id'], message_ids=[message_id])
         
         return jsonify({'message': 'Message marked as read'}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to mark message as read', 'details': str(e)}), 500
 
+@messages_bp.route('/read', methods=['PUT'])
+@jwt_required_custom
+def mark_many_as_read():
+    """Bulk mark-read: either explicit message_ids or a per-conversation watermark"""
+    try:
+        user = request.current_user
+        data = request.get_json() or {}
+        
+        if 'message_ids' in data:
+            message_ids = data['message_ids']
+            if not isinstance(message_ids, list) or not all(isinstance(i, int) for i in message_ids):
+                return jsonify({'error': 'message_ids must be a list of integers'}), 400
+            if len(message_ids) > MAX_BULK_READ:
+                return jsonify({'error': f'At most {MAX_BULK_READ} message_ids per request'}), 400
+            
+            marked = mark_messages_read(user['user_id'], sorted(set(message_ids)))
+            for sender_id, ids in marked.items():
+                publish_read_receipt(user['user_id'], sender_id, message_ids=ids)
+            return jsonify({
+                'message': 'Messages marked as read',
+                'updated': sum(len(ids) for ids in marked.values())
+            }), 200
+        
+        if 'other_user_id' in data:
+            other_user_id = data['other_user_id']
+            if not isinstance(other_user_id, int):
+                return jsonify({'error': 'other_user_id must be an integer'}), 400
+            if other_user_id == user['user_id']:
+                return jsonify({'error': 'other_user_id cannot be your own id'}), 400
+            
+            up_to_message_id = data.get('up_to_message_id')
+            if up_to_message_id is not None and not isinstance(up_to_message_id, int):
+                return jsonify({'error': 'up_to_message_id must be an integer'}), 400
+            
+            marked, watermark = mark_read_up_to(user['user_id'], other_user_id, up_to_message_id)
+            if marked:
+                publish_read_receipt(user['user_id'], other_user_id, watermark)
+            return jsonify({
+                'message': 'Messages marked as read',
+                'updated': marked,
+                'read_up_to_message_id': watermark
+            }), 200
+        
+        return jsonify({'error': 'message_ids or other_user_id is required'}), 400
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to mark messages as read', 'details': str(e)}), 500
+
+def publish_read_receipt(reader_id, sender_id, up_to_message_id=None, message_ids=None):
+    """Tell the sender's open streams how far the reader has read, or which
+    individual messages (out of order reads don't move the watermark)"""
+    receipt = {'reader_id': reader_id}
+    if up_to_message_id is not None:
+        receipt['up_to_message_id'] = up_to_message_id
+    if message_ids is not None:
+        receipt['message_ids'] = message_ids
+    publish([sender_id], 'read', current_app.json.dumps(receipt))
+
 @messages_bp.route('/conversations', methods=['GET'])
 @jwt_required_custom
 def get_conversations():
     try:
         user = request.current_user
         
-        # Get unique conversations (users the current user has exchanged messages with)
-        conversations = execute_query("""
-            SELECT DISTINCT
-                CASE 
-                    WHEN m.sender_id = %s THEN m.recipient_id
-                    ELSE m.sender_id
-                END as other_user_id,
-                u.first_name, u.last_name, u.profile_image, u.current_position,
-                (SELECT content FROM messages m2 
-                 WHERE (m2.sender_id = %s AND m2.recipient_id = other_user_id) 
-                    OR (m2.sender_id = other_user_id AND m2.recipient_id = %s)
-                 ORDER BY m2.sent_at DESC LIMIT 1) as last_message,
-                (SELECT sent_at FROM messages m2 
-                 WHERE (m2.sender_id = %s AND m2.recipient_id = other_user_id) 
-                    OR (m2.sender_id = other_user_id AND m2.recipient_id = %s)
-                 ORDER BY m2.sent_at DESC LIMIT 1) as last_message_time,
-                (SELECT COUNT(*) FROM messages m2 
-                 WHERE m2.sender_id = other_user_id AND m2.recipient_id = %s AND m2.is_read = FALSE) as unread_count
-            FROM messages m
-            JOIN users u ON (CASE WHEN m.sender_id = %s THEN m.recipient_id ELSE m.sender_id END) = u.user_id
-            WHERE m.sender_id = %s OR m.recipient_id = %s
-            ORDER BY last_message_time DESC
-        """, (user['user_id'], user['user_id'], user['user_id'], user['user_id'], 
-              user['user_id'], user['user_id'], user['user_id'], user['user_id'], user['user_id']))
+        # One row per conversation partner, maintained as messages are sent and read
+        conversations = get_user_conversations(user['user_id'])
         
         return jsonify({'conversations': conversations}), 200
         
@@ -242,12 +352,10 @@ def get_conversation_messages(other_user_id):
             LIMIT %s OFFSET %s
         """, (user['user_id'], other_user_id, other_user_id, user['user_id'], limit, offset))
         
-        # Mark received messages as read
-        execute_query("""
-            UPDATE messages 
-            SET is_read = TRUE 
-            WHERE sender_id = %s AND recipient_id = %s AND is_read = FALSE
-        """, (other_user_id, user['user_id']))
+        # Mark received messages as read (no writes when nothing is unread)
+        marked, watermark = mark_read_up_to(user['user_id'], other_user_id)
+        if marked:
+            publish_read_receipt(user['user_id'], other_user_id, watermark)
         
         # Get other user info
         other_user = execute_query("""
@@ -272,10 +380,8 @@ def get_unread_count():
     try:
         user = request.current_user
         
-        unread_count = execute_query(
-            "SELECT COUNT(*) as count FROM messages WHERE recipient_id = %s AND is_read = FALSE",
-            (user['user_id'],), fetch_one=True
-        )['count']
+        # Maintained counter; reconciled against messages periodically
+        unread_count = message_counters.get_unread_count(user['user_id'])
         
         return jsonify({'unread_count': unread_count}), 200
         
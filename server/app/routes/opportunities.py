@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import execute_query
 from app.utils.auth import jwt_required_custom, role_required
-from datetime import datetime
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document
+from app.utils.deadlines import CLOSING_SOON_MAX_DAYS, EXPIRY_ASSIGNMENT, get_deadline_heap, deadline_changed
+from datetime import datetime, date, timedelta
 
 opportunities_bp = Blueprint('opportunities', __name__)
 
+# Keyset order for cursor pagination: newest first, id breaks ties
+OPPORTUNITY_SORT = [
+    SortKey('o.created_at', 'created_at', descending=True),
+    SortKey('o.opportunity_id', 'opportunity_id', descending=True)
+]
+
 @opportunities_bp.route('', methods=['GET'])
 def get_opportunities():
     try:
@@ -17,8 +27,9 @@ def get_opportunities():
         
         offset = (page - 1) * limit
         
-        # Build query conditions
-        conditions = ["o.is_active = TRUE"]
+        # Build query conditions: is_expired (set by the expire_deadlines job) keeps the scan
+        # to live postings; the deadline check covers rows that expired since its last run
+        conditions = ["o.is_active = TRUE", "o.is_expired = FALSE", "(o.application_deadline IS NULL OR o.application_deadline >= CURDATE())"]
         params = []
         
         if opportunity_type:
@@ -33,44 +44,59 @@ def get_opportunities():
             conditions.append("o.location LIKE %s")
             params.append(f"%{location}%")
         
+        order_by = "o.created_at DESC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(o.title LIKE %s OR o.description LIKE %s OR o.company LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+            match = search_filter('opportunities', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         where_clause = " AND ".join(conditions)
         
-        # Get opportunities with poster information
-        opportunities = execute_query(f"""
+        select_sql = """
             SELECT o.opportunity_id, o.title, o.company, o.type, o.description,
                    o.requirements, o.location, o.salary_range, o.application_deadline,
                    o.created_at, o.updated_at,
                    u.first_name, u.last_name, u.current_position, u.profile_image
             FROM opportunities o
             JOIN users u ON o.posted_by = u.user_id
+        """
+        
+        # Cursor mode seeks past the last row seen instead of using OFFSET
+        if 'cursor' in request.args and not ranked:
+            opportunities, pagination = keyset_paginate(
+                select_sql, where_clause, params, OPPORTUNITY_SORT, request.args['cursor'], limit
+            )
+            return jsonify({'opportunities': opportunities, 'pagination': pagination}), 200
+        
+        # Get opportunities with poster information
+        opportunities = execute_query(f"""
+            {select_sql}
             WHERE {where_clause}
-            ORDER BY o.created_at DESC
+            ORDER BY {order_by}
             LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """, params + order_params + [limit, offset])
         
-        # Get total count
-        total = execute_query(f"""
+        # Get total count (skipped with include_total=false, otherwise cached briefly)
+        pagination = offset_pagination(page, limit, 'opportunities', f"""
             SELECT COUNT(*) as count 
             FROM opportunities o
-            JOIN users u ON o.posted_by = u.user_id
             WHERE {where_clause}
-        """, params, fetch_one=True)['count']
+        """, params, filtered=len(conditions) > 2)
         
         return jsonify({
             'opportunities': opportunities,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get opportunities', 'details': str(e)}), 500
 
@@ -111,6 +137,9 @@ def create_opportunity():
             data.get('requirements', ''), data.get('location', ''),
             data.get('salary_range', ''), application_deadline, user['user_id']
         ))
+        invalidate_counts('opportunities')
+        sync_document('opportunities', opportunity_id)
+        deadline_changed('opportunities', opportunity_id)
         
         # Get the created opportunity
         opportunity = execute_query("""
@@ -189,11 +218,17 @@ def update_opportunity(opportunity_id):
         # Build update query
         set_clause = ', '.join([f"{field} = %s" for field in update_data.keys()])
         values = list(update_data.values()) + [opportunity_id]
+        if 'application_deadline' in update_data:
+            # A new deadline re-opens an expired posting (or expires it if already past)
+            set_clause += f", {EXPIRY_ASSIGNMENT}"
         
         execute_query(
             f"UPDATE opportunities SET {set_clause} WHERE opportunity_id = %s",
             values
         )
+        invalidate_counts('opportunities')
+        sync_document('opportunities', opportunity_id)
+        deadline_changed('opportunities', opportunity_id)
         
         return jsonify({'message': 'Opportunity updated successfully'}), 200
         
@@ -223,6 +258,9 @@ def delete_opportunity(opportunity_id):
             "UPDATE opportunities SET is_active = FALSE WHERE opportunity_id = %s",
             (opportunity_id,)
         )
+        invalidate_counts('opportunities')
+        sync_document('opportunities', opportunity_id)
+        deadline_changed('opportunities', opportunity_id)
         
         return jsonify({'message': 'Opportunity deleted successfully'}), 200
         
@@ -236,9 +274,9 @@ def get_my_opportunities():
     try:
         user = request.current_user
         
+        # application_count is maintained by the application write paths
         opportunities = execute_query("""
-            SELECT o.*, 
-                   (SELECT COUNT(*) FROM applications WHERE opportunity_id = o.opportunity_id) as application_count
+            SELECT o.*
             FROM opportunities o
             WHERE o.posted_by = %s
             ORDER BY o.created_at DESC
@@ -247,4 +285,35 @@ def get_my_opportunities():
         return jsonify({'opportunities': opportunities}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to get your opportunities', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get your opportunities', 'details': str(e)}), 500
+
+@opportunities_bp.route('/closing-soon', methods=['GET'])
+def get_closing_soon_opportunities():
+    try:
+        days = min(int(request.args.get('days', 7)), CLOSING_SOON_MAX_DAYS)
+        limit = int(request.args.get('limit', 10))
+        
+        # Earliest upcoming deadlines from this worker's in-memory min-heap
+        today = date.today()
+        upcoming = get_deadline_heap('opportunities').closing_soon(today + timedelta(days=days), limit)
+        if not upcoming:
+            return jsonify({'opportunities': []}), 200
+        
+        item_ids = [item_id for item_id, _ in upcoming]
+        placeholders = ', '.join(['%s'] * len(item_ids))
+        opportunities = execute_query(f"""
+            SELECT o.opportunity_id, o.title, o.company, o.type, o.location, o.application_deadline,
+                   u.first_name, u.last_name, u.current_position
+            FROM opportunities o
+            JOIN users u ON o.posted_by = u.user_id
+            WHERE o.opportunity_id IN ({placeholders}) AND o.is_active = TRUE
+            ORDER BY FIELD(o.opportunity_id, {placeholders})
+        """, item_ids + item_ids)
+        
+        for opportunity in opportunities:
+            opportunity['days_left'] = (opportunity['application_deadline'] - today).days
+        
+        return jsonify({'opportunities': opportunities}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get opportunities closing soon', 'details': str(e)}), 500
\ No newline at end of file
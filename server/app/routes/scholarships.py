@@ -1,10 +1,22 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import execute_query
 from app.utils.auth import jwt_required_custom, role_required
-from datetime import datetime
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document
+from app.utils.eligibility import eligible_scholarships, scholarships_changed
+from app.utils.deadlines import CLOSING_SOON_MAX_DAYS, EXPIRY_ASSIGNMENT, get_deadline_heap, deadline_changed
+from datetime import datetime, date, timedelta
 
 scholarships_bp = Blueprint('scholarships', __name__)
 
+# Keyset order for cursor pagination: closest deadline first, then largest award
+SCHOLARSHIP_SORT = [
+    SortKey('s.application_deadline', 'application_deadline'),
+    SortKey('s.amount', 'amount', descending=True, nullable=True),
+    SortKey('s.scholarship_id', 'scholarship_id')
+]
+
 @scholarships_bp.route('', methods=['GET'])
 def get_scholarships():
     try:
@@ -16,14 +28,23 @@ def get_scholarships():
         
         offset = (page - 1) * limit
         
-        # Build query conditions
-        conditions = ["s.is_active = TRUE", "s.application_deadline >= CURDATE()"]
+        # Build query conditions: is_expired (set by the expire_deadlines job) keeps the scan
+        # to live postings; the deadline check covers rows that expired since its last run
+        conditions = ["s.is_active = TRUE", "s.is_expired = FALSE", "s.application_deadline >= CURDATE()"]
         params = []
         
+        order_by = "s.application_deadline ASC, s.amount DESC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(s.title LIKE %s OR s.description LIKE %s OR s.organization LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+            match = search_filter('scholarships', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         if organization:
             conditions.append("s.organization LIKE %s")
@@ -39,37 +60,44 @@ def get_scholarships():
         
         where_clause = " AND ".join(conditions)
         
-        # Get scholarships with poster information
-        scholarships = execute_query(f"""
+        select_sql = """
             SELECT s.scholarship_id, s.title, s.organization, s.amount, s.description,
                    s.eligibility_criteria, s.application_deadline, s.application_url,
                    s.created_at, s.updated_at,
                    u.first_name, u.last_name, u.current_position, u.profile_image
             FROM scholarships s
             JOIN users u ON s.posted_by = u.user_id
+        """
+        
+        # Cursor mode seeks past the last row seen instead of using OFFSET
+        if 'cursor' in request.args and not ranked:
+            scholarships, pagination = keyset_paginate(
+                select_sql, where_clause, params, SCHOLARSHIP_SORT, request.args['cursor'], limit
+            )
+            return jsonify({'scholarships': scholarships, 'pagination': pagination}), 200
+        
+        # Get scholarships with poster information
+        scholarships = execute_query(f"""
+            {select_sql}
             WHERE {where_clause}
-            ORDER BY s.application_deadline ASC, s.amount DESC
+            ORDER BY {order_by}
             LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """, params + order_params + [limit, offset])
         
-        # Get total count
-        total = execute_query(f"""
+        # Get total count (skipped with include_total=false, otherwise cached briefly)
+        pagination = offset_pagination(page, limit, 'scholarships', f"""
             SELECT COUNT(*) as count 
             FROM scholarships s
-            JOIN users u ON s.posted_by = u.user_id
             WHERE {where_clause}
-        """, params, fetch_one=True)['count']
+        """, params, filtered=len(conditions) > 2)
         
         return jsonify({
             'scholarships': scholarships,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get scholarships', 'details': str(e)}), 500
 
@@ -114,6 +142,10 @@ def create_scholarship():
             data['eligibility_criteria'], application_deadline,
             data.get('application_url', ''), user['user_id']
         ))
+        invalidate_counts('scholarships')
+        sync_document('scholarships', scholarship_id)
+        scholarships_changed()
+        deadline_changed('scholarships', scholarship_id)
         
         # Get the created scholarship
         scholarship = execute_query("""
@@ -157,26 +189,45 @@ def get_eligible_scholarships():
     try:
         user = request.current_user
         
+        # GPA is not stored on the profile, so GPA requirements are only checked when it is given
+        gpa = None
+        if request.args.get('gpa'):
+            try:
+                gpa = float(request.args['gpa'])
+            except ValueError:
+                return jsonify({'error': 'Invalid gpa format'}), 400
+        
         # Get user profile for eligibility checking
         user_profile = execute_query("""
             SELECT graduation_year, degree, major, skills
             FROM users WHERE user_id = %s
         """, (user['user_id'],), fetch_one=True)
         
-        # For now, return all active scholarships
-        # In a real implementation, you would implement complex eligibility logic
-        scholarships = execute_query("""
-            SELECT s.*, u.first_name, u.last_name, u.current_position,
-                   CASE 
-                       WHEN a.scholarship_id IS NOT NULL THEN TRUE 
-                       ELSE FALSE 
-                   END as already_applied
-            FROM scholarships s
-            JOIN users u ON s.posted_by = u.user_id
-            LEFT JOIN applications a ON s.scholarship_id = a.scholarship_id AND a.user_id = %s
-            WHERE s.is_active = TRUE AND s.application_deadline >= CURDATE()
-            ORDER BY s.application_deadline ASC
-        """, (user['user_id'],))
+        # Profile checked against every open scholarship's compiled criteria at once
+        eligible_ids, gpa_unverified, preferred_ids = eligible_scholarships(user['user_id'], user_profile, gpa)
+        
+        scholarships = []
+        if eligible_ids:
+            placeholders = ', '.join(['%s'] * len(eligible_ids))
+            scholarships = execute_query(f"""
+                SELECT s.*, u.first_name, u.last_name, u.current_position,
+                       CASE 
+                           WHEN a.scholarship_id IS NOT NULL THEN TRUE 
+                           ELSE FALSE 
+                       END as already_applied
+                FROM scholarships s
+                JOIN users u ON s.posted_by = u.user_id
+                LEFT JOIN applications a ON s.scholarship_id = a.scholarship_id AND a.user_id = %s
+                WHERE s.scholarship_id IN ({placeholders})
+                  AND s.is_active = TRUE AND s.is_expired = FALSE AND s.application_deadline >= CURDATE()
+                ORDER BY s.application_deadline ASC
+            """, [user['user_id']] + eligible_ids)
+        
+        unverified = set(gpa_unverified)
+        preferred = set(preferred_ids)
+        for scholarship in scholarships:
+            scholarship['gpa_requirement_unverified'] = scholarship['scholarship_id'] in unverified
+            scholarship['major_preferred'] = scholarship['scholarship_id'] in preferred
         
         return jsonify({
             'scholarships': scholarships,
@@ -236,11 +287,18 @@ def update_scholarship(scholarship_id):
         # Build update query
         set_clause = ', '.join([f"{field} = %s" for field in update_data.keys()])
         values = list(update_data.values()) + [scholarship_id]
+        if 'application_deadline' in update_data:
+            # A new deadline re-opens an expired posting (or expires it if already past)
+            set_clause += f", {EXPIRY_ASSIGNMENT}"
         
         execute_query(
             f"UPDATE scholarships SET {set_clause} WHERE scholarship_id = %s",
             values
         )
+        invalidate_counts('scholarships')
+        sync_document('scholarships', scholarship_id)
+        scholarships_changed()
+        deadline_changed('scholarships', scholarship_id)
         
         return jsonify({'message': 'Scholarship updated successfully'}), 200
         
@@ -254,9 +312,9 @@ def get_my_scholarships():
     try:
         user = request.current_user
         
+        # application_count is maintained by the application write paths
         scholarships = execute_query("""
-            SELECT s.*, 
-                   (SELECT COUNT(*) FROM applications WHERE scholarship_id = s.scholarship_id) as application_count
+            SELECT s.*
             FROM scholarships s
             WHERE s.posted_by = %s
             ORDER BY s.created_at DESC
@@ -265,4 +323,34 @@ def get_my_scholarships():
         return jsonify({'scholarships': scholarships}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to get your scholarships', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get your scholarships', 'details': str(e)}), 500
+
+@scholarships_bp.route('/closing-soon', methods=['GET'])
+def get_closing_soon_scholarships():
+    try:
+        days = min(int(request.args.get('days', 7)), CLOSING_SOON_MAX_DAYS)
+        limit = int(request.args.get('limit', 10))
+        
+        # Earliest upcoming deadlines from this worker's in-memory min-heap
+        today = date.today()
+        upcoming = get_deadline_heap('scholarships').closing_soon(today + timedelta(days=days), limit)
+        if not upcoming:
+            return jsonify({'scholarships': []}), 200
+        
+        item_ids = [item_id for item_id, _ in upcoming]
+        placeholders = ', '.join(['%s'] * len(item_ids))
+        scholarships = execute_query(f"""
+            SELECT s.scholarship_id, s.title, s.organization, s.amount, s.application_deadline,
+                   s.application_url
+            FROM scholarships s
+            WHERE s.scholarship_id IN ({placeholders}) AND s.is_active = TRUE
+            ORDER BY FIELD(s.scholarship_id, {placeholders})
+        """, item_ids + item_ids)
+        
+        for scholarship in scholarships:
+            scholarship['days_left'] = (scholarship['application_deadline'] - today).days
+        
+        return jsonify({'scholarships': scholarships}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get scholarships closing soon', 'details': str(e)}), 500
\ No newline at end of file
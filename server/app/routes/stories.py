@@ -1,10 +1,23 @@
 from flask import Blueprint, request, jsonify
 from app.models.database import execute_query
 from app.utils.auth import jwt_required_custom
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document
+from app.models.story_stats import record_view, pending_views, add_like, remove_like, get_like_state
+from app.utils.trending import get_ranking, story_viewed, story_liked, story_published, story_changed
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 import json
 
 stories_bp = Blueprint('stories', __name__)
 
+# Keyset order for cursor pagination: featured first, then newest
+STORY_SORT = [
+    SortKey('s.is_featured', 'is_featured', descending=True, nullable=True),
+    SortKey('s.created_at', 'created_at', descending=True),
+    SortKey('s.story_id', 'story_id', descending=True)
+]
+
 @stories_bp.route('', methods=['GET'])
 def get_stories():
     try:
@@ -13,9 +26,14 @@ def get_stories():
         category = request.args.get('category', '')
         search = request.args.get('search', '')
         featured_only = request.args.get('featured_only', 'false').lower() == 'true'
+        sort = request.args.get('sort', '')
         
         offset = (page - 1) * limit
         
+        if sort == 'trending' and (search or featured_only):
+            # The in-memory ranking is kept per category only
+            return jsonify({'error': 'sort=trending can only be combined with category'}), 400
+        
         # Build query conditions
         conditions = ["s.is_published = TRUE"]
         params = []
@@ -24,28 +42,77 @@ def get_stories():
             conditions.append("s.category = %s")
             params.append(category)
         
+        order_by = "s.is_featured DESC, s.created_at DESC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(s.title LIKE %s OR s.content LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+            match = search_filter('success_stories', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         if featured_only:
             conditions.append("s.is_featured = TRUE")
         
         where_clause = " AND ".join(conditions)
         
-        # Get stories with author information
-        stories = execute_query(f"""
+        select_sql = """
             SELECT s.story_id, s.title, s.content, s.category, s.tags, s.is_featured,
                    s.likes_count, s.views_count, s.created_at, s.updated_at,
                    u.first_name, u.last_name, u.current_position, u.current_company,
                    u.profile_image, u.graduation_year
             FROM success_stories s
             JOIN users u ON s.author_id = u.user_id
-            WHERE {where_clause}
-            ORDER BY s.is_featured DESC, s.created_at DESC
-            LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """
+        
+        if sort == 'trending':
+            # Served from the in-memory decayed ranking instead of sorting success_stories
+            ranking = get_ranking()
+            ranked = ranking.top(category or None, offset, limit)
+            stories = []
+            if ranked:
+                story_ids = [story_id for story_id, _ in ranked]
+                placeholders = ', '.join(['%s'] * len(story_ids))
+                stories = execute_query(f"""
+                    {select_sql}
+                    WHERE s.story_id IN ({placeholders}) AND s.is_published = TRUE
+                    ORDER BY FIELD(s.story_id, {placeholders})
+                """, story_ids + story_ids)
+                scores = dict(ranked)
+                for story in stories:
+                    story['trending_score'] = scores[story['story_id']]
+            
+            total = ranking.size(category or None)
+            pagination = {
+                'page': page,
+                'limit': limit,
+                'total': total,
+                'pages': (total + limit - 1) // limit
+            }
+        elif 'cursor' in request.args and not ranked:
+            # Cursor mode seeks past the last row seen instead of using OFFSET
+            stories, pagination = keyset_paginate(
+                select_sql, where_clause, params, STORY_SORT, request.args['cursor'], limit
+            )
+        else:
+            # Get stories with author information
+            stories = execute_query(f"""
+                {select_sql}
+                WHERE {where_clause}
+                ORDER BY {order_by}
+                LIMIT %s OFFSET %s
+            """, params + order_params + [limit, offset])
+            
+            # Get total count (skipped with include_total=false, otherwise cached briefly)
+            pagination = offset_pagination(page, limit, 'success_stories', f"""
+                SELECT COUNT(*) as count 
+                FROM success_stories s
+                WHERE {where_clause}
+            """, params, filtered=len(conditions) > 1)
         
         # Parse tags JSON and truncate content for list view
         for story in stories:
@@ -61,24 +128,13 @@ def get_stories():
             else:
                 story['content_preview'] = story['content']
         
-        # Get total count
-        total = execute_query(f"""
-            SELECT COUNT(*) as count 
-            FROM success_stories s
-            JOIN users u ON s.author_id = u.user_id
-            WHERE {where_clause}
-        """, params, fetch_one=True)['count']
-        
         return jsonify({
             'stories': stories,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get stories', 'details': str(e)}), 500
 
@@ -114,6 +170,10 @@ def create_story():
             user['user_id'], data['title'], data['content'], data['category'],
             json.dumps(tags), data.get('is_published', True)
         ))
+        invalidate_counts('success_stories')
+        sync_document('success_stories', story_id)
+        if data.get('is_published', True):
+            story_published(story_id, data['category'])
         
         # Get the created story
         story = execute_query("""
@@ -134,15 +194,20 @@ def create_story():
     except Exception as e:
         return jsonify({'error': 'Failed to create story', 'details': str(e)}), 500
 
+def _viewer_key():
+    # Signed-in viewers are deduplicated by user, anonymous ones by address and client
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity is not None:
+        return f"user:{identity}"
+    return f"anon:{request.remote_addr}:{request.headers.get('User-Agent', '')}"
+
 @stories_bp.route('/<int:story_id>', methods=['GET'])
 def get_story(story_id):
     try:
-        # Increment view count
-        execute_query(
-            "UPDATE success_stories SET views_count = views_count + 1 WHERE story_id = %s",
-            (story_id,)
-        )
-        
         # Get story with author information
         story = execute_query("""
             SELECT s.*, u.first_name, u.last_name, u.current_position, u.current_company,
@@ -155,6 +220,11 @@ def get_story(story_id):
         if not story:
             return jsonify({'error': 'Story not found'}), 404
         
+        # Buffered in memory and written in batches by the flush_story_views job
+        if record_view(story_id, _viewer_key()):
+            story_viewed(story_id, story['category'])
+        story['views_count'] += pending_views(story_id)
+        
         if story['tags']:
             story['tags'] = json.loads(story['tags'])
         
@@ -169,45 +239,24 @@ def like_story(story_id):
     try:
         user = request.current_user
         
-        # Check if story exists
-        story = execute_query(
-            "SELECT story_id FROM success_stories WHERE story_id = %s AND is_published = TRUE",
-            (story_id,), fetch_one=True
-        )
-        
-        if not story:
-            return jsonify({'error': 'Story not found'}), 404
-        
-        # Check if already liked
-        existing_like = execute_query(
-            "SELECT like_id FROM story_likes WHERE story_id = %s AND user_id = %s",
-            (story_id, user['user_id']), fetch_one=True
-        )
-        
-        if existing_like:
-            return jsonify({'error': 'You have already liked this story'}), 409
-        
-        # Add like
-        execute_query(
-            "INSERT INTO story_likes (story_id, user_id) VALUES (%s, %s)",
-            (story_id, user['user_id'])
-        )
-        
-        # Update likes count
-        execute_query(
-            "UPDATE success_stories SET likes_count = likes_count + 1 WHERE story_id = %s",
-            (story_id,)
-        )
-        
-        # Get updated likes count
-        updated_story = execute_query(
-            "SELECT likes_count FROM success_stories WHERE story_id = %s",
-            (story_id,), fetch_one=True
-        )
-        
+        # Idempotent: a repeat like changes nothing and reports the current count
+        likes_count = add_like(story_id, user['user_id'])
+        if likes_count is None:
+            # Nothing was written; one lookup tells a repeat like from a missing or unpublished story
+            state = get_like_state(story_id, user['user_id'])
+            if not state:
+                return jsonify({'error': 'Story not found'}), 404
+            return jsonify({
+                'message': 'Story already liked',
+                'likes_count': state['likes_count'],
+                'liked': bool(state['liked'])
+            }), 200
+        
+        story_liked(story_id)
         return jsonify({
             'message': 'Story liked successfully',
-            'likes_count': updated_story['likes_count']
+            'likes_count': likes_count,
+            'liked': True
         }), 201
         
     except Exception as e:
@@ -219,36 +268,15 @@ def unlike_story(story_id):
     try:
         user = request.current_user
         
-        # Check if like exists
-        existing_like = execute_query(
-            "SELECT like_id FROM story_likes WHERE story_id = %s AND user_id = %s",
-            (story_id, user['user_id']), fetch_one=True
-        )
-        
-        if not existing_like:
+        removed = remove_like(story_id, user['user_id'])
+        if removed is None:
             return jsonify({'error': 'You have not liked this story'}), 404
         
-        # Remove like
-        execute_query(
-            "DELETE FROM story_likes WHERE story_id = %s AND user_id = %s",
-            (story_id, user['user_id'])
-        )
-        
-        # Update likes count
-        execute_query(
-            "UPDATE success_stories SET likes_count = GREATEST(likes_count - 1, 0) WHERE story_id = %s",
-            (story_id,)
-        )
-        
-        # Get updated likes count
-        updated_story = execute_query(
-            "SELECT likes_count FROM success_stories WHERE story_id = %s",
-            (story_id,), fetch_one=True
-        )
-        
+        likes_count, liked_at = removed
+        story_liked(story_id, -1, liked_at)
         return jsonify({
             'message': 'Story unliked successfully',
-            'likes_count': updated_story['likes_count']
+            'likes_count': likes_count
         }), 200
         
     except Exception as e:
@@ -261,8 +289,7 @@ def get_my_stories():
         user = request.current_user
         
         stories = execute_query("""
-            SELECT s.*, 
-                   (SELECT COUNT(*) FROM story_likes sl WHERE sl.story_id = s.story_id) as actual_likes_count
+            SELECT s.*, s.likes_count as actual_likes_count
             FROM success_stories s
             WHERE s.author_id = %s
             ORDER BY s.created_at DESC
@@ -290,7 +317,7 @@ def update_story(story_id):
         
         # Check if user owns this story
         story = execute_query(
-            "SELECT author_id FROM success_stories WHERE story_id = %s",
+            "SELECT author_id, category, is_published FROM success_stories WHERE story_id = %s",
             (story_id,), fetch_one=True
         )
         
@@ -329,6 +356,12 @@ def update_story(story_id):
             f"UPDATE success_stories SET {set_clause} WHERE story_id = %s",
             values
         )
+        invalidate_counts('success_stories')
+        sync_document('success_stories', story_id)
+        story_changed(
+            story_id, update_data.get('category', story['category']),
+            update_data.get('is_published', story['is_published'])
+        )
         
         return jsonify({'message': 'Story updated successfully'}), 200
         
@@ -1,11 +1,29 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.database import execute_query
-from app.utils.auth import jwt_required_custom
+from app.utils.auth import jwt_required_custom, invalidate_user
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document, sync_documents
+from app.utils.connection_graph import user_changed
+from app.models.mentor_directory import refresh_mentor
+from app.utils.eligibility import student_changed
 import json
 
 users_bp = Blueprint('users', __name__)
 
+# Keyset orders for cursor pagination; user_id breaks ties
+ALUMNI_SORT = [
+    SortKey('is_verified', 'is_verified', descending=True, nullable=True),
+    SortKey('first_name', 'first_name'),
+    SortKey('user_id', 'user_id')
+]
+STUDENT_SORT = [
+    SortKey('graduation_year', 'graduation_year', descending=True, nullable=True),
+    SortKey('first_name', 'first_name'),
+    SortKey('user_id', 'user_id')
+]
+
 @users_bp.route('/profile', methods=['GET'])
 @jwt_required_custom
 def get_profile():
@@ -108,6 +126,13 @@ def update_profile():
             f"UPDATE users SET {set_clause} WHERE user_id = %s",
             values
         )
+        invalidate_user(user['user_id'])
+        invalidate_counts('users', 'mentorship_programs')
+        sync_document('alumni', user['user_id'])
+        sync_documents('mentorship_programs', 'mp.mentor_id = %s', (user['user_id'],))
+        user_changed(user['user_id'])
+        refresh_mentor(user['user_id'])
+        student_changed(user['user_id'])
         
         return jsonify({'message': 'Profile updated successfully'}), 200
         
@@ -128,10 +153,18 @@ def get_alumni():
         conditions = ["role = 'alumni'", "is_active = TRUE"]
         params = []
         
+        order_by = "is_verified DESC, first_name ASC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(first_name LIKE %s OR last_name LIKE %s OR current_company LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
+            match = search_filter('alumni', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         if company:
             conditions.append("current_company LIKE %s")
@@ -139,37 +172,44 @@ def get_alumni():
         
         where_clause = " AND ".join(conditions)
         
-        # Get alumni list
-        alumni = execute_query(f"""
+        select_sql = """
             SELECT user_id, first_name, last_name, current_company, current_position,
                    location, bio, skills, linkedin_url, graduation_year, degree, major,
                    is_verified, profile_image
             FROM users 
-            WHERE {where_clause}
-            ORDER BY is_verified DESC, first_name ASC
-            LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """
+        
+        if 'cursor' in request.args and not ranked:
+            # Cursor mode seeks past the last row seen instead of using OFFSET
+            alumni, pagination = keyset_paginate(
+                select_sql, where_clause, params, ALUMNI_SORT, request.args['cursor'], limit
+            )
+        else:
+            # Get alumni list
+            alumni = execute_query(f"""
+                {select_sql}
+                WHERE {where_clause}
+                ORDER BY {order_by}
+                LIMIT %s OFFSET %s
+            """, params + order_params + [limit, offset])
+            
+            # Get total count (skipped with include_total=false, otherwise cached briefly)
+            pagination = offset_pagination(page, limit, 'users', f"""
+                SELECT COUNT(*) as count FROM users WHERE {where_clause}
+            """, params, filtered=len(conditions) > 2)
         
         # Parse skills for each alumni
         for alum in alumni:
             if alum['skills']:
                 alum['skills'] = json.loads(alum['skills'])
         
-        # Get total count
-        total = execute_query(f"""
-            SELECT COUNT(*) as count FROM users WHERE {where_clause}
-        """, params, fetch_one=True)['count']
-        
         return jsonify({
             'alumni': alumni,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get alumni', 'details': str(e)}), 500
 
@@ -198,36 +238,43 @@ def get_students():
         
         where_clause = " AND ".join(conditions)
         
-        # Get students list
-        students = execute_query(f"""
+        select_sql = """
             SELECT user_id, first_name, last_name, graduation_year, degree, major,
                    location, bio, skills, linkedin_url, profile_image
             FROM users 
-            WHERE {where_clause}
-            ORDER BY graduation_year DESC, first_name ASC
-            LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """
+        
+        if 'cursor' in request.args:
+            # Cursor mode seeks past the last row seen instead of using OFFSET
+            students, pagination = keyset_paginate(
+                select_sql, where_clause, params, STUDENT_SORT, request.args['cursor'], limit
+            )
+        else:
+            # Get students list
+            students = execute_query(f"""
+                {select_sql}
+                WHERE {where_clause}
+                ORDER BY graduation_year DESC, first_name ASC
+                LIMIT %s OFFSET %s
+            """, params + [limit, offset])
+            
+            # Get total count (skipped with include_total=false, otherwise cached briefly)
+            pagination = offset_pagination(page, limit, 'users', f"""
+                SELECT COUNT(*) as count FROM users WHERE {where_clause}
+            """, params, filtered=len(conditions) > 2)
         
         # Parse skills for each student
         for student in students:
             if student['skills']:
                 student['skills'] = json.loads(student['skills'])
         
-        # Get total count
-        total = execute_query(f"""
-            SELECT COUNT(*) as count FROM users WHERE {where_clause}
-        """, params, fetch_one=True)['count']
-        
         return jsonify({
             'students': students,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get students', 'details': str(e)}), 500
 
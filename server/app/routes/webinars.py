@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify
-from app.models.database import execute_query
+from app.models.database import execute_query, transaction
+from app.models.webinar_seats import AlreadyRegistered, WebinarNotFound, register_seat, waitlist_position, release_seat, set_capacity
 from app.utils.auth import jwt_required_custom, role_required
+from app.utils.counts import offset_pagination, invalidate_counts
+from app.utils.pagination import SortKey, InvalidCursor, keyset_paginate
+from app.utils.search import search_filter, sync_document
 from datetime import datetime
 
 webinars_bp = Blueprint('webinars', __name__)
 
+# Keyset order for cursor pagination: soonest first, id breaks ties
+WEBINAR_SORT = [
+    SortKey('w.scheduled_date', 'scheduled_date'),
+    SortKey('w.webinar_id', 'webinar_id')
+]
+
 @webinars_bp.route('', methods=['GET'])
 def get_webinars():
     try:
@@ -22,46 +32,61 @@ def get_webinars():
         if upcoming_only:
             conditions.append("w.scheduled_date >= NOW()")
         
+        order_by = "w.scheduled_date ASC"
+        order_params = []
+        ranked = False
         if search:
-            conditions.append("(w.title LIKE %s OR w.description LIKE %s)")
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param])
+            match = search_filter('webinars', search)
+            conditions.append(match.condition)
+            params.extend(match.params)
+            if match.order:
+                # Most relevant first when the search backend ranks matches
+                order_by = f"{match.order}, {order_by}"
+                order_params = match.order_params
+                ranked = True  # relevance is not a keyset column, so these pages use offsets even with a cursor
         
         where_clause = " AND ".join(conditions)
         
-        # Get webinars with host information
-        webinars = execute_query(f"""
+        select_sql = """
             SELECT w.webinar_id, w.title, w.description, w.scheduled_date,
                    w.duration_minutes, w.max_participants, w.registration_required,
                    w.created_at,
                    u.first_name, u.last_name, u.current_position, u.current_company,
                    u.profile_image,
-                   (SELECT COUNT(*) FROM webinar_registrations wr WHERE wr.webinar_id = w.webinar_id) as registered_count
+                   w.seats_taken as registered_count
             FROM webinars w
             JOIN users u ON w.host_id = u.user_id
+        """
+        
+        # Cursor mode seeks past the last row seen instead of using OFFSET
+        if 'cursor' in request.args and not ranked:
+            webinars, pagination = keyset_paginate(
+                select_sql, where_clause, params, WEBINAR_SORT, request.args['cursor'], limit
+            )
+            return jsonify({'webinars': webinars, 'pagination': pagination}), 200
+        
+        # Get webinars with host information
+        webinars = execute_query(f"""
+            {select_sql}
             WHERE {where_clause}
-            ORDER BY w.scheduled_date ASC
+            ORDER BY {order_by}
             LIMIT %s OFFSET %s
-        """, params + [limit, offset])
+        """, params + order_params + [limit, offset])
         
-        # Get total count
-        total = execute_query(f"""
+        # Get total count (skipped with include_total=false, otherwise cached briefly)
+        pagination = offset_pagination(page, limit, 'webinars', f"""
             SELECT COUNT(*) as count 
             FROM webinars w
-            JOIN users u ON w.host_id = u.user_id
             WHERE {where_clause}
-        """, params, fetch_one=True)['count']
+        """, params, filtered=len(conditions) > 1)
         
         return jsonify({
             'webinars': webinars,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get webinars', 'details': str(e)}), 500
 
@@ -108,6 +133,8 @@ def create_webinar():
             duration_minutes, max_participants, data.get('meeting_link', ''),
             data.get('registration_required', True)
         ))
+        invalidate_counts('webinars')
+        sync_document('webinars', webinar_id)
         
         # Get the created webinar
         webinar = execute_query("""
@@ -131,7 +158,7 @@ def get_webinar(webinar_id):
         webinar = execute_query("""
             SELECT w.*, u.first_name, u.last_name, u.current_position, u.current_company,
                    u.profile_image, u.linkedin_url,
-                   (SELECT COUNT(*) FROM webinar_registrations wr WHERE wr.webinar_id = w.webinar_id) as registered_count
+                   w.seats_taken as registered_count
             FROM webinars w
             JOIN users u ON w.host_id = u.user_id
             WHERE w.webinar_id = %s AND w.is_active = TRUE
@@ -145,6 +172,86 @@ def get_webinar(webinar_id):
     except Exception as e:
         return jsonify({'error': 'Failed to get webinar', 'details': str(e)}), 500
 
+@webinars_bp.route('/<int:webinar_id>', methods=['PUT'])
+@jwt_required_custom
+def update_webinar(webinar_id):
+    try:
+        user = request.current_user
+        data = request.get_json()
+        
+        # Check if user hosts this webinar
+        webinar = execute_query(
+            "SELECT host_id FROM webinars WHERE webinar_id = %s AND is_active = TRUE",
+            (webinar_id,), fetch_one=True
+        )
+        
+        if not webinar:
+            return jsonify({'error': 'Webinar not found'}), 404
+        
+        if webinar['host_id'] != user['user_id']:
+            return jsonify({'error': 'You can only update your own webinars'}), 403
+        
+        # Fields that can be updated (max_participants goes through set_capacity)
+        updatable_fields = [
+            'title', 'description', 'scheduled_date', 'duration_minutes',
+            'meeting_link', 'registration_required'
+        ]
+        
+        update_data = {}
+        for field in updatable_fields:
+            if field in data:
+                if field == 'scheduled_date':
+                    try:
+                        update_data[field] = datetime.strptime(data[field], '%Y-%m-%d %H:%M:%S')
+                    except (TypeError, ValueError):
+                        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD HH:MM:SS'}), 400
+                elif field == 'duration_minutes':
+                    try:
+                        update_data[field] = int(data[field])
+                        if update_data[field] < 1:
+                            raise ValueError()
+                    except (TypeError, ValueError):
+                        return jsonify({'error': 'duration_minutes must be a positive integer'}), 400
+                else:
+                    update_data[field] = data[field]
+        
+        max_participants = None
+        if 'max_participants' in data:
+            try:
+                max_participants = int(data['max_participants'])
+                if max_participants < 1:
+                    raise ValueError()
+            except (TypeError, ValueError):
+                return jsonify({'error': 'max_participants must be a positive integer'}), 400
+        
+        if not update_data and max_participants is None:
+            return jsonify({'error': 'No valid fields to update'}), 400
+        
+        promoted = []
+        with transaction():
+            if update_data:
+                set_clause = ', '.join([f"{field} = %s" for field in update_data.keys()])
+                values = list(update_data.values()) + [webinar_id]
+                
+                execute_query(
+                    f"UPDATE webinars SET {set_clause} WHERE webinar_id = %s",
+                    values
+                )
+            
+            # Raising capacity promotes waiters into the new seats in the same transaction
+            if max_participants is not None:
+                promoted = set_capacity(webinar_id, max_participants)
+        
+        sync_document('webinars', webinar_id)
+        
+        return jsonify({
+            'message': 'Webinar updated successfully',
+            'waitlist_promoted': len(promoted)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to update webinar', 'details': str(e)}), 500
+
 @webinars_bp.route('/<int:webinar_id>/register', methods=['POST'])
 @jwt_required_custom
 def register_for_webinar(webinar_id):
@@ -153,11 +260,10 @@ def register_for_webinar(webinar_id):
         
         # Check if webinar exists and is active
         webinar = execute_query("""
-            SELECT webinar_id, max_participants, registration_required, scheduled_date,
-                   (SELECT COUNT(*) FROM webinar_registrations WHERE webinar_id = %s) as registered_count
+            SELECT webinar_id, registration_required, scheduled_date
             FROM webinars 
             WHERE webinar_id = %s AND is_active = TRUE
-        """, (webinar_id, webinar_id), fetch_one=True)
+        """, (webinar_id,), fetch_one=True)
         
         if not webinar:
             return jsonify({'error': 'Webinar not found'}), 404
@@ -169,24 +275,19 @@ def register_for_webinar(webinar_id):
         if webinar['scheduled_date'] <= datetime.now():
             return jsonify({'error': 'Cannot register for past webinars'}), 400
         
-        # Check if there's space
-        if webinar['registered_count'] >= webinar['max_participants']:
-            return jsonify({'error': 'Webinar is full'}), 400
-        
-        # Check if already registered
-        existing_registration = execute_query(
-            "SELECT registration_id FROM webinar_registrations WHERE webinar_id = %s AND user_id = %s",
-            (webinar_id, user['user_id']), fetch_one=True
-        )
-        
-        if existing_registration:
+        # Claims a seat, or queues the user in the same transaction when the webinar is full
+        try:
+            position = register_seat(webinar_id, user['user_id'])
+        except AlreadyRegistered:
             return jsonify({'error': 'You are already registered for this webinar'}), 409
+        except WebinarNotFound:
+            return jsonify({'error': 'Webinar not found'}), 404
         
-        # Register user
-        execute_query(
-            "INSERT INTO webinar_registrations (webinar_id, user_id) VALUES (%s, %s)",
-            (webinar_id, user['user_id'])
-        )
+        if position is not None:
+            return jsonify({
+                'message': 'Webinar is full; you have been added to the waitlist',
+                'waitlist_position': position
+            }), 202
         
         return jsonify({'message': 'Successfully registered for webinar'}), 201
         
@@ -199,26 +300,48 @@ def unregister_from_webinar(webinar_id):
     try:
         user = request.current_user
         
-        # Check if registration exists
-        registration = execute_query(
-            "SELECT registration_id FROM webinar_registrations WHERE webinar_id = %s AND user_id = %s",
-            (webinar_id, user['user_id']), fetch_one=True
-        )
+        # Frees the seat for the first waitlisted user, or leaves the waitlist
+        outcome, promoted_user_id = release_seat(webinar_id, user['user_id'])
         
-        if not registration:
+        if outcome is None:
             return jsonify({'error': 'You are not registered for this webinar'}), 404
         
-        # Remove registration
-        execute_query(
-            "DELETE FROM webinar_registrations WHERE webinar_id = %s AND user_id = %s",
-            (webinar_id, user['user_id'])
-        )
+        if outcome == 'left_waitlist':
+            return jsonify({'message': 'Successfully left the webinar waitlist'}), 200
         
-        return jsonify({'message': 'Successfully unregistered from webinar'}), 200
+        return jsonify({
+            'message': 'Successfully unregistered from webinar',
+            'waitlist_promoted': promoted_user_id is not None
+        }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to unregister from webinar', 'details': str(e)}), 500
 
+@webinars_bp.route('/<int:webinar_id>/waitlist', methods=['GET'])
+@jwt_required_custom
+def get_waitlist_status(webinar_id):
+    try:
+        user = request.current_user
+        
+        webinar = execute_query("""
+            SELECT max_participants, seats_taken,
+                   (SELECT COUNT(*) FROM webinar_waitlist ww WHERE ww.webinar_id = w.webinar_id) as waitlist_count
+            FROM webinars w
+            WHERE w.webinar_id = %s AND w.is_active = TRUE
+        """, (webinar_id,), fetch_one=True)
+        
+        if not webinar:
+            return jsonify({'error': 'Webinar not found'}), 404
+        
+        return jsonify({
+            'seats_available': max(webinar['max_participants'] - webinar['seats_taken'], 0),
+            'waitlist_count': webinar['waitlist_count'],
+            'waitlist_position': waitlist_position(webinar_id, user['user_id'])
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get waitlist status', 'details': str(e)}), 500
+
 @webinars_bp.route('/my-registrations', methods=['GET'])
 @jwt_required_custom
 def get_my_registrations():
@@ -251,7 +374,7 @@ def get_my_webinars():
         
         webinars = execute_query("""
             SELECT w.*, 
-                   (SELECT COUNT(*) FROM webinar_registrations wr WHERE wr.webinar_id = w.webinar_id) as registered_count
+                   w.seats_taken as registered_count
             FROM webinars w
             WHERE w.host_id = %s
             ORDER BY w.scheduled_date DESC
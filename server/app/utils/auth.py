@@ -1,36 +1,158 @@
-import bcrypt
+import os
+import threading
+import time
 from functools import wraps
 from flask import jsonify, request
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import create_access_token, verify_jwt_in_request, get_jwt, get_jwt_identity
 from app.models.database import execute_query
+from app.utils.cache import TTLCache
+from app.utils import hashing
+
+# Authenticated user cache (per worker process)
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+USER_CACHE_SYNC_INTERVAL = float(os.environ.get('USER_CACHE_SYNC_INTERVAL', 2))  # seconds between checks for users changed by any worker
+USER_CACHE_SYNC_LAG = 10  # seconds re-checked each sync, covering updates committed after their updated_at
+
+# Fields exposed to handlers as request.current_user
+PRINCIPAL_FIELDS = ('user_id', 'email', 'first_name', 'last_name', 'role')
+
+_users = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+class _UserChangeFeed:
+    """Evicts cached principals for users changed by any worker.
+
+    users.updated_at is bumped by every write to the row (profile edits,
+    deactivation, token version changes), so polling it is a revocation
+    source shared by all processes. The poll runs on the request path at
+    most every USER_CACHE_SYNC_INTERVAL seconds, in one thread at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._since = None  # database time of the previous sync
+        self._seen = {}  # user_id -> updated_at already evicted within the lag window
+        self.syncs = 0
+        self.evictions = 0
+
+    def sync(self):
+        if time.monotonic() < self._next_sync or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + USER_CACHE_SYNC_INTERVAL
+            now = execute_query("SELECT NOW() as now", fetch_one=True)['now']
+            if self._since is None:
+                # Nothing cached predates this worker's first sync
+                self._since = now
+                return
+            rows = execute_query(
+                "SELECT user_id, updated_at FROM users WHERE updated_at >= %s - INTERVAL %s SECOND",
+                (self._since, USER_CACHE_SYNC_LAG)
+            )
+            seen = {}
+            for row in rows:
+                seen[row['user_id']] = row['updated_at']
+                # updated_at has one-second resolution, so a row stamped in the
+                # second of the previous sync may have changed again since
+                if self._seen.get(row['user_id']) != row['updated_at'] or row['updated_at'] >= self._since:
+                    _users.pop(str(row['user_id']))
+                    self.evictions += 1
+            self._seen = seen
+            self._since = now
+            self.syncs += 1
+        finally:
+            self._lock.release()
+
+_changes = _UserChangeFeed()
 
 def hash_password(password):
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash a password using bcrypt (in the hashing pool)"""
+    return hashing.hash_password(password)
 
 def check_password(password, hashed):
-    """Check if password matches the hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    """Check if password matches the hash (in the hashing pool)"""
+    return hashing.check_password(password, hashed)
 
-def jwt_required_custom(f):
-    """Custom JWT required decorator with user loading"""
+def password_needs_rehash(hashed):
+    """True when the stored hash uses an outdated bcrypt cost"""
+    return hashing.needs_rehash(hashed)
+
+def create_user_token(user):
+    """Access token carrying the user's role and token version as claims"""
+    return create_access_token(
+        identity=user['user_id'],
+        additional_claims={'role': user['role'], 'ver': user.get('token_version') or 0}
+    )
+
+def load_user(user_id, claims=None):
+    """Active user principal, served from a short-lived cache.
+
+    Users changed by any worker are evicted within USER_CACHE_SYNC_INTERVAL
+    seconds. An entry is also reloaded when the token is newer than it (a
+    higher token version, or a different role in a token issued after the
+    entry was loaded); once reloaded, the database row wins, so a stale
+    role claim costs one query rather than one per request. Returns None
+    for unknown or inactive users.
+    """
+    _changes.sync()
+    key = str(user_id)
+    user = _users.get(key)
+    claims = claims or {}
+    if (
+        user is None
+        or user['token_version'] < claims.get('ver', 0)
+        or (user['role'] != claims.get('role', user['role']) and claims.get('iat', 0) > user['loaded_at'])
+    ):
+        user = execute_query(
+            "SELECT user_id, email, first_name, last_name, role, token_version FROM users WHERE user_id = %s AND is_active = TRUE",
+            (user_id,),
+            fetch_one=True
+        )
+        if not user:
+            _users.pop(key)
+            return None
+        user['loaded_at'] = time.time()
+        _users.set(key, user)
+    return user
+
+def invalidate_user(user_id):
+    """Drop this worker's cached principal after the user's row changes
+    (other workers pick the change up from users.updated_at)"""
+    _users.pop(str(user_id))
+
+def user_cache_stats():
+    stats = _users.stats()
+    stats['change_syncs'] = _changes.syncs
+    stats['change_evictions'] = _changes.evictions
+    return stats
+
+def jwt_required_custom(f=None, locations=None):
+    """Custom JWT required decorator with user loading.
+
+    Use as @jwt_required_custom, or @jwt_required_custom(locations=[...]) to
+    accept the token from somewhere other than the Authorization header.
+    """
+    if f is None:
+        return lambda f: jwt_required_custom(f, locations)
+    
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            verify_jwt_in_request()
+            verify_jwt_in_request(locations=locations)
             user_id = get_jwt_identity()
+            claims = get_jwt()
             
-            # Get current user info
-            user = execute_query(
-                "SELECT user_id, email, first_name, last_name, role FROM users WHERE user_id = %s AND is_active = TRUE",
-                (user_id,),
-                fetch_one=True
-            )
+            # Get current user info (cached; the token version must still be current)
+            user = load_user(user_id, claims)
             
             if not user:
                 return jsonify({'error': 'User not found or inactive'}), 401
+            
+            if user['token_version'] != claims.get('ver', 0):
+                return jsonify({'error': 'Token has been revoked'}), 401
                 
-            request.current_user = user
+            request.current_user = {field: user[field] for field in PRINCIPAL_FIELDS}
             return f(*args, **kwargs)
         except Exception as e:
             return jsonify({'error': 'Invalid token'}), 401
@@ -0,0 +1,64 @@
+import hashlib
+import math
+import threading
+import time
+
+class BloomFilter:
+    """Fixed-size set membership test with no false negatives and a tunable
+    false positive rate"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key):
+        """Add key; returns False if it was (probably) already present"""
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+class RotatingBloomFilter:
+    """Remembers keys for between one and two windows.
+
+    Two generations are kept; every window seconds the older one is dropped
+    and a fresh one started, so memory stays bounded without per-key expiry.
+    """
+
+    def __init__(self, window, capacity, error_rate=0.01):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = None
+        self._rotated_at = time.monotonic()
+
+    def add(self, key):
+        """Record key; returns False if it was (probably) seen within the window"""
+        with self._lock:
+            if time.monotonic() - self._rotated_at >= self.window:
+                self._previous = self._current
+                self._current = BloomFilter(self.capacity, self.error_rate)
+                self._rotated_at = time.monotonic()
+            if self._previous is not None and key in self._previous:
+                self._current.add(key)
+                return False
+            return self._current.add(key)
@@ -0,0 +1,186 @@
+import os
+import threading
+import uuid
+from collections import deque, namedtuple
+
+# Streaming configuration (per worker process)
+MESSAGE_STREAM_BUFFER = int(os.environ.get('MESSAGE_STREAM_BUFFER', 100))
+MESSAGE_STREAM_REPLAY = int(os.environ.get('MESSAGE_STREAM_REPLAY', 1000))
+MESSAGE_STREAM_HEARTBEAT = float(os.environ.get('MESSAGE_STREAM_HEARTBEAT', 15))
+MESSAGE_STREAM_MAX_DURATION = float(os.environ.get('MESSAGE_STREAM_MAX_DURATION', 300))  # seconds before a stream closes and the client reconnects
+
+# id: "<broker epoch>:<sequence>", data: already-serialized JSON
+Event = namedtuple('Event', ['id', 'user_id', 'event', 'data'])
+
+class Subscription:
+    """One open stream's bounded event buffer.
+
+    If the client falls more than ``maxsize`` events behind, the buffer is
+    dropped and a single ``resync`` event (carrying the latest event id, so a
+    reconnect resumes from there) tells it to refetch instead.
+    """
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.maxsize = max(1, maxsize)
+        self._events = deque()
+        self._resync_id = None  # set once the buffer has overflowed
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if self._resync_id is not None or len(self._events) >= self.maxsize:
+                self._events.clear()
+                self._resync_id = event.id
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def resync(self, event_id):
+        """Replace anything buffered with a resync at event_id"""
+        with self._cond:
+            self._events.clear()
+            self._resync_id = event_id
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait up to timeout for events and return everything buffered"""
+        with self._cond:
+            if not self._events and self._resync_id is None and not self._closed:
+                self._cond.wait(timeout)
+            if self._resync_id is not None:
+                event_id, self._resync_id = self._resync_id, None
+                return [Event(event_id, self.user_id, 'resync', '{}')]
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    @property
+    def closed(self):
+        return self._closed
+
+class MessageBroker:
+    """In-process publish/subscribe hub for per-user events.
+
+    Only subscribers connected to this worker process see its events. A
+    replay ring of recent events lets a reconnecting client resume from its
+    Last-Event-ID. Ids from another process or older than the ring get a
+    ``resync`` event instead.
+    """
+
+    def __init__(self, buffer_size=100, replay_size=1000):
+        self.buffer_size = buffer_size
+        self.epoch = uuid.uuid4().hex[:12]
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._replay = deque(maxlen=max(1, replay_size))
+        self._subscribers = {}  # user_id -> set of Subscription
+
+        self._published = 0
+        self._resyncs = 0
+
+    def publish(self, user_ids, event, data):
+        """Deliver an event to every open stream of the given users"""
+        with self._lock:
+            targets = []
+            for user_id in set(user_ids):
+                self._sequence += 1
+                item = Event(f"{self.epoch}:{self._sequence}", user_id, event, data)
+                self._replay.append(item)
+                targets.extend((subscription, item) for subscription in self._subscribers.get(user_id, ()))
+            self._published += 1
+        for subscription, item in targets:
+            subscription.put(item)
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Open a subscription, replaying anything missed since last_event_id"""
+        subscription = Subscription(user_id, self.buffer_size)
+        with self._lock:
+            if last_event_id:
+                missed = self._missed_since(user_id, last_event_id)
+                if missed is None:
+                    self._resyncs += 1
+                    subscription.resync(f"{self.epoch}:{self._sequence}")
+                else:
+                    for item in missed:
+                        subscription.put(item)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'subscribers': sum(len(subscribers) for subscribers in self._subscribers.values()),
+                'users': len(self._subscribers),
+                'published': self._published,
+                'resyncs': self._resyncs,
+                'replay_size': len(self._replay)
+            }
+
+    def _missed_since(self, user_id, last_event_id):
+        """Events for user_id after last_event_id, or None if they can't be replayed (caller holds the lock)"""
+        epoch, _, sequence = last_event_id.partition(':')
+        try:
+            sequence = int(sequence)
+        except ValueError:
+            return None
+        if epoch != self.epoch or sequence > self._sequence:
+            return None
+        if self._replay and sequence < int(self._replay[0].id.partition(':')[2]) - 1:
+            # Part of the gap has already been pushed out of the ring
+            return None
+        return [
+            item for item in self._replay
+            if item.user_id == user_id and int(item.id.partition(':')[2]) > sequence
+        ]
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """Return this process's broker, creating it after a fork"""
+    global _broker
+    broker = _broker
+    if broker is None or broker.pid != os.getpid():
+        with _broker_lock:
+            if _broker is None or _broker.pid != os.getpid():
+                _broker = MessageBroker(MESSAGE_STREAM_BUFFER, MESSAGE_STREAM_REPLAY)
+            broker = _broker
+    return broker
+
+def _reset_broker_after_fork():
+    global _broker, _broker_lock
+    _broker = None
+    _broker_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_broker_after_fork)
+
+def publish(user_ids, event, data):
+    get_broker().publish(user_ids, event, data)
+
+def format_event(item):
+    """Render an Event in text/event-stream framing"""
+    lines = []
+    if item.id:
+        lines.append(f"id: {item.id}")
+    lines.append(f"event: {item.event}")
+    lines.extend(f"data: {line}" for line in item.data.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from app.models.database import execute_query
+from app.utils.cache import TTLCache
+
+# Connection graph configuration (per worker process)
+CONNECTION_GRAPH_REFRESH = float(os.environ.get('CONNECTION_GRAPH_REFRESH', 600))
+SUGGESTION_CACHE_TTL = float(os.environ.get('SUGGESTION_CACHE_TTL', 900))
+SUGGESTION_CACHE_SIZE = int(os.environ.get('SUGGESTION_CACHE_SIZE', 5000))
+SUGGESTIONS_PER_USER = 50
+CONNECTION_PATH_MAX_DEPTH = int(os.environ.get('CONNECTION_PATH_MAX_DEPTH', 6))
+
+# Score weights for connection suggestions
+MUTUAL_WEIGHT = 3.0
+MAJOR_WEIGHT = 2.0
+YEAR_WEIGHT = 1.0
+YEAR_WINDOW = 4
+SKILL_WEIGHT = 2.0
+ROLE_WEIGHT = 0.5
+
+UserFeatures = namedtuple('UserFeatures', ['role', 'major', 'graduation_year', 'skills'])
+
+SUGGESTABLE_ROLES = ('alumni', 'mentor', 'student')
+
+def _parse_skills(skills):
+    if not skills:
+        return frozenset()
+    try:
+        values = json.loads(skills) if isinstance(skills, str) else skills
+    except ValueError:
+        return frozenset()
+    return frozenset(str(skill).strip().lower() for skill in values if str(skill).strip())
+
+def _features(row):
+    major = (row.get('major') or '').strip().lower() or None
+    return UserFeatures(row['role'], major, row.get('graduation_year'), _parse_skills(row.get('skills')))
+
+class ConnectionGraph:
+    """In-memory adjacency sets for the connections table plus the user
+    attributes used to rank suggestions.
+
+    Accepted connections and pending requests are kept in separate
+    symmetric adjacency maps; users are also indexed by major and
+    graduation year so suggestion candidates can be gathered without a
+    scan of the whole user base.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._accepted = {}  # user_id -> set of connected user_ids
+        self._pending = {}  # user_id -> set of user_ids with a pending request either way
+        self._users = {}  # user_id -> UserFeatures (active users only)
+        self._by_major = {}
+        self._by_year = {}
+        self._suggestions = TTLCache(maxsize=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL)
+        self.loaded_at = None
+
+    def load(self):
+        """Populate the graph from the database"""
+        users = execute_query("""
+            SELECT user_id, role, major, graduation_year, skills
+            FROM users
+            WHERE is_active = TRUE AND role IN ('alumni', 'mentor', 'student')
+        """)
+        edges = execute_query("""
+            SELECT requester_id, recipient_id, status
+            FROM connections
+            WHERE status IN ('accepted', 'pending')
+        """)
+        with self._lock:
+            for row in users:
+                self._set_user(row['user_id'], _features(row))
+            for edge in edges:
+                self._add_edge(edge['requester_id'], edge['recipient_id'], edge['status'])
+            self.loaded_at = time.monotonic()
+        return self
+
+    # Maintenance hooks
+
+    def set_edge(self, user_a, user_b, status):
+        """Record the current status of the connection between two users ('accepted', 'pending' or None)"""
+        with self._lock:
+            self._discard_edge(user_a, user_b)
+            if status in ('accepted', 'pending'):
+                self._add_edge(user_a, user_b, status)
+            self._invalidate_around(user_a, user_b)
+
+    def set_user(self, user_id, row):
+        """Add or refresh an active user's attributes; row=None removes them"""
+        with self._lock:
+            self._remove_user(user_id)
+            if row and row.get('role') in SUGGESTABLE_ROLES:
+                self._set_user(user_id, _features(row))
+            self._suggestions.pop(user_id)
+
+    def has_user(self, user_id):
+        return user_id in self._users
+
+    # Queries
+
+    def connections(self, user_id):
+        return self._accepted.get(user_id, set())
+
+    def mutual(self, user_a, user_b):
+        """Sorted ids of users connected to both"""
+        with self._lock:
+            first, second = self.connections(user_a), self.connections(user_b)
+            if len(first) > len(second):
+                first, second = second, first
+            return sorted(other for other in first if other in second)
+
+    def shortest_path(self, source, target, max_depth=CONNECTION_PATH_MAX_DEPTH):
+        """Fewest-hop chain of accepted connections from source to target, or None.
+
+        Bidirectional BFS: always grows the smaller frontier by one full level
+        and stops at the first user reached from both sides.
+        """
+        if source == target:
+            return [source]
+        with self._lock:
+            forward_parents = {source: None}
+            backward_parents = {target: None}
+            forward = [source]
+            backward = [target]
+            depth = 0
+            while forward and backward and depth < max_depth:
+                if len(forward) <= len(backward):
+                    forward, meeting = self._expand(forward, forward_parents, backward_parents)
+                else:
+                    backward, meeting = self._expand(backward, backward_parents, forward_parents)
+                depth += 1
+                if meeting is not None:
+                    return self._join_path(meeting, forward_parents, backward_parents)
+        return None
+
+    def suggest(self, user_id, limit):
+        """Top candidates for user_id as [(candidate_id, score, mutual_count)], cached per user"""
+        ranked = self._suggestions.get(user_id)
+        if ranked is None:
+            with self._lock:
+                ranked = self._rank(user_id)
+            self._suggestions.set(user_id, ranked)
+        return ranked[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'connections': sum(len(others) for others in self._accepted.values()) // 2,
+                'pending': sum(len(others) for others in self._pending.values()) // 2,
+                'suggestion_cache': self._suggestions.stats()
+            }
+
+    # Internals (caller holds the lock)
+
+    def _rank(self, user_id):
+        me = self._users.get(user_id)
+        if me is None:
+            return []
+        connected = self._accepted.get(user_id, set())
+        excluded = connected | self._pending.get(user_id, set()) | {user_id}
+
+        # Candidates: friends of friends, same major, nearby graduation years
+        mutual_counts = {}
+        for friend in connected:
+            for candidate in self._accepted.get(friend, ()):
+                if candidate not in excluded:
+                    mutual_counts[candidate] = mutual_counts.get(candidate, 0) + 1
+        candidates = set(mutual_counts)
+        if me.major:
+            candidates.update(self._by_major.get(me.major, ()))
+        if me.graduation_year:
+            for year in range(me.graduation_year - YEAR_WINDOW, me.graduation_year + YEAR_WINDOW + 1):
+                candidates.update(self._by_year.get(year, ()))
+        candidates -= excluded
+
+        scored = []
+        for candidate in candidates:
+            other = self._users.get(candidate)
+            if other is None:
+                continue
+            mutual = mutual_counts.get(candidate, 0)
+            score = MUTUAL_WEIGHT * mutual
+            if me.major and other.major == me.major:
+                score += MAJOR_WEIGHT
+            if me.graduation_year and other.graduation_year:
+                gap = abs(me.graduation_year - other.graduation_year)
+                score += YEAR_WEIGHT * max(0.0, 1 - gap / (YEAR_WINDOW + 1))
+            if me.skills and other.skills:
+                shared = len(me.skills & other.skills)
+                if shared:
+                    score += SKILL_WEIGHT * shared / len(me.skills | other.skills)
+            if other.role != me.role:
+                # Students benefit most from alumni/mentors and vice versa
+                score += ROLE_WEIGHT
+            scored.append((candidate, round(score, 4), mutual))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:SUGGESTIONS_PER_USER]
+
+    def _expand(self, frontier, parents, other_parents):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in self._accepted.get(node, ()):
+                if neighbour in parents:
+                    continue
+                parents[neighbour] = node
+                if neighbour in other_parents:
+                    return next_frontier, neighbour
+                next_frontier.append(neighbour)
+        return next_frontier, None
+
+    def _join_path(self, meeting, forward_parents, backward_parents):
+        path = []
+        node = meeting
+        while node is not None:
+            path.append(node)
+            node = forward_parents[node]
+        path.reverse()
+        node = backward_parents[meeting]
+        while node is not None:
+            path.append(node)
+            node = backward_parents[node]
+        return path
+
+    def _invalidate_around(self, user_a, user_b):
+        # Mutual counts change for both endpoints and everyone adjacent to them
+        affected = {user_a, user_b}
+        affected.update(self._accepted.get(user_a, ()))
+        affected.update(self._accepted.get(user_b, ()))
+        for user_id in affected:
+            self._suggestions.pop(user_id)
+
+    def _add_edge(self, user_a, user_b, status):
+        adjacency = self._accepted if status == 'accepted' else self._pending
+        adjacency.setdefault(user_a, set()).add(user_b)
+        adjacency.setdefault(user_b, set()).add(user_a)
+
+    def _discard_edge(self, user_a, user_b):
+        for adjacency in (self._accepted, self._pending):
+            for source, target in ((user_a, user_b), (user_b, user_a)):
+                others = adjacency.get(source)
+                if others is not None:
+                    others.discard(target)
+                    if not others:
+                        del adjacency[source]
+
+    def _set_user(self, user_id, features):
+        self._users[user_id] = features
+        if features.major:
+            self._by_major.setdefault(features.major, set()).add(user_id)
+        if features.graduation_year:
+            self._by_year.setdefault(features.graduation_year, set()).add(user_id)
+
+    def _remove_user(self, user_id):
+        features = self._users.pop(user_id, None)
+        if features is None:
+            return
+        for index, key in ((self._by_major, features.major), (self._by_year, features.graduation_year)):
+            members = index.get(key)
+            if members is not None:
+                members.discard(user_id)
+                if not members:
+                    del index[key]
+
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_graph():
+    """This process's connection graph, rebuilt from the database when stale"""
+    global _graph
+    graph = _graph
+    if graph is None or time.monotonic() - graph.loaded_at > CONNECTION_GRAPH_REFRESH:
+        with _graph_lock:
+            if _graph is None or time.monotonic() - _graph.loaded_at > CONNECTION_GRAPH_REFRESH:
+                _graph = ConnectionGraph().load()
+            graph = _graph
+    return graph
+
+def _loaded_graph():
+    # Maintenance hooks only touch a graph that already exists; a fresh load sees the change anyway
+    return _graph
+
+def connection_changed(user_a, user_b, status):
+    """Hook for connection writes: status is the new state, or None once deleted"""
+    graph = _loaded_graph()
+    if graph is not None:
+        graph.set_edge(user_a, user_b, status)
+
+def user_changed(user_id):
+    """Hook for profile writes: re-read the user's ranking attributes"""
+    graph = _loaded_graph()
+    if graph is None:
+        return
+    row = execute_query("""
+        SELECT user_id, role, major, graduation_year, skills
+        FROM users WHERE user_id = %s AND is_active = TRUE
+    """, (user_id,), fetch_one=True)
+    graph.set_user(user_id, row)
@@ -0,0 +1,68 @@
+import os
+from flask import request
+from app.models.database import execute_query
+from app.utils.cache import TTLCache
+
+# Count strategy configuration
+COUNT_CACHE_TTL = float(os.environ.get('COUNT_CACHE_TTL', 30))
+COUNT_CACHE_SIZE = int(os.environ.get('COUNT_CACHE_SIZE', 2048))
+COUNT_ESTIMATE_MIN_ROWS = int(os.environ.get('COUNT_ESTIMATE_MIN_ROWS', 100000))
+
+# (scope, count_sql, params) -> (total, estimated)
+_counts = TTLCache(maxsize=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+def include_total_requested():
+    """False when the client opted out of totals with include_total=false"""
+    return request.args.get('include_total', 'true').lower() != 'false'
+
+def _estimate_rows(count_sql, params):
+    """Optimizer row estimate for a single-table count query"""
+    plan = execute_query(f"EXPLAIN {count_sql.strip()}", params, fetch_one=True)
+    if not plan or plan.get('rows') is None:
+        return None
+    filtered = plan.get('filtered') or 100
+    return int(plan['rows'] * float(filtered) / 100)
+
+def count_rows(scope, count_sql, params, filtered=True):
+    """Total rows for a listing, served from a short-lived cache.
+
+    scope names what the count depends on (usually the table) so writes can
+    drop it with invalidate_counts(). Unfiltered listings over large tables
+    use the optimizer's estimate instead of a full COUNT(*).
+    Returns (total, estimated).
+    """
+    key = (scope, count_sql, tuple(params))
+    result = _counts.get(key)
+    if result is not None:
+        return result
+
+    if not filtered:
+        estimate = _estimate_rows(count_sql, params)
+        if estimate is not None and estimate >= COUNT_ESTIMATE_MIN_ROWS:
+            result = (estimate, True)
+
+    if result is None:
+        result = (execute_query(count_sql, params, fetch_one=True)['count'], False)
+
+    _counts.set(key, result)
+    return result
+
+def invalidate_counts(*scopes):
+    """Forget cached counts for the given scopes after a write"""
+    _counts.evict_where(lambda key: key[0] in scopes)
+
+def offset_pagination(page, limit, scope, count_sql, params, filtered=True):
+    """Pagination block for page/limit listings, skipping the count if not wanted"""
+    if not include_total_requested():
+        return {'page': page, 'limit': limit, 'total': None, 'pages': None}
+
+    total, estimated = count_rows(scope, count_sql, params, filtered)
+    pagination = {
+        'page': page,
+        'limit': limit,
+        'total': total,
+        'pages': (total + limit - 1) // limit
+    }
+    if estimated:
+        pagination['estimated'] = True
+    return pagination
@@ -0,0 +1,156 @@
+import heapq
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from app.models.database import execute_query
+from app.utils.counts import invalidate_counts
+from app.utils.search import sync_document
+
+# Deadline sweeper and closing-soon heaps
+DEADLINE_SWEEP_INTERVAL = float(os.environ.get('DEADLINE_SWEEP_INTERVAL', 3600))  # seconds, 0 disables
+DEADLINE_SWEEP_BATCH = int(os.environ.get('DEADLINE_SWEEP_BATCH', 1000))  # rows expired per statement
+DEADLINE_HEAP_REFRESH = float(os.environ.get('DEADLINE_HEAP_REFRESH', 900))  # seconds before a worker reloads a heap
+CLOSING_SOON_MAX_DAYS = 90
+
+# Keeps is_expired in step when a write sets application_deadline; goes after it in SET
+EXPIRY_ASSIGNMENT = "is_expired = COALESCE(application_deadline < CURDATE(), FALSE)"
+
+DeadlineSource = namedtuple('DeadlineSource', ['table', 'key'])
+
+DEADLINE_SOURCES = {
+    'opportunities': DeadlineSource('opportunities', 'opportunity_id'),
+    'scholarships': DeadlineSource('scholarships', 'scholarship_id')
+}
+
+class DeadlineHeap:
+    """Min-heap of (application_deadline, id) for active rows with an upcoming deadline.
+
+    Changes push a fresh entry and record the current deadline per id;
+    entries that no longer match it are stale and skipped, and the heap is
+    rebuilt once stale entries outnumber live ones.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.source = DEADLINE_SOURCES[name]
+        self._lock = threading.Lock()
+        self._heap = []
+        self._current = {}  # id -> deadline of its live heap entry
+        self.loaded_at = None
+
+    def load(self):
+        rows = execute_query(f"""
+            SELECT {self.source.key} as item_id, application_deadline
+            FROM {self.source.table}
+            WHERE is_active = TRUE AND is_expired = FALSE AND application_deadline >= CURDATE()
+        """)
+        with self._lock:
+            self._current = {row['item_id']: row['application_deadline'] for row in rows}
+            self._heap = [(deadline, item_id) for item_id, deadline in self._current.items()]
+            heapq.heapify(self._heap)
+            self.loaded_at = time.monotonic()
+        return self
+
+    def update(self, item_id, deadline):
+        """Track item_id's new deadline; None (or a past date) stops tracking it"""
+        with self._lock:
+            if deadline is None or deadline < date.today():
+                self._current.pop(item_id, None)
+            elif self._current.get(item_id) != deadline:
+                self._current[item_id] = deadline
+                heapq.heappush(self._heap, (deadline, item_id))
+            if len(self._heap) > 2 * len(self._current) + 64:
+                self._heap = [(deadline, item_id) for item_id, deadline in self._current.items()]
+                heapq.heapify(self._heap)
+
+    def closing_soon(self, until, limit):
+        """[(id, deadline)] in deadline order for deadlines from today through until"""
+        today = date.today()
+        with self._lock:
+            # Drop expired and stale entries from the top
+            while self._heap and (self._heap[0][0] < today or self._current.get(self._heap[0][1]) != self._heap[0][0]):
+                deadline, item_id = heapq.heappop(self._heap)
+                if deadline < today and self._current.get(item_id) == deadline:
+                    del self._current[item_id]
+
+            # Walk the heap as a tree in key order: O(limit log limit), no pops
+            results = []
+            frontier = [(self._heap[0], 0)] if self._heap else []
+            while frontier and len(results) < limit:
+                (deadline, item_id), index = heapq.heappop(frontier)
+                if deadline > until:
+                    break
+                if self._current.get(item_id) == deadline:
+                    results.append((item_id, deadline))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(self._heap):
+                        heapq.heappush(frontier, (self._heap[child], child))
+            return results
+
+    def __len__(self):
+        return len(self._current)
+
+_heaps = {}
+_heaps_lock = threading.Lock()
+
+def get_deadline_heap(name):
+    """This process's closing-soon heap for opportunities or scholarships"""
+    heap = _heaps.get(name)
+    if heap is None or time.monotonic() - heap.loaded_at > DEADLINE_HEAP_REFRESH:
+        with _heaps_lock:
+            heap = _heaps.get(name)
+            if heap is None or time.monotonic() - heap.loaded_at > DEADLINE_HEAP_REFRESH:
+                heap = _heaps[name] = DeadlineHeap(name).load()
+    return heap
+
+def deadline_changed(name, item_id):
+    """Hook for create/update/delete: re-read one row's deadline into a loaded heap"""
+    heap = _heaps.get(name)
+    if heap is None:
+        return
+    source = heap.source
+    row = execute_query(f"""
+        SELECT application_deadline FROM {source.table}
+        WHERE {source.key} = %s AND is_active = TRUE
+    """, (item_id,), fetch_one=True)
+    heap.update(item_id, row['application_deadline'] if row else None)
+
+def expire_past_deadlines(batch_size=None):
+    """Mark active opportunities and scholarships whose deadline has passed as expired.
+
+    Expiry is its own flag rather than the is_active soft delete, so expired
+    postings still open from their detail pages and come back when a poster
+    extends the deadline. Works in batches off the (is_active, is_expired,
+    application_deadline) index so each statement locks at most batch_size
+    rows. Returns {name: rows expired}.
+    """
+    batch_size = batch_size or DEADLINE_SWEEP_BATCH
+    expired = {}
+    for name, source in DEADLINE_SOURCES.items():
+        expired[name] = 0
+        while True:
+            rows = execute_query(f"""
+                SELECT {source.key} as item_id FROM {source.table}
+                WHERE is_active = TRUE AND is_expired = FALSE AND application_deadline < CURDATE()
+                ORDER BY application_deadline
+                LIMIT %s
+            """, (batch_size,))
+            if not rows:
+                break
+            item_ids = [row['item_id'] for row in rows]
+            placeholders = ', '.join(['%s'] * len(item_ids))
+            # Re-check the deadline in case the row was extended since it was read
+            expired[name] += execute_query(f"""
+                UPDATE {source.table} SET is_expired = TRUE
+                WHERE {source.key} IN ({placeholders})
+                  AND is_expired = FALSE AND application_deadline < CURDATE()
+            """, item_ids)
+            for item_id in item_ids:
+                sync_document(name, item_id)
+            if len(rows) < batch_size:
+                break
+        if expired[name]:
+            invalidate_counts(name)
+    return expired
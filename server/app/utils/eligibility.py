@@ -0,0 +1,413 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+import numpy as np
+from app.models.database import execute_query
+from app.utils.cache import TTLCache
+
+# Eligibility engine configuration (per worker process)
+ELIGIBILITY_REFRESH = float(os.environ.get('ELIGIBILITY_REFRESH', 600))  # seconds before open scholarships are reloaded
+ELIGIBLE_CACHE_TTL = float(os.environ.get('ELIGIBLE_CACHE_TTL', 600))
+ELIGIBLE_CACHE_SIZE = int(os.environ.get('ELIGIBLE_CACHE_SIZE', 10000))
+
+# Structured form of an eligibility_criteria value; None / empty means unrestricted
+# (preferred_majors is a soft criterion: it marks matches but never filters)
+EligibilityRule = namedtuple('EligibilityRule', [
+    'majors', 'degrees', 'min_year', 'max_year', 'required_skills', 'min_gpa', 'preferred_majors'
+])
+
+UNRESTRICTED = EligibilityRule(frozenset(), frozenset(), None, None, frozenset(), None, frozenset())
+
+MAJOR_ALIASES = {
+    'cs': 'computer science',
+    'ce': 'computer engineering',
+    'ee': 'electrical engineering',
+    'it': 'information technology',
+    'econ': 'economics',
+    'math': 'mathematics'
+}
+MAJOR_GROUPS = {
+    'stem': frozenset([
+        'computer science', 'computer engineering', 'software engineering', 'data science',
+        'information technology', 'engineering', 'mathematics', 'statistics', 'physics',
+        'chemistry', 'biology', 'science', 'technology'
+    ])
+}
+
+# Majors the free-text parser trusts; anything else leaves the scholarship unfiltered
+KNOWN_MAJORS = frozenset([
+    'accounting', 'anthropology', 'architecture', 'art', 'biochemistry', 'biology', 'business',
+    'business administration', 'chemistry', 'communications', 'computer engineering',
+    'computer science', 'data science', 'design', 'economics', 'education', 'electrical engineering',
+    'engineering', 'english', 'finance', 'history', 'information technology', 'journalism', 'law',
+    'management', 'marketing', 'mathematics', 'mechanical engineering', 'medicine', 'music',
+    'nursing', 'pharmacy', 'philosophy', 'physics', 'political science', 'psychology',
+    'public health', 'sociology', 'software engineering', 'statistics'
+]) | MAJOR_GROUPS['stem']
+# A fragment ending in one of these names a discipline even if it is not listed above
+DISCIPLINE_SUFFIXES = ('engineering', 'science', 'sciences', 'studies')
+# Words around a major name that are not part of it ("undergraduate students of ...")
+MAJOR_FILLER = frozenset([
+    'a', 'an', 'the', 'in', 'of', 'for', 'to', 'and', 'with', 'open', 'relevant', 'related',
+    'student', 'students', 'undergraduate', 'undergraduates', 'graduate', 'graduates',
+    'applicants', 'eligible', 'only', 'field', 'fields', 'majoring', 'major', 'majors'
+])
+_ANY_MAJOR = re.compile(r"\b(?:all|any)\s+(?:\w+\s+)?(?:majors?|fields?|disciplines?)\b|regardless of (?:your )?major|open to all\b")
+_SOFT_WORDS = re.compile(r"\b(?:prefer\w*|encourag\w*|welcome\w*|a plus|priority)\b")
+
+DEGREE_LEVELS = ('associate', 'bachelor', 'master', 'phd')
+# Whole-word patterns per degree; "graduate students" covers both graduate levels.
+# (?!\w) rather than \b after abbreviations that may end in a dot.
+DEGREE_PATTERNS = [
+    (('phd',), re.compile(r"\bph\.?\s?d(?!\w)|\bdoctoral\b|\bdoctorate\b")),
+    (('master',), re.compile(r"\bmaster'?s?\b|\bmba\b|\bm\.s\.?(?!\w)|\bmsc\b|\bm\.?tech\b|\bpostgraduates?\b")),
+    (('bachelor',), re.compile(r"\bbachelor'?s?\b|\bundergrad(?:uate)?s?\b|\bb\.s\.?(?!\w)|\bbsc\b|\bb\.?tech\b|\bb\.e\.?(?!\w)|\bb\.a\.?(?!\w)")),
+    (('associate',), re.compile(r"\bassociate'?s? degrees?\b|\bassociate of\b")),
+    (('master', 'phd'), re.compile(r"\bgraduate (?:students?|level|programs?|studies)\b"))
+]
+# A clause that talks about a degree without naming a level we recognise
+_DEGREE_CUE = re.compile(r"\bdegrees?\b|\bdiplomas?\b")
+
+_MAJOR_PATTERNS = [
+    re.compile(r"([a-z][a-z/&,\- ]*?)\s+majors?\b"),
+    re.compile(r"pursuing\s+(?:an?\s+)?([a-z][a-z/&\- ]*?)\s+degree"),
+    re.compile(r"(?:majoring|degree)\s+in\s+([a-z][a-z/&\- ]*?)(?=,|;|\.|$)")
+]
+_YEAR_RANGE = re.compile(r"(?:class of|graduat\w*(?: year)?(?: in)?)\s*(\d{4})\s*(?:-|–|to|or|through)\s*(\d{4})")
+_YEAR_EXACT = re.compile(r"(?:class of|graduat\w* (?:in|year))\s*(\d{4})")
+_YEAR_MAX = re.compile(r"graduat\w* (?:by|before)\s*(\d{4})")
+_YEAR_MIN = re.compile(r"graduat\w* after\s*(\d{4})")
+_GPA = re.compile(r"gpa\s*(?:of\s*)?(?:>=|≥|at least|minimum(?: of)?|min\.?)?\s*(\d(?:\.\d+)?)")
+_SKILLS = re.compile(r"proficien\w* (?:in|with) ([a-z0-9+#/ ,]+?)(?=;|\.|$)")
+
+def _normalize(value):
+    return re.sub(r'\s+', ' ', str(value).strip().lower())
+
+def _major_terms(value):
+    """Normalized majors named by one criteria fragment ("Finance/Economics", "CS", "STEM").
+
+    Returns (terms, confident): confident is False when a part of the
+    fragment is not a recognised major, so the caller can leave majors
+    unrestricted rather than filter on a guess.
+    """
+    terms = set()
+    confident = True
+    for part in re.split(r"/|,| or ", _normalize(value)):
+        words = [word for word in re.findall(r"[a-z&\-]+", part) if word not in MAJOR_FILLER]
+        if not words:
+            continue
+        part = ' '.join(words)
+        part = MAJOR_ALIASES.get(part, part)
+        if part in MAJOR_GROUPS:
+            terms.update(MAJOR_GROUPS[part])
+        elif part in KNOWN_MAJORS or part.endswith(DISCIPLINE_SUFFIXES):
+            terms.add(part)
+        else:
+            confident = False
+    return terms, confident
+
+def _degree_levels(text):
+    levels = set()
+    for names, pattern in DEGREE_PATTERNS:
+        if pattern.search(text):
+            levels.update(names)
+    return levels
+
+def degree_level(value):
+    """Map free-text degree names onto DEGREE_LEVELS, or None"""
+    text = _normalize(value or '')
+    for names, pattern in DEGREE_PATTERNS:
+        if pattern.search(text):
+            return names[0]
+    return None
+
+def parse_criteria(criteria):
+    """Parse eligibility_criteria into an EligibilityRule.
+
+    A JSON object is read field by field (majors, degrees,
+    graduation_year_min, graduation_year_max, required_skills, min_gpa);
+    anything else is free text scanned for the same requirements.
+    Requirements that cannot be recognised are left unrestricted.
+    """
+    if not criteria:
+        return UNRESTRICTED
+    try:
+        structured = json.loads(criteria) if isinstance(criteria, str) else criteria
+    except ValueError:
+        structured = None
+    if isinstance(structured, dict):
+        # Structured majors are taken as written, except "all"/"any"
+        majors = set()
+        for major in structured.get('majors') or []:
+            major = _normalize(major)
+            if major in ('all', 'any') or _ANY_MAJOR.search(major):
+                majors = set()
+                break
+            major = MAJOR_ALIASES.get(major, major)
+            majors.update(MAJOR_GROUPS.get(major, {major}))
+        min_gpa = structured.get('min_gpa')
+        return EligibilityRule(
+            frozenset(majors),
+            frozenset(filter(None, (degree_level(degree) for degree in structured.get('degrees') or []))),
+            structured.get('graduation_year_min'),
+            structured.get('graduation_year_max'),
+            frozenset(_normalize(skill) for skill in structured.get('required_skills') or [] if str(skill).strip()),
+            float(min_gpa) if min_gpa is not None else None,
+            frozenset(_normalize(major) for major in structured.get('preferred_majors') or [])
+        )
+
+    text = _normalize(criteria)
+    majors, preferred = _parse_majors(text)
+
+    degrees = _parse_degrees(text)
+
+    min_year = max_year = None
+    year_range = _YEAR_RANGE.search(text)
+    if year_range:
+        min_year, max_year = sorted((int(year_range.group(1)), int(year_range.group(2))))
+    elif _YEAR_EXACT.search(text):
+        min_year = max_year = int(_YEAR_EXACT.search(text).group(1))
+    else:
+        if _YEAR_MAX.search(text):
+            max_year = int(_YEAR_MAX.search(text).group(1))
+        if _YEAR_MIN.search(text):
+            min_year = int(_YEAR_MIN.search(text).group(1)) + 1
+
+    skills = set()
+    for fragment in _SKILLS.findall(text):
+        skills.update(skill.strip() for skill in re.split(r",| and | or |/", fragment) if skill.strip())
+
+    gpa = _GPA.search(text)
+    return EligibilityRule(
+        frozenset(majors), frozenset(degrees), min_year, max_year,
+        frozenset(skills), float(gpa.group(1)) if gpa else None, preferred
+    )
+
+def _parse_majors(text):
+    """(required majors, preferred majors) named in free-text criteria.
+
+    Clauses marked as a preference ("... preferred", "... encouraged") only
+    feed preferred majors. Requirements are dropped entirely when the text
+    opens eligibility to all majors or names a major the parser does not
+    recognise, since a wrong requirement would hide the scholarship.
+    """
+    if _ANY_MAJOR.search(text):
+        return frozenset(), frozenset()
+    required, preferred = set(), set()
+    confident = True
+    for clause in re.split(r"[.;]", text):
+        soft = _SOFT_WORDS.search(clause) is not None
+        for pattern in _MAJOR_PATTERNS:
+            for fragment in pattern.findall(clause):
+                terms, fragment_confident = _major_terms(fragment)
+                if soft:
+                    preferred.update(terms)
+                else:
+                    required.update(terms)
+                    confident = confident and fragment_confident
+    if not confident:
+        required = set()
+    return frozenset(required), frozenset(preferred)
+
+def _parse_degrees(text):
+    """Degree levels required by free-text criteria.
+
+    Levels are matched as whole words, so "mastered" or "doctors" name no
+    degree. Clauses marked as a preference are ignored, and a clause that
+    mentions a degree without naming a recognised level leaves degrees
+    unrestricted, the same way unrecognised majors do.
+    """
+    degrees = set()
+    # Sentence ends, but not the dots inside "m.s." or "ph.d."
+    for clause in re.split(r"(?<!\.[a-z])\.\s|;", text):
+        levels = _degree_levels(clause)
+        if _SOFT_WORDS.search(clause):
+            continue
+        if not levels and _DEGREE_CUE.search(clause) and not any(pattern.search(clause) for pattern in _MAJOR_PATTERNS[1:]):
+            return frozenset()
+        degrees.update(levels)
+    return frozenset(degrees)
+
+def _major_matches(student_major, term):
+    # Whole-word containment either way: "computer science" matches "computer science and engineering"
+    return bool(re.search(rf"\b{re.escape(term)}\b", student_major) or re.search(rf"\b{re.escape(student_major)}\b", term))
+
+class EligibilityEngine:
+    """Open scholarships compiled into NumPy arrays so one student is checked
+    against all of them with a handful of vector operations.
+
+    Set-valued requirements (majors, degree levels, skills) become 0/1
+    matrices over their vocabularies; year and GPA bounds become arrays
+    with -inf/inf or NaN for "no requirement".
+    """
+
+    def __init__(self, rules):
+        self.scholarship_ids = np.array(list(rules), dtype=np.int64)
+        rule_list = [rules[scholarship_id] for scholarship_id in rules]
+        count = len(rule_list)
+
+        self.major_terms = sorted({term for rule in rule_list for term in rule.majors | rule.preferred_majors})
+        major_index = {term: index for index, term in enumerate(self.major_terms)}
+        self.majors = np.zeros((count, len(self.major_terms)), dtype=np.int8)
+        self.preferred = np.zeros((count, len(self.major_terms)), dtype=np.int8)
+        self.degrees = np.zeros((count, len(DEGREE_LEVELS)), dtype=np.int8)
+        self.skill_terms = {term: index for index, term in enumerate(sorted({skill for rule in rule_list for skill in rule.required_skills}))}
+        self.skills = np.zeros((count, len(self.skill_terms)), dtype=np.int8)
+        self.min_year = np.full(count, -np.inf)
+        self.max_year = np.full(count, np.inf)
+        self.min_gpa = np.full(count, np.nan)
+
+        for row, rule in enumerate(rule_list):
+            for term in rule.majors:
+                self.majors[row, major_index[term]] = 1
+            for term in rule.preferred_majors:
+                self.preferred[row, major_index[term]] = 1
+            for level in rule.degrees:
+                self.degrees[row, DEGREE_LEVELS.index(level)] = 1
+            for skill in rule.required_skills:
+                self.skills[row, self.skill_terms[skill]] = 1
+            if rule.min_year is not None:
+                self.min_year[row] = rule.min_year
+            if rule.max_year is not None:
+                self.max_year[row] = rule.max_year
+            if rule.min_gpa is not None:
+                self.min_gpa[row] = rule.min_gpa
+
+        self.major_restricted = self.majors.any(axis=1)
+        self.degree_restricted = self.degrees.any(axis=1)
+        self.skill_counts = self.skills.sum(axis=1)
+        self.year_restricted = np.isfinite(self.min_year) | np.isfinite(self.max_year)
+        self.loaded_at = time.monotonic()
+        self.loaded_on = date.today()
+
+    def evaluate(self, profile, gpa=None):
+        """(eligible scholarship ids, ids whose GPA requirement could not be checked,
+        eligible ids whose preferred majors include the student's)"""
+        if not len(self.scholarship_ids):
+            return [], [], []
+
+        # Majors: which rule terms does the student's major satisfy?
+        student_major = _normalize(profile.get('major') or '')
+        if student_major and self.major_terms:
+            major_vector = np.array([_major_matches(student_major, term) for term in self.major_terms], dtype=np.int32)
+            major_ok = ~self.major_restricted | (self.majors @ major_vector > 0)
+            preferred = self.preferred @ major_vector > 0
+        else:
+            major_ok = ~self.major_restricted
+            preferred = np.zeros(len(self.scholarship_ids), dtype=bool)
+
+        level = degree_level(profile.get('degree'))
+        if level is not None:
+            degree_ok = ~self.degree_restricted | (self.degrees[:, DEGREE_LEVELS.index(level)] > 0)
+        else:
+            degree_ok = ~self.degree_restricted
+
+        year = profile.get('graduation_year')
+        if year:
+            year_ok = (self.min_year <= year) & (year <= self.max_year)
+        else:
+            year_ok = ~self.year_restricted
+
+        # Every required skill must be on the profile
+        skill_vector = np.zeros(len(self.skill_terms), dtype=np.int32)
+        for skill in _profile_skills(profile.get('skills')):
+            index = self.skill_terms.get(skill)
+            if index is not None:
+                skill_vector[index] = 1
+        skills_ok = self.skills @ skill_vector >= self.skill_counts
+
+        # GPA is not on the profile; it is checked only when the student supplies it
+        gpa_required = ~np.isnan(self.min_gpa)
+        if gpa is not None:
+            with np.errstate(invalid='ignore'):
+                gpa_ok = ~gpa_required | (gpa >= self.min_gpa)
+        else:
+            gpa_ok = np.ones(len(self.scholarship_ids), dtype=bool)
+
+        eligible = major_ok & degree_ok & year_ok & skills_ok & gpa_ok
+        unverified = eligible & gpa_required if gpa is None else np.zeros_like(eligible)
+        return (
+            self.scholarship_ids[eligible].tolist(),
+            self.scholarship_ids[unverified].tolist(),
+            self.scholarship_ids[eligible & preferred].tolist()
+        )
+
+def _profile_skills(skills):
+    if not skills:
+        return set()
+    try:
+        values = json.loads(skills) if isinstance(skills, str) else skills
+    except ValueError:
+        return set()
+    return {_normalize(skill) for skill in values if str(skill).strip()}
+
+_rules = {}  # scholarship_id -> (eligibility_criteria, EligibilityRule)
+_engine = None
+_engine_lock = threading.Lock()
+_eligible = TTLCache(maxsize=ELIGIBLE_CACHE_SIZE, ttl=ELIGIBLE_CACHE_TTL)
+
+def compile_rule(scholarship_id, criteria):
+    """Parsed rule for a scholarship, reparsed only when its criteria text changes"""
+    cached = _rules.get(scholarship_id)
+    if cached is not None and cached[0] == criteria:
+        return cached[1]
+    rule = parse_criteria(criteria)
+    _rules[scholarship_id] = (criteria, rule)
+    return rule
+
+def get_engine():
+    """This process's engine over open scholarships, rebuilt daily, when stale or after changes"""
+    global _engine
+    engine = _engine
+    if engine is None or _engine_stale(engine):
+        with _engine_lock:
+            if _engine is None or _engine_stale(_engine):
+                rows = execute_query("""
+                    SELECT scholarship_id, eligibility_criteria
+                    FROM scholarships
+                    WHERE is_active = TRUE AND is_expired = FALSE AND application_deadline >= CURDATE()
+                """)
+                _engine = EligibilityEngine({
+                    row['scholarship_id']: compile_rule(row['scholarship_id'], row['eligibility_criteria'])
+                    for row in rows
+                })
+                # Forget rules for scholarships that closed or were deactivated since the last build
+                open_ids = {row['scholarship_id'] for row in rows}
+                for scholarship_id in [key for key in _rules if key not in open_ids]:
+                    _rules.pop(scholarship_id, None)
+                _eligible.clear()
+            engine = _engine
+    return engine
+
+def _engine_stale(engine):
+    return time.monotonic() - engine.loaded_at > ELIGIBILITY_REFRESH or engine.loaded_on != date.today()
+
+def eligible_scholarships(user_id, profile, gpa=None):
+    """Cached (eligible ids, GPA-unverified ids, preferred-major ids) for one student"""
+    engine = get_engine()
+    key = (user_id, gpa)
+    result = _eligible.get(key)
+    if result is None:
+        result = engine.evaluate(profile, gpa)
+        _eligible.set(key, result)
+    return result
+
+def scholarships_changed(*scholarship_ids):
+    """Hook for scholarship writes: recompile on the next request.
+
+    Pass the ids of scholarships that were deactivated or removed so their
+    compiled rules are dropped straight away.
+    """
+    global _engine
+    for scholarship_id in scholarship_ids:
+        _rules.pop(scholarship_id, None)
+    _engine = None
+    _eligible.clear()
+
+def student_changed(user_id):
+    """Hook for profile writes: drop the student's cached eligible sets"""
+    _eligible.evict_where(lambda key: key[0] == user_id)
@@ -0,0 +1,141 @@
+import bcrypt
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes on the request thread
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2))
+
+class HashingBusy(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+def _hash(password, rounds):
+    start = time.monotonic()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return hashed, time.monotonic() - start
+
+def _check(password, hashed):
+    start = time.monotonic()
+    matches = bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return matches, time.monotonic() - start
+
+class HashingPool:
+    """Bounded process pool that keeps bcrypt off the request threads.
+
+    At most ``max_queue`` jobs may be running or waiting at once; callers
+    that cannot get a slot within ``queue_timeout`` get HashingBusy.
+    """
+
+    def __init__(self, workers, max_queue, queue_timeout):
+        self.workers = workers
+        self.max_queue = max(1, max_queue)
+        self.queue_timeout = queue_timeout
+        self.pid = os.getpid()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_queue)
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._jobs = 0
+        self._rejected = 0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def run(self, fn, *args):
+        """Run fn in the pool and return its result"""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy('Password hashing queue is full')
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            submitted = time.monotonic()
+            if self.workers > 0:
+                result, elapsed = self._get_executor().submit(fn, *args).result()
+            else:
+                result, elapsed = fn(*args)
+            # Time spent waiting for a slot plus time queued inside the executor
+            waited = (submitted - start) + max(time.monotonic() - submitted - elapsed, 0.0)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+        with self._lock:
+            self._jobs += 1
+            self._hash_time_total += elapsed
+            self._hash_time_max = max(self._hash_time_max, elapsed)
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+        return result
+
+    def stats(self):
+        """Snapshot of hashing latency and queue counters"""
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'jobs': self._jobs,
+                'rejected': self._rejected,
+                'avg_hash_ms': round(self._hash_time_total * 1000 / self._jobs, 3) if self._jobs else 0.0,
+                'max_hash_ms': round(self._hash_time_max * 1000, 3),
+                'avg_queue_wait_ms': round(self._wait_time_total * 1000 / self._jobs, 3) if self._jobs else 0.0,
+                'max_queue_wait_ms': round(self._wait_time_max * 1000, 3)
+            }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_hashing_pool():
+    """Return this process's hashing pool, creating it after a fork"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_QUEUE_TIMEOUT)
+            pool = _pool
+    return pool
+
+def _reset_pool_after_fork():
+    # The parent's executor and its worker processes belong to the parent
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def hash_password(password):
+    """Hash a password with the configured bcrypt cost"""
+    return get_hashing_pool().run(_hash, password, BCRYPT_ROUNDS)
+
+def check_password(password, hashed):
+    return get_hashing_pool().run(_check, password, hashed)
+
+def needs_rehash(hashed):
+    """True when a stored hash was made with a different cost than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+def get_hashing_stats():
+    return get_hashing_pool().stats()
@@ -0,0 +1,214 @@
+import math
+import os
+import threading
+import time
+import numpy as np
+from app.models.database import execute_query
+
+# Matching engine configuration (per worker process)
+MENTOR_MATCH_REFRESH = float(os.environ.get('MENTOR_MATCH_REFRESH', 600))
+MENTOR_MATCH_MIN_REBUILD = float(os.environ.get('MENTOR_MATCH_MIN_REBUILD', 30))
+
+# Score weights for mentor matches (they sum to 1, so scores fall in [0, 1])
+SKILL_WEIGHT = 0.6
+MAJOR_WEIGHT = 0.15
+LOCATION_WEIGHT = 0.1
+CAPACITY_WEIGHT = 0.15
+CAPACITY_SATURATION = 5  # open mentee slots beyond this earn no extra credit
+
+def _code(value):
+    return (value or '').strip().lower() or None
+
+class MatchingEngine:
+    """Mentor profiles encoded as sparse IDF-weighted expertise vectors.
+
+    Each mentor's row holds the normalized expertise from mentor_expertise
+    (profile skills plus active programs' expertise areas), stored in CSR
+    form: `indptr` delimits each mentor's slice of `columns`/`weights`.
+    Scoring a student touches every stored entry once, so one query costs
+    O(total expertise rows) in vectorized NumPy rather than a Python loop
+    per mentor.
+    """
+
+    def __init__(self):
+        self.mentor_ids = np.zeros(0, dtype=np.int64)
+        self.vocabulary = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.columns = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.majors = np.zeros(0, dtype=np.int64)
+        self.locations = np.zeros(0, dtype=np.int64)
+        self.capacity = np.zeros(0, dtype=np.int64)
+        self._major_codes = {}
+        self._location_codes = {}
+        self.loaded_at = None
+        self.build_ms = None
+
+    def load(self):
+        """Build the mentor matrix from the mentor directory"""
+        start = time.monotonic()
+        mentors = execute_query("""
+            SELECT d.mentor_id, d.location, u.major
+            FROM mentor_directory d
+            JOIN users u ON d.mentor_id = u.user_id
+            ORDER BY d.mentor_id
+        """)
+        expertise = execute_query("""
+            SELECT mentor_id, expertise FROM mentor_expertise ORDER BY mentor_id
+        """)
+        capacity = execute_query("""
+            SELECT mp.mentor_id,
+                   SUM(GREATEST(mp.max_mentees - (
+                       SELECT COUNT(*) FROM mentorship_sessions ms WHERE ms.program_id = mp.program_id
+                   ), 0)) as remaining
+            FROM mentorship_programs mp
+            WHERE mp.is_active = TRUE
+            GROUP BY mp.mentor_id
+        """)
+
+        count = len(mentors)
+        position = {row['mentor_id']: index for index, row in enumerate(mentors)}
+        self.mentor_ids = np.array([row['mentor_id'] for row in mentors], dtype=np.int64)
+        self.majors = np.array([self._encode(self._major_codes, row['major']) for row in mentors], dtype=np.int64)
+        self.locations = np.array([self._encode(self._location_codes, row['location']) for row in mentors], dtype=np.int64)
+
+        self.capacity = np.zeros(count, dtype=np.int64)
+        for row in capacity:
+            index = position.get(row['mentor_id'])
+            if index is not None:
+                self.capacity[index] = int(row['remaining'] or 0)
+
+        rows, columns = [], []
+        for row in expertise:
+            index = position.get(row['mentor_id'])
+            if index is None:
+                continue
+            rows.append(index)
+            columns.append(self.vocabulary.setdefault(row['expertise'], len(self.vocabulary)))
+        self.rows = np.array(rows, dtype=np.int64)
+        self.columns = np.array(columns, dtype=np.int64)
+
+        # Rows arrive sorted by mentor_id, so each mentor's entries are contiguous
+        self.indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=count), out=self.indptr[1:])
+
+        # Rare expertise says more about a mentor than "communication" does
+        document_frequency = np.bincount(self.columns, minlength=len(self.vocabulary))
+        self.idf = (np.log((count + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        self.weights = self.idf[self.columns]
+        self.norms = np.sqrt(np.bincount(self.rows, weights=self.weights ** 2, minlength=count)).astype(np.float32)
+
+        self.loaded_at = time.monotonic()
+        self.build_ms = round((self.loaded_at - start) * 1000, 3)
+        return self
+
+    def _encode(self, codes, value):
+        value = _code(value)
+        if value is None:
+            return -1
+        return codes.setdefault(value, len(codes))
+
+    def match(self, expertise, major=None, location=None, limit=10, exclude=None):
+        """Top mentors for a mentee as [(mentor_id, score, breakdown, shared_expertise)]"""
+        count = len(self.mentor_ids)
+        if count == 0 or limit <= 0:
+            return []
+
+        # Query vector: known terms index the vocabulary; unknown ones still count towards its norm
+        terms = sorted(set(expertise))
+        known = [self.vocabulary[term] for term in terms if term in self.vocabulary]
+        unknown = len(terms) - len(known)
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        query[known] = self.idf[known]
+        query_norm = math.sqrt(float(np.dot(query, query)) + unknown * (math.log(count + 1) + 1) ** 2)
+
+        # Cosine similarity for every mentor in one pass over the stored entries
+        if query_norm and len(self.weights):
+            dots = np.bincount(self.rows, weights=self.weights * query[self.columns], minlength=count)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                similarity = np.where(self.norms > 0, dots / (self.norms * query_norm), 0.0)
+        else:
+            similarity = np.zeros(count)
+
+        major_code = self._major_codes.get(_code(major), -2)
+        location_code = self._location_codes.get(_code(location), -2)
+        major_match = (self.majors == major_code).astype(np.float32)
+        location_match = (self.locations == location_code).astype(np.float32)
+        open_slots = np.minimum(self.capacity, CAPACITY_SATURATION) / CAPACITY_SATURATION
+
+        scores = (
+            SKILL_WEIGHT * similarity
+            + MAJOR_WEIGHT * major_match
+            + LOCATION_WEIGHT * location_match
+            + CAPACITY_WEIGHT * open_slots
+        )
+        if exclude is not None:
+            scores[self.mentor_ids == exclude] = -np.inf
+
+        # Partial selection of the top-k, then sort only those k
+        k = min(limit, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((self.mentor_ids[top], -scores[top]))]
+
+        known_set = set(known)
+        terms_by_column = None
+        results = []
+        for index in top:
+            if not np.isfinite(scores[index]):
+                continue
+            shared = [int(column) for column in self.columns[self.indptr[index]:self.indptr[index + 1]] if column in known_set]
+            if shared and terms_by_column is None:
+                terms_by_column = {column: term for term, column in self.vocabulary.items()}
+            results.append((
+                int(self.mentor_ids[index]),
+                round(float(scores[index]), 4),
+                {
+                    'skills': round(float(similarity[index]), 4),
+                    'major': bool(major_match[index]),
+                    'location': bool(location_match[index]),
+                    'open_slots': int(self.capacity[index])
+                },
+                sorted(terms_by_column[column] for column in shared)
+            ))
+        return results
+
+    def stats(self):
+        return {
+            'mentors': len(self.mentor_ids),
+            'vocabulary': len(self.vocabulary),
+            'entries': len(self.weights),
+            'build_ms': self.build_ms
+        }
+
+_engine = None
+_engine_lock = threading.Lock()
+_stale = False
+
+def get_engine():
+    """This process's matching engine, rebuilt when old or (at most every
+    MENTOR_MATCH_MIN_REBUILD seconds) after mentor data changed"""
+    global _engine, _stale
+    engine = _engine
+    if engine is None or _needs_rebuild(engine):
+        with _engine_lock:
+            if _engine is None or _needs_rebuild(_engine):
+                _stale = False
+                _engine = MatchingEngine().load()
+            engine = _engine
+    return engine
+
+def _needs_rebuild(engine):
+    age = time.monotonic() - engine.loaded_at
+    return age > MENTOR_MATCH_REFRESH or (_stale and age > MENTOR_MATCH_MIN_REBUILD)
+
+def mentors_changed():
+    """Hook for mentor directory writes: rebuild on a later request"""
+    global _stale
+    _stale = True
+
+def get_matching_stats():
+    engine = _engine
+    return engine.stats() if engine is not None else None
@@ -0,0 +1,156 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from app.models.database import execute_query
+
+# column: SQL expression used in WHERE/ORDER BY, field: key of that value in result rows
+SortKey = namedtuple('SortKey', ['column', 'field', 'descending', 'nullable'])
+SortKey.__new__.__defaults__ = (False, False)
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise ValueError('Unknown cursor value')
+    return value
+
+def encode_cursor(values, backwards=False):
+    """Encode sort key values into an opaque, URL-safe cursor"""
+    payload = {'k': [_encode_value(v) for v in values]}
+    if backwards:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_keys):
+    """Decode a cursor into (values, backwards); an empty cursor means the first page"""
+    if not cursor:
+        return None, False
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload['k']]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+    if len(values) != len(sort_keys):
+        raise InvalidCursor('Invalid cursor')
+    return values, bool(payload.get('b'))
+
+def _after(key, value, descending):
+    """Predicate for rows strictly after value in this column (MySQL sorts NULL first)"""
+    if value is None:
+        # NULLs come first ascending and last descending
+        return (None, []) if descending else (f"{key.column} IS NOT NULL", [])
+    if descending:
+        if key.nullable:
+            return f"({key.column} < %s OR {key.column} IS NULL)", [value]
+        return f"{key.column} < %s", [value]
+    return f"{key.column} > %s", [value]
+
+def _equal(key, value):
+    if value is None:
+        return f"{key.column} IS NULL", []
+    return f"{key.column} = %s", [value]
+
+def seek_condition(sort_keys, values, backwards=False):
+    """Build a WHERE predicate selecting rows after (or before) the given sort key values"""
+    directions = [key.descending != backwards for key in sort_keys]
+
+    # A row-value comparison lets MySQL use a single index range when possible
+    uniform = len(set(directions)) == 1
+    if uniform and None not in values and not any(key.nullable for key in sort_keys):
+        columns = ', '.join(key.column for key in sort_keys)
+        placeholders = ', '.join(['%s'] * len(values))
+        operator = '<' if directions[0] else '>'
+        return f"({columns}) {operator} ({placeholders})", list(values)
+
+    branches = []
+    params = []
+    for i, key in enumerate(sort_keys):
+        after_sql, after_params = _after(key, values[i], directions[i])
+        if after_sql is None:
+            continue
+        parts = []
+        branch_params = []
+        for prev_key, prev_value in zip(sort_keys[:i], values[:i]):
+            equal_sql, equal_params = _equal(prev_key, prev_value)
+            parts.append(equal_sql)
+            branch_params.extend(equal_params)
+        parts.append(after_sql)
+        branch_params.extend(after_params)
+        branches.append('(' + ' AND '.join(parts) + ')')
+        params.extend(branch_params)
+
+    if not branches:
+        return '1 = 0', []
+    return '(' + ' OR '.join(branches) + ')', params
+
+def order_clause(sort_keys, backwards=False):
+    """ORDER BY expression for sort_keys, reversed when paging backwards"""
+    return ', '.join(
+        f"{key.column} {'DESC' if key.descending != backwards else 'ASC'}"
+        for key in sort_keys
+    )
+
+def keyset_paginate(select_sql, where_clause, params, sort_keys, cursor, limit):
+    """Fetch one page seeking past the cursor instead of using OFFSET.
+
+    select_sql is the SELECT ... FROM ... JOIN part of the query; the WHERE,
+    ORDER BY and LIMIT clauses are added here. Returns (rows, pagination).
+    """
+    values, backwards = decode_cursor(cursor, sort_keys)
+
+    conditions = [where_clause]
+    query_params = list(params)
+    if values is not None:
+        seek_sql, seek_params = seek_condition(sort_keys, values, backwards)
+        conditions.append(seek_sql)
+        query_params.extend(seek_params)
+
+    rows = execute_query(f"""
+        {select_sql}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order_clause(sort_keys, backwards)}
+        LIMIT %s
+    """, query_params + [limit + 1])
+
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+    if backwards:
+        rows.reverse()
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        first = [rows[0][key.field] for key in sort_keys]
+        last = [rows[-1][key.field] for key in sort_keys]
+        if backwards:
+            next_cursor = encode_cursor(last)
+            prev_cursor = encode_cursor(first, backwards=True) if has_more else None
+        else:
+            next_cursor = encode_cursor(last) if has_more else None
+            prev_cursor = encode_cursor(first, backwards=True) if values is not None else None
+
+    return rows, {
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
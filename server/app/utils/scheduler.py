@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+import time
+from app.models.database import execute_query
+
+# Background jobs run in every worker process unless disabled
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() != 'false'
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    def __init__(self, name, interval, func, exclusive=True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.exclusive = exclusive
+        self.next_run = time.monotonic() + interval
+        self.runs = 0
+        self.failures = 0
+        self.last_duration_ms = None
+
+class Scheduler:
+    """Runs registered jobs on a daemon thread inside an app context.
+
+    Exclusive jobs take a MySQL named lock first, so when several worker
+    processes share a database only one of them runs a given job at a time.
+    """
+
+    def __init__(self, app, jobs):
+        self.app = app
+        self.jobs = jobs
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'pid': self.pid,
+            'jobs': {
+                job.name: {
+                    'interval': job.interval,
+                    'runs': job.runs,
+                    'failures': job.failures,
+                    'last_duration_ms': job.last_duration_ms
+                }
+                for job in self.jobs
+            }
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self.jobs:
+                if job.next_run <= now:
+                    self.run_job(job)
+                    job.next_run = time.monotonic() + job.interval
+            wait = min(job.next_run for job in self.jobs) - time.monotonic() if self.jobs else 60
+            self._stop.wait(max(wait, 0.1))
+
+    def run_job(self, job):
+        start = time.monotonic()
+        try:
+            with self.app.app_context():
+                if job.exclusive:
+                    locked = execute_query("SELECT GET_LOCK(%s, 0) as locked", (f"job:{job.name}",), fetch_one=True)
+                    if not locked or not locked['locked']:
+                        return
+                    try:
+                        job.func()
+                    finally:
+                        execute_query("SELECT RELEASE_LOCK(%s) as released", (f"job:{job.name}",), fetch_one=True)
+                else:
+                    job.func()
+            job.runs += 1
+        except Exception:
+            job.failures += 1
+            logger.exception('Scheduled job %s failed', job.name)
+        finally:
+            job.last_duration_ms = round((time.monotonic() - start) * 1000, 3)
+
+_jobs = {}  # name -> Job template, copied into each process's scheduler
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def register_job(name, interval, func, exclusive=True):
+    """Run func every interval seconds in each worker's scheduler (interval <= 0 disables it)"""
+    if interval > 0:
+        _jobs[name] = Job(name, interval, func, exclusive)
+    else:
+        _jobs.pop(name, None)
+
+def ensure_scheduler(app):
+    """Start this process's scheduler thread if it is not running yet"""
+    global _scheduler
+    if not SCHEDULER_ENABLED or not _jobs:
+        return None
+    scheduler = _scheduler
+    if scheduler is None or scheduler.pid != os.getpid():
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler.pid != os.getpid():
+                _scheduler = Scheduler(app, [Job(job.name, job.interval, job.func, job.exclusive) for job in _jobs.values()])
+                _scheduler.start()
+            scheduler = _scheduler
+    return scheduler
+
+def _reset_scheduler_after_fork():
+    # The parent's thread does not exist in the child; start a fresh one on demand
+    global _scheduler, _scheduler_lock
+    _scheduler = None
+    _scheduler_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_scheduler_after_fork)
+
+def get_scheduler_stats():
+    scheduler = _scheduler
+    if scheduler is None or scheduler.pid != os.getpid():
+        return {'pid': os.getpid(), 'jobs': {}}
+    return scheduler.stats()
@@ -0,0 +1,220 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from app.models.database import execute_query
+
+# Search backend: 'like' (substring scan), 'fulltext' (MySQL FULLTEXT) or 'memory' (in-process BM25)
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'like').lower()
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 1000))
+SEARCH_INDEX_REFRESH = float(os.environ.get('SEARCH_INDEX_REFRESH', 300))
+
+# key: primary key column, columns: searchable text, source/where: rows that belong in the index,
+# fulltext: column groups that each match a FULLTEXT index in the schema
+SearchSpec = namedtuple('SearchSpec', ['key', 'columns', 'source', 'where', 'fulltext'])
+
+SEARCH_SPECS = {
+    'opportunities': SearchSpec(
+        key='o.opportunity_id',
+        columns=['o.title', 'o.description', 'o.company'],
+        source='opportunities o',
+        where='o.is_active = TRUE AND o.is_expired = FALSE',
+        fulltext=[['o.title', 'o.description', 'o.company']]
+    ),
+    'success_stories': SearchSpec(
+        key='s.story_id',
+        columns=['s.title', 's.content'],
+        source='success_stories s',
+        where='s.is_published = TRUE',
+        fulltext=[['s.title', 's.content']]
+    ),
+    'scholarships': SearchSpec(
+        key='s.scholarship_id',
+        columns=['s.title', 's.description', 's.organization'],
+        source='scholarships s',
+        where='s.is_active = TRUE AND s.is_expired = FALSE',
+        fulltext=[['s.title', 's.description', 's.organization']]
+    ),
+    'webinars': SearchSpec(
+        key='w.webinar_id',
+        columns=['w.title', 'w.description'],
+        source='webinars w',
+        where='w.is_active = TRUE',
+        fulltext=[['w.title', 'w.description']]
+    ),
+    'mentorship_programs': SearchSpec(
+        key='mp.program_id',
+        columns=['mp.title', 'mp.description', 'u.first_name', 'u.last_name'],
+        source='mentorship_programs mp JOIN users u ON mp.mentor_id = u.user_id',
+        where='mp.is_active = TRUE',
+        fulltext=[['mp.title', 'mp.description'], ['u.first_name', 'u.last_name']]
+    ),
+    'alumni': SearchSpec(
+        key='user_id',
+        columns=['first_name', 'last_name', 'current_company'],
+        source='users',
+        where="role = 'alumni' AND is_active = TRUE",
+        fulltext=[['first_name', 'last_name', 'current_company']]
+    )
+}
+
+# condition/params go in WHERE; order/order_params (if any) rank the matches
+SearchFilter = namedtuple('SearchFilter', ['condition', 'params', 'order', 'order_params'])
+
+STOP_WORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with'
+])
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def tokenize(text):
+    """Lowercase word tokens with stop words removed"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+class InvertedIndex:
+    """In-memory inverted index ranked with Okapi BM25"""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> {doc_id: term frequency}
+        self._doc_terms = {}  # doc_id -> Counter of terms
+        self._doc_lengths = {}  # doc_id -> number of tokens
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, doc_id, text):
+        """Index (or re-index) a document"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            if not terms:
+                return
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query, limit=None):
+        """Return doc ids matching any query term, best BM25 score first"""
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not terms or not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return ranked[:limit] if limit else ranked
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _document_sql(spec):
+    body = ", ".join(f"COALESCE({column}, '')" for column in spec.columns)
+    return f"SELECT {spec.key} AS doc_id, CONCAT_WS(' ', {body}) AS body FROM {spec.source}"
+
+def _build_index(spec):
+    index = InvertedIndex()
+    for row in execute_query(f"{_document_sql(spec)} WHERE {spec.where}"):
+        index.add(row['doc_id'], row['body'])
+    return index
+
+def get_index(name):
+    """In-memory index for a search spec, (re)built from the database when stale"""
+    entry = _indexes.get(name)
+    if entry is None or time.monotonic() - entry[1] > SEARCH_INDEX_REFRESH:
+        with _indexes_lock:
+            entry = _indexes.get(name)
+            if entry is None or time.monotonic() - entry[1] > SEARCH_INDEX_REFRESH:
+                entry = (_build_index(SEARCH_SPECS[name]), time.monotonic())
+                _indexes[name] = entry
+    return entry[0]
+
+def sync_document(name, doc_id):
+    """Re-read one document into the in-memory index after a create/update/delete"""
+    if SEARCH_BACKEND != 'memory' or name not in _indexes:
+        return
+    spec = SEARCH_SPECS[name]
+    row = execute_query(
+        f"{_document_sql(spec)} WHERE {spec.where} AND {spec.key} = %s",
+        (doc_id,), fetch_one=True
+    )
+    index = _indexes[name][0]
+    if row:
+        index.add(doc_id, row['body'])
+    else:
+        index.remove(doc_id)
+
+def sync_documents(name, condition, params):
+    """Re-read every indexed document matching condition, e.g. after a joined row changed"""
+    if SEARCH_BACKEND != 'memory' or name not in _indexes:
+        return
+    spec = SEARCH_SPECS[name]
+    index = _indexes[name][0]
+    for row in execute_query(f"{_document_sql(spec)} WHERE {spec.where} AND {condition}", params):
+        index.add(row['doc_id'], row['body'])
+
+def search_filter(name, term):
+    """WHERE condition (and optional ranking) for a free-text search on one spec"""
+    spec = SEARCH_SPECS[name]
+
+    if SEARCH_BACKEND == 'fulltext':
+        matches = [
+            f"MATCH({', '.join(group)}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+            for group in spec.fulltext
+        ]
+        params = [term] * len(matches)
+        return SearchFilter(
+            '(' + ' OR '.join(matches) + ')', params,
+            '(' + ' + '.join(matches) + ') DESC', list(params)
+        )
+
+    if SEARCH_BACKEND == 'memory':
+        doc_ids = get_index(name).search(term, limit=SEARCH_MAX_RESULTS)
+        if not doc_ids:
+            return SearchFilter('1 = 0', [], None, [])
+        placeholders = ', '.join(['%s'] * len(doc_ids))
+        return SearchFilter(
+            f"{spec.key} IN ({placeholders})", list(doc_ids),
+            f"FIELD({spec.key}, {placeholders})", list(doc_ids)
+        )
+
+    like = f"%{term}%"
+    return SearchFilter(
+        '(' + ' OR '.join(f"{column} LIKE %s" for column in spec.columns) + ')',
+        [like] * len(spec.columns), None, []
+    )
@@ -0,0 +1,215 @@
+import bisect
+import os
+import threading
+import time
+from app.models.database import execute_query
+
+# Trending ranking configuration (per worker process)
+TRENDING_HALF_LIFE = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 24)) * 3600  # seconds for a score to halve
+TRENDING_WINDOW_DAYS = int(os.environ.get('TRENDING_WINDOW_DAYS', 7))  # history loaded when the ranking is built
+TRENDING_REFRESH = float(os.environ.get('TRENDING_REFRESH', 900))  # seconds before a worker reloads it
+
+# Event weights
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 5.0
+PUBLISH_WEIGHT = 10.0  # head start so new stories surface before they collect likes
+
+MIN_SCORE = 0.05  # decayed scores below this are dropped at rebase
+REBASE_HALF_LIVES = 64  # renormalize long before 2 ** exponent loses precision
+
+class TrendingRanking:
+    """Exponentially decayed story scores, kept sorted per category.
+
+    Scores never need decaying in place: an event at time t adds
+    weight * 2 ** ((t - epoch) / half_life), so later events weigh more and
+    relative order at any moment matches the decayed scores. Each category
+    (plus None for all stories) holds a sorted list of (-score, story_id),
+    so the feed is a slice and an event is one bisect removal and insert.
+    Every REBASE_HALF_LIVES the epoch moves forward and stale stories drop out.
+    """
+
+    def __init__(self, half_life=TRENDING_HALF_LIFE):
+        self.half_life = half_life
+        self._lock = threading.RLock()
+        self._epoch = time.time()
+        self._scores = {}  # story_id -> score relative to the epoch
+        self._categories = {}  # story_id -> category
+        self._ranked = {None: []}  # category -> sorted [(-score, story_id)]
+        self.loaded_at = None
+
+    def load(self, window_days=TRENDING_WINDOW_DAYS):
+        """Seed from recent stories and likes"""
+        stories = execute_query("""
+            SELECT story_id, category, views_count, UNIX_TIMESTAMP(created_at) as created_ts
+            FROM success_stories
+            WHERE is_published = TRUE AND created_at >= NOW() - INTERVAL %s DAY
+        """, (window_days,))
+        # Likes bucketed by hour keep the load query small on busy stories
+        likes = execute_query("""
+            SELECT sl.story_id, s.category, COUNT(*) as likes,
+                   FLOOR(UNIX_TIMESTAMP(sl.created_at) / 3600) * 3600 as bucket_ts
+            FROM story_likes sl
+            JOIN success_stories s ON sl.story_id = s.story_id
+            WHERE s.is_published = TRUE AND sl.created_at >= NOW() - INTERVAL %s DAY
+            GROUP BY sl.story_id, s.category, bucket_ts
+        """, (window_days,))
+
+        with self._lock:
+            for story in stories:
+                # View times are not stored, so a story's views count from when it was published
+                created_ts = float(story['created_ts'])
+                self._add(story['story_id'], story['category'], PUBLISH_WEIGHT, created_ts)
+                if story['views_count']:
+                    self._add(story['story_id'], story['category'], VIEW_WEIGHT * story['views_count'], created_ts)
+            for row in likes:
+                self._add(row['story_id'], row['category'], LIKE_WEIGHT * row['likes'], float(row['bucket_ts']))
+            self.loaded_at = time.monotonic()
+        return self
+
+    # Events
+
+    def record(self, story_id, category, weight, at=None):
+        with self._lock:
+            self._add(story_id, category, weight, at or time.time())
+
+    def remove(self, story_id):
+        with self._lock:
+            score = self._scores.pop(story_id, None)
+            if score is not None:
+                category = self._categories.pop(story_id)
+                self._unplace(None, score, story_id)
+                self._unplace(category, score, story_id)
+
+    def set_category(self, story_id, category):
+        with self._lock:
+            score = self._scores.get(story_id)
+            if score is not None and self._categories[story_id] != category:
+                self._unplace(self._categories[story_id], score, story_id)
+                self._categories[story_id] = category
+                self._place(category, score, story_id)
+
+    def tracks(self, story_id):
+        return story_id in self._scores
+
+    def category_of(self, story_id):
+        return self._categories.get(story_id)
+
+    # Queries
+
+    def top(self, category=None, offset=0, limit=20):
+        """[(story_id, current decayed score)] for one page of the feed"""
+        with self._lock:
+            decay = 2 ** ((time.time() - self._epoch) / self.half_life)
+            page = self._ranked.get(category, [])[offset:offset + limit]
+            return [(story_id, round(-negative / decay, 4)) for negative, story_id in page]
+
+    def size(self, category=None):
+        return len(self._ranked.get(category, ()))
+
+    def stats(self):
+        return {
+            'stories': len(self._scores),
+            'categories': {category: len(ranked) for category, ranked in self._ranked.items() if category},
+            'half_life_hours': self.half_life / 3600
+        }
+
+    # Internals (caller holds the lock)
+
+    def _add(self, story_id, category, weight, at):
+        if (at - self._epoch) / self.half_life > REBASE_HALF_LIVES:
+            self._rebase(at)
+        old = self._scores.get(story_id)
+        new = (old or 0.0) + weight * 2 ** ((at - self._epoch) / self.half_life)
+        if old is not None:
+            self._unplace(None, old, story_id)
+            self._unplace(self._categories[story_id], old, story_id)
+        if new <= 0:
+            self._scores.pop(story_id, None)
+            self._categories.pop(story_id, None)
+            return
+        self._scores[story_id] = new
+        self._categories[story_id] = category
+        self._place(None, new, story_id)
+        self._place(category, new, story_id)
+
+    def _place(self, category, score, story_id):
+        bisect.insort(self._ranked.setdefault(category, []), (-score, story_id))
+
+    def _unplace(self, category, score, story_id):
+        ranked = self._ranked.get(category, [])
+        index = bisect.bisect_left(ranked, (-score, story_id))
+        if index < len(ranked) and ranked[index] == (-score, story_id):
+            del ranked[index]
+
+    def _rebase(self, now):
+        factor = 2 ** ((now - self._epoch) / self.half_life)
+        self._epoch = now
+        self._scores = {story_id: score / factor for story_id, score in self._scores.items() if score / factor >= MIN_SCORE}
+        self._categories = {story_id: self._categories[story_id] for story_id in self._scores}
+        self._ranked = {None: []}
+        for story_id, score in self._scores.items():
+            self._ranked[None].append((-score, story_id))
+            self._ranked.setdefault(self._categories[story_id], []).append((-score, story_id))
+        for ranked in self._ranked.values():
+            ranked.sort()
+
+_ranking = None
+_ranking_lock = threading.Lock()
+
+def get_ranking():
+    """This process's trending ranking, rebuilt from the database when stale"""
+    global _ranking
+    ranking = _ranking
+    if ranking is None or time.monotonic() - ranking.loaded_at > TRENDING_REFRESH:
+        with _ranking_lock:
+            if _ranking is None or time.monotonic() - _ranking.loaded_at > TRENDING_REFRESH:
+                _ranking = TrendingRanking().load()
+            ranking = _ranking
+    return ranking
+
+# Maintenance hooks only touch a ranking that already exists; a fresh load sees the change anyway
+
+def story_viewed(story_id, category):
+    if _ranking is not None:
+        _ranking.record(story_id, category, VIEW_WEIGHT)
+
+def story_liked(story_id, delta=1, liked_at=None):
+    """Hook for likes (delta=1) and unlikes (delta=-1).
+
+    An unlike passes liked_at, the unix time of the like it withdraws, so it
+    subtracts exactly the weight that like added rather than a fresh one.
+    """
+    ranking = _ranking
+    if ranking is None:
+        return
+    if not ranking.tracks(story_id):
+        if delta < 0:
+            return
+        story = execute_query(
+            "SELECT category FROM success_stories WHERE story_id = %s AND is_published = TRUE",
+            (story_id,), fetch_one=True
+        )
+        if not story:
+            return
+        ranking.record(story_id, story['category'], LIKE_WEIGHT)
+        return
+    ranking.record(story_id, ranking.category_of(story_id), LIKE_WEIGHT * delta, at=liked_at)
+
+def story_published(story_id, category):
+    if _ranking is not None:
+        _ranking.record(story_id, category, PUBLISH_WEIGHT)
+
+def story_changed(story_id, category, is_published):
+    """Hook for story edits: move it to its new category or drop it when unpublished"""
+    if _ranking is None:
+        return
+    if is_published and not _ranking.tracks(story_id):
+        _ranking.record(story_id, category, PUBLISH_WEIGHT)
+    elif is_published:
+        _ranking.set_category(story_id, category)
+    else:
+        _ranking.remove(story_id)
+
+def get_trending_stats():
+    ranking = _ranking
+    return ranking.stats() if ranking is not None else None
@@ -0,0 +1,16 @@
+import multiprocessing
+import os
+
+# Production server settings: gunicorn -c gunicorn.conf.py run:app
+#
+# /api/messages/stream holds its request open, so sync workers would be
+# exhausted by a few idle tabs. gthread serves each request on a thread;
+# an open stream only costs a thread blocked on its queue, and streams end
+# every MESSAGE_STREAM_MAX_DURATION seconds so EventSource reconnects.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 64))  # concurrent requests (including open streams) per worker
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
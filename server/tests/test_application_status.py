@@ -0,0 +1,73 @@
+import contextlib
+
+from flask import Flask, request
+
+from app.models import application_status
+from app.routes import applications
+
+ROWS = [
+    {'application_id': 1, 'status': 'submitted', 'user_id': 10, 'application_type': 'opportunity',
+     'opportunity_id': 5, 'scholarship_id': None, 'posted_by': 7},
+    {'application_id': 2, 'status': 'submitted', 'user_id': 11, 'application_type': 'opportunity',
+     'opportunity_id': 6, 'scholarship_id': None, 'posted_by': 8},
+    {'application_id': 3, 'status': 'accepted', 'user_id': 12, 'application_type': 'scholarship',
+     'opportunity_id': None, 'scholarship_id': 9, 'posted_by': 7},
+]
+
+
+@contextlib.contextmanager
+def fake_database(monkeypatch, rows=ROWS):
+    statements = []
+    recorded = []
+
+    def execute_query(query, params=None, **kwargs):
+        if 'FOR UPDATE' in query:
+            return [row for row in rows if row['application_id'] in params]
+        statements.append((' '.join(query.split()), list(params)))
+        return 1
+
+    monkeypatch.setattr(application_status, 'execute_query', execute_query)
+    monkeypatch.setattr(application_status, 'transaction', contextlib.nullcontext)
+    monkeypatch.setattr(application_status, 'record_status_changes', recorded.extend)
+    yield statements, recorded
+
+
+def test_per_item_results(monkeypatch):
+    with fake_database(monkeypatch) as (statements, recorded):
+        results = application_status.bulk_update_statuses(7, [
+            (1, 'shortlisted'), (2, 'shortlisted'), (3, 'accepted'), (4, 'rejected'), (5, 'hired')
+        ])
+    assert results == {1: 'updated', 2: 'forbidden', 3: 'unchanged', 4: 'not_found', 5: 'invalid_status'}
+    assert statements == [('UPDATE applications SET status = %s WHERE application_id IN (%s)', ['shortlisted', 1])]
+    assert [(row['application_id'], old, new) for row, old, new in recorded] == [(1, 'submitted', 'shortlisted')]
+
+
+def test_only_first_pair_for_repeated_id_is_applied(monkeypatch):
+    with fake_database(monkeypatch) as (statements, _):
+        results = application_status.bulk_update_statuses(7, [(1, 'rejected'), (1, 'accepted')])
+    assert results == {1: 'updated'}
+    assert statements[0][1] == ['rejected', 1]
+
+
+def test_chunks_are_not_padded(monkeypatch):
+    rows = [dict(ROWS[0], application_id=i) for i in range(1, 104)]
+    with fake_database(monkeypatch, rows) as (statements, _):
+        application_status.bulk_update_statuses(7, [(i, 'rejected') for i in range(1, 104)])
+    assert [len(params) - 1 for _, params in statements] == [100, 3]
+    assert statements[1][1] == ['rejected', 101, 102, 103]
+
+
+def test_route_reports_duplicates_in_request_order(monkeypatch):
+    app = Flask(__name__)
+    with fake_database(monkeypatch):
+        with app.test_request_context(method='PATCH', json={'updates': [
+            {'application_id': 1, 'status': 'rejected'},
+            {'application_id': 4, 'status': 'rejected'},
+            {'application_id': 1, 'status': 'accepted'},
+        ]}):
+            request.current_user = {'user_id': 7, 'role': 'alumni'}
+            response, status = applications.bulk_update_application_status.__wrapped__.__wrapped__()
+    body = response.get_json()
+    assert status == 200
+    assert [item['result'] for item in body['results']] == ['updated', 'not_found', 'duplicate']
+    assert body['summary'] == {'updated': 1, 'not_found': 1, 'duplicate': 1}
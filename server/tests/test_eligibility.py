@@ -0,0 +1,79 @@
+from app.utils.eligibility import EligibilityEngine, parse_criteria
+
+
+def test_all_majors_is_unrestricted():
+    assert parse_criteria("Open to all majors").majors == frozenset()
+
+
+def test_any_major_with_filler_is_unrestricted():
+    rule = parse_criteria("Undergraduate students of any major, GPA 3.0")
+    assert rule.majors == frozenset()
+    assert rule.min_gpa == 3.0
+    assert rule.degrees == frozenset(['bachelor'])
+
+
+def test_preferred_major_is_soft():
+    rule = parse_criteria("computer science majors preferred")
+    assert rule.majors == frozenset()
+    assert rule.preferred_majors == frozenset(['computer science'])
+
+
+def test_encouraged_clause_does_not_affect_requirement():
+    rule = parse_criteria("Business majors; economics majors encouraged")
+    assert rule.majors == frozenset(['business'])
+    assert rule.preferred_majors == frozenset(['economics'])
+
+
+def test_listed_majors_are_required():
+    rule = parse_criteria("Open to CS, math or physics majors")
+    assert rule.majors == frozenset(['computer science', 'mathematics', 'physics'])
+
+
+def test_filler_words_are_stripped():
+    rule = parse_criteria("Students majoring in Finance/Economics")
+    assert rule.majors == frozenset(['finance', 'economics'])
+
+
+def test_unrecognised_major_leaves_scholarship_unfiltered():
+    assert parse_criteria("Finance or basket weaving majors").majors == frozenset()
+
+
+def test_incidental_degree_words_are_not_requirements():
+    assert parse_criteria("Open to all students. Must have mastered Python.").degrees == frozenset()
+    assert parse_criteria("Students interested in becoming doctors").degrees == frozenset()
+
+
+def test_graduate_students_cover_both_graduate_levels():
+    assert parse_criteria("Graduate students in any field").degrees == frozenset(['master', 'phd'])
+
+
+def test_abbreviated_degrees_are_whole_words():
+    assert parse_criteria("Open to Ph.D. candidates").degrees == frozenset(['phd'])
+    assert parse_criteria("M.S. or MBA students").degrees == frozenset(['master'])
+
+
+def test_unrecognised_degree_leaves_scholarship_unfiltered():
+    assert parse_criteria("Must hold a professional degree").degrees == frozenset()
+
+
+def test_preferred_degree_is_not_required():
+    assert parse_criteria("Bachelor's students; graduate students preferred").degrees == frozenset(['bachelor'])
+
+
+def test_json_any_major_is_unrestricted():
+    assert parse_criteria('{"majors": ["any"], "min_gpa": 3.2}').majors == frozenset()
+
+
+def test_preferred_major_never_filters():
+    engine = EligibilityEngine({
+        1: parse_criteria("computer science majors preferred"),
+        2: parse_criteria("Open to all majors"),
+        3: parse_criteria("Computer Science or Engineering majors")
+    })
+    eligible, unverified, preferred = engine.evaluate({'major': 'Biology'})
+    assert eligible == [1, 2]
+    assert preferred == []
+
+    eligible, unverified, preferred = engine.evaluate({'major': 'Computer Science'})
+    assert eligible == [1, 2, 3]
+    assert preferred == [1]
@@ -0,0 +1,13 @@
+-- Indexes backing keyset (cursor) pagination on the list endpoints
+USE alumni_connect;
+
+-- Each index leads with the listing's fixed filter and ends with the sort key + id tiebreaker
+CREATE INDEX idx_opportunities_active_created ON opportunities(is_active, created_at, opportunity_id);
+CREATE INDEX idx_users_alumni_listing ON users(role, is_active, is_verified, first_name, user_id);
+CREATE INDEX idx_users_student_listing ON users(role, is_active, graduation_year, first_name, user_id);
+CREATE INDEX idx_stories_published_listing ON success_stories(is_published, is_featured, created_at, story_id);
+CREATE INDEX idx_scholarships_active_deadline ON scholarships(is_active, application_deadline, amount, scholarship_id);
+CREATE INDEX idx_webinars_active_scheduled ON webinars(is_active, scheduled_date, webinar_id);
+CREATE INDEX idx_mentorship_programs_active_created ON mentorship_programs(is_active, created_at, program_id);
+CREATE INDEX idx_messages_recipient_sent ON messages(recipient_id, sent_at, message_id);
+CREATE INDEX idx_messages_sender_sent ON messages(sender_id, sent_at, message_id);
@@ -0,0 +1,11 @@
+-- FULLTEXT indexes for SEARCH_BACKEND=fulltext
+USE alumni_connect;
+
+-- Column lists must match the MATCH() groups in server/app/utils/search.py exactly
+CREATE FULLTEXT INDEX ft_opportunities_search ON opportunities(title, description, company);
+CREATE FULLTEXT INDEX ft_stories_search ON success_stories(title, content);
+CREATE FULLTEXT INDEX ft_scholarships_search ON scholarships(title, description, organization);
+CREATE FULLTEXT INDEX ft_webinars_search ON webinars(title, description);
+CREATE FULLTEXT INDEX ft_mentorship_programs_search ON mentorship_programs(title, description);
+CREATE FULLTEXT INDEX ft_users_name ON users(first_name, last_name);
+CREATE FULLTEXT INDEX ft_users_alumni_search ON users(first_name, last_name, current_company);
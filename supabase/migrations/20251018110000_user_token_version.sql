@@ -0,0 +1,5 @@
+-- Token version for revoking issued access tokens
+USE alumni_connect;
+
+-- Embedded in each JWT as the "ver" claim; bumping it invalidates older tokens
+ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,32 @@
+-- Materialized inbox: one row per user per conversation partner
+USE alumni_connect;
+
+-- Both participants get their own row, so an inbox is a single range read on (user_id, last_message_at)
+CREATE TABLE conversations (
+    user_id INT NOT NULL,
+    other_user_id INT NOT NULL,
+    last_message_id INT NOT NULL,
+    last_message_preview VARCHAR(200),
+    last_message_at TIMESTAMP NOT NULL,
+    unread_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, other_user_id),
+    INDEX idx_conversations_user_recent (user_id, last_message_at),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (other_user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Backfill from existing messages
+INSERT INTO conversations (
+    user_id, other_user_id, last_message_id, last_message_preview, last_message_at, unread_count
+)
+SELECT pairs.user_id, pairs.other_user_id, m.message_id, LEFT(m.content, 200), m.sent_at, pairs.unread_count
+FROM (
+    SELECT user_id, other_user_id, MAX(message_id) AS last_message_id, SUM(unread) AS unread_count
+    FROM (
+        SELECT sender_id AS user_id, recipient_id AS other_user_id, message_id, 0 AS unread FROM messages
+        UNION ALL
+        SELECT recipient_id, sender_id, message_id, IF(is_read, 0, 1) FROM messages
+    ) sides
+    GROUP BY user_id, other_user_id
+) pairs
+JOIN messages m ON m.message_id = pairs.last_message_id;
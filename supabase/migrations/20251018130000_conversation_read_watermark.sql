@@ -0,0 +1,12 @@
+-- Per-conversation read receipts
+USE alumni_connect;
+
+-- Every message from other_user_id with an id at or below the watermark has been read by user_id
+ALTER TABLE conversations ADD COLUMN read_up_to_message_id INT NOT NULL DEFAULT 0;
+
+UPDATE conversations c
+SET c.read_up_to_message_id = COALESCE(
+    (SELECT MIN(m.message_id) - 1 FROM messages m
+     WHERE m.sender_id = c.other_user_id AND m.recipient_id = c.user_id AND m.is_read = FALSE),
+    c.last_message_id
+);
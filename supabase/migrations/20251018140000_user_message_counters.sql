@@ -0,0 +1,14 @@
+-- Maintained unread-message badge counters
+USE alumni_connect;
+
+CREATE TABLE user_message_counters (
+    user_id INT PRIMARY KEY,
+    unread_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+INSERT INTO user_message_counters (user_id, unread_count)
+SELECT recipient_id, COUNT(*) FROM messages WHERE is_read = FALSE GROUP BY recipient_id;
+
+-- Lets reconciliation count unread messages per recipient from the index alone
+CREATE INDEX idx_messages_recipient_unread ON messages(recipient_id, is_read);
@@ -0,0 +1,6 @@
+-- Per-direction indexes for the connections listing
+USE alumni_connect;
+
+-- Each UNION ALL branch of the type=all query reads one of these ranges
+CREATE INDEX idx_connections_requester_status ON connections(requester_id, status, created_at);
+CREATE INDEX idx_connections_recipient_status ON connections(recipient_id, status, created_at);
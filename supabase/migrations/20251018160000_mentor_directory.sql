@@ -0,0 +1,50 @@
+-- Precomputed mentor directory read model for /api/mentorship/mentors
+USE alumni_connect;
+
+CREATE TABLE mentor_directory (
+    mentor_id INT PRIMARY KEY,
+    first_name VARCHAR(100) NOT NULL,
+    last_name VARCHAR(100) NOT NULL,
+    current_position VARCHAR(100),
+    current_company VARCHAR(100),
+    location VARCHAR(100),
+    bio TEXT,
+    skills TEXT, -- JSON array of skills, copied from users
+    linkedin_url VARCHAR(255),
+    profile_image VARCHAR(255),
+    graduation_year INT,
+    program_count INT NOT NULL DEFAULT 0,
+    session_count INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    average_rating DECIMAL(3,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (mentor_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    -- Matches the listing's ORDER BY so a page is an index range scan
+    INDEX idx_mentor_directory_rank (program_count, session_count, first_name, mentor_id)
+);
+
+-- One row per (normalized expertise, mentor): skills plus active program expertise areas
+CREATE TABLE mentor_expertise (
+    expertise VARCHAR(100) NOT NULL,
+    mentor_id INT NOT NULL,
+    PRIMARY KEY (expertise, mentor_id),
+    INDEX idx_mentor_expertise_mentor (mentor_id),
+    FOREIGN KEY (mentor_id) REFERENCES mentor_directory(mentor_id) ON DELETE CASCADE
+);
+
+INSERT INTO mentor_directory (
+    mentor_id, first_name, last_name, current_position, current_company, location, bio,
+    skills, linkedin_url, profile_image, graduation_year,
+    program_count, session_count, rating_count, average_rating
+)
+SELECT u.user_id, u.first_name, u.last_name, u.current_position, u.current_company, u.location, u.bio,
+       u.skills, u.linkedin_url, u.profile_image, u.graduation_year,
+       (SELECT COUNT(*) FROM mentorship_programs mp WHERE mp.mentor_id = u.user_id AND mp.is_active = TRUE),
+       (SELECT COUNT(*) FROM mentorship_sessions ms WHERE ms.mentor_id = u.user_id),
+       (SELECT COUNT(ms.feedback_rating) FROM mentorship_sessions ms WHERE ms.mentor_id = u.user_id),
+       (SELECT AVG(ms.feedback_rating) FROM mentorship_sessions ms WHERE ms.mentor_id = u.user_id)
+FROM users u
+WHERE u.is_active = TRUE AND u.role IN ('alumni', 'mentor');
+
+-- Expertise sets are parsed from JSON in Python; populate them with:
+--   cd server && flask --app run rebuild-mentor-directory
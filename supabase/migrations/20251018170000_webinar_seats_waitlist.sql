@@ -0,0 +1,20 @@
+-- Maintained webinar seat counter and ordered waitlist
+USE alumni_connect;
+
+-- Seats are claimed with a conditional UPDATE (seats_taken < max_participants)
+ALTER TABLE webinars ADD COLUMN seats_taken INT NOT NULL DEFAULT 0;
+
+UPDATE webinars w
+SET w.seats_taken = (SELECT COUNT(*) FROM webinar_registrations wr WHERE wr.webinar_id = w.webinar_id);
+
+-- waitlist_id gives first-come, first-served order within a webinar
+CREATE TABLE webinar_waitlist (
+    waitlist_id INT PRIMARY KEY AUTO_INCREMENT,
+    webinar_id INT NOT NULL,
+    user_id INT NOT NULL,
+    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_waitlist_entry (webinar_id, user_id),
+    INDEX idx_webinar_waitlist_order (webinar_id, waitlist_id),
+    FOREIGN KEY (webinar_id) REFERENCES webinars(webinar_id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
@@ -0,0 +1,42 @@
+-- Materialized application counts for /api/applications/stats
+USE alumni_connect;
+
+-- One row per applicant, poster, opportunity or scholarship with applications
+CREATE TABLE application_stats (
+    scope ENUM('applicant', 'poster', 'opportunity', 'scholarship') NOT NULL,
+    scope_id INT NOT NULL,
+    total_applications INT NOT NULL DEFAULT 0,
+    submitted INT NOT NULL DEFAULT 0,
+    under_review INT NOT NULL DEFAULT 0,
+    shortlisted INT NOT NULL DEFAULT 0,
+    accepted INT NOT NULL DEFAULT 0,
+    rejected INT NOT NULL DEFAULT 0,
+    opportunity_applications INT NOT NULL DEFAULT 0,
+    scholarship_applications INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, scope_id)
+);
+
+INSERT INTO application_stats (
+    scope, scope_id, total_applications, submitted, under_review, shortlisted, accepted, rejected,
+    opportunity_applications, scholarship_applications
+)
+SELECT x.scope, x.scope_id, COUNT(*),
+       SUM(x.status = 'submitted'), SUM(x.status = 'under_review'), SUM(x.status = 'shortlisted'),
+       SUM(x.status = 'accepted'), SUM(x.status = 'rejected'),
+       SUM(x.application_type = 'opportunity'), SUM(x.application_type = 'scholarship')
+FROM (
+    SELECT 'applicant' as scope, a.user_id as scope_id, a.status, a.application_type FROM applications a
+    UNION ALL
+    SELECT 'poster', o.posted_by, a.status, a.application_type FROM applications a
+    JOIN opportunities o ON a.opportunity_id = o.opportunity_id
+    UNION ALL
+    SELECT 'poster', s.posted_by, a.status, a.application_type FROM applications a
+    JOIN scholarships s ON a.scholarship_id = s.scholarship_id
+    UNION ALL
+    SELECT 'opportunity', a.opportunity_id, a.status, a.application_type FROM applications a
+    WHERE a.opportunity_id IS NOT NULL
+    UNION ALL
+    SELECT 'scholarship', a.scholarship_id, a.status, a.application_type FROM applications a
+    WHERE a.scholarship_id IS NOT NULL
+) x
+GROUP BY x.scope, x.scope_id;
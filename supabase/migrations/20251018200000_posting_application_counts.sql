@@ -0,0 +1,27 @@
+-- Denormalized application counts for the /my posting listings
+USE alumni_connect;
+
+ALTER TABLE opportunities ADD COLUMN application_count INT NOT NULL DEFAULT 0;
+ALTER TABLE scholarships ADD COLUMN application_count INT NOT NULL DEFAULT 0;
+
+-- Per-posting lookups and counts by status read these ranges instead of scanning applications
+CREATE INDEX idx_applications_opportunity_status ON applications(opportunity_id, status);
+CREATE INDEX idx_applications_scholarship_status ON applications(scholarship_id, status);
+
+-- A poster's listing is one index range already in created_at order
+CREATE INDEX idx_opportunities_posted_by_created ON opportunities(posted_by, created_at);
+CREATE INDEX idx_scholarships_posted_by_created ON scholarships(posted_by, created_at);
+
+UPDATE opportunities o
+JOIN (
+    SELECT opportunity_id, COUNT(*) as count FROM applications
+    WHERE opportunity_id IS NOT NULL GROUP BY opportunity_id
+) a ON a.opportunity_id = o.opportunity_id
+SET o.application_count = a.count;
+
+UPDATE scholarships s
+JOIN (
+    SELECT scholarship_id, COUNT(*) as count FROM applications
+    WHERE scholarship_id IS NOT NULL GROUP BY scholarship_id
+) a ON a.scholarship_id = s.scholarship_id
+SET s.application_count = a.count;
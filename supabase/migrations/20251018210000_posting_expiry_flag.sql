@@ -0,0 +1,12 @@
+-- Separate expiry from the is_active soft delete for opportunities and scholarships
+USE alumni_connect;
+
+ALTER TABLE opportunities ADD COLUMN is_expired BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE scholarships ADD COLUMN is_expired BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Expiry sweep: active, not yet expired rows in deadline order
+CREATE INDEX idx_opportunities_expiry ON opportunities(is_active, is_expired, application_deadline);
+CREATE INDEX idx_scholarships_expiry ON scholarships(is_active, is_expired, application_deadline);
+
+UPDATE opportunities SET is_expired = TRUE WHERE application_deadline < CURDATE();
+UPDATE scholarships SET is_expired = TRUE WHERE application_deadline < CURDATE();
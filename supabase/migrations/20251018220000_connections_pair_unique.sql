@@ -0,0 +1,12 @@
+-- One connection row per pair of users, whichever of them sent the request
+USE alumni_connect;
+
+-- Drop reverse-direction duplicates left by concurrent requests: keep the
+-- most advanced status (accepted, then pending, then declined), then the oldest row
+DELETE c FROM connections c
+JOIN connections other ON other.requester_id = c.recipient_id AND other.recipient_id = c.requester_id
+WHERE FIELD(c.status, 'accepted', 'pending', 'declined') > FIELD(other.status, 'accepted', 'pending', 'declined')
+   OR (c.status = other.status AND c.connection_id > other.connection_id);
+
+-- unique_connection only covers (requester_id, recipient_id); this covers both directions
+CREATE UNIQUE INDEX unique_connection_pair ON connections ((LEAST(requester_id, recipient_id)), (GREATEST(requester_id, recipient_id)));
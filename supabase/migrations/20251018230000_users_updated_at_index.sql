@@ -0,0 +1,4 @@
+-- Index the users change feed each worker polls to evict cached principals
+USE alumni_connect;
+
+CREATE INDEX idx_users_updated_at ON users (updated_at);
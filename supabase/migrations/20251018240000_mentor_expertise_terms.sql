@@ -0,0 +1,14 @@
+-- Word index over mentor expertise so the directory filter matches words inside tags
+USE alumni_connect;
+
+-- One row per (word of a normalized expertise value, mentor)
+CREATE TABLE mentor_expertise_terms (
+    term VARCHAR(50) NOT NULL,
+    mentor_id INT NOT NULL,
+    PRIMARY KEY (term, mentor_id),
+    INDEX idx_mentor_expertise_terms_mentor (mentor_id),
+    FOREIGN KEY (mentor_id) REFERENCES mentor_directory(mentor_id) ON DELETE CASCADE
+);
+
+-- Words are split in Python; populate the table with:
+--   cd server && flask --app run rebuild-mentor-directory